@@ -0,0 +1,78 @@
+"""
+Change Bus - table-level change notifications
+Database records which tables each write statement touches (including the
+tables its triggers update) and publishes them when the transaction
+commits. Views subscribe to the tables they display instead of every save
+refreshing the whole application.
+"""
+
+import re
+
+# Target table of an INSERT / REPLACE / UPDATE / DELETE statement
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE)
+
+# Tables written inside a trigger body ("DO UPDATE SET" of an upsert is not a table)
+_BODY_TARGET = re.compile(
+    r"\b(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?!\s+SET\b)(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+(\w+)",
+    re.IGNORECASE)
+_TRIGGER_SUBJECT = re.compile(r"\bON\s+(\w+)", re.IGNORECASE)
+
+
+def written_table(query):
+    """Return the table a write statement modifies, or None for reads"""
+    match = _WRITE_TARGET.match(query)
+    return match.group(1) if match else None
+
+
+def trigger_targets(cursor):
+    """Map each table to every table its triggers write, following trigger chains"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND sql IS NOT NULL")
+    direct = {}
+    for (sql,) in cursor.fetchall():
+        head, _, body = sql.partition("BEGIN")
+        subject = _TRIGGER_SUBJECT.search(head)
+        if subject:
+            direct.setdefault(subject.group(1), set()).update(_BODY_TARGET.findall(body))
+
+    targets = {}
+    for table in direct:
+        seen = set()
+        pending = [table]
+        while pending:
+            for target in direct.get(pending.pop(), ()):
+                if target not in seen:
+                    seen.add(target)
+                    pending.append(target)
+        seen.discard(table)
+        targets[table] = seen
+    return targets
+
+
+class ChangeBus:
+    """Publish/subscribe of changed table names"""
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, tables, callback):
+        """Call callback(changed_tables) whenever one of tables changes
+
+        Returns a token for unsubscribe().
+        """
+        token = (frozenset(tables), callback)
+        self._subscribers.append(token)
+        return token
+
+    def unsubscribe(self, token):
+        if token in self._subscribers:
+            self._subscribers.remove(token)
+
+    def publish(self, tables):
+        """Notify every subscriber interested in any of tables"""
+        tables = set(tables)
+        for watched, callback in list(self._subscribers):
+            changed = watched & tables
+            if changed:
+                callback(changed)
@@ -0,0 +1,94 @@
+"""
+Dashboard Metrics - every dashboard KPI from a single statement
+Each source below aggregates one table (or join) in a single pass. Stale
+sources are combined into one SELECT, and results are cached until the
+change bus reports a write to one of the source's tables.
+"""
+
+import re
+
+_ALIAS = re.compile(r"\bAS (\w+)")
+
+# name -> (tables it reads, one-row aggregate query); every column is named with AS
+METRIC_SOURCES = {
+    'inventory': (('Items', 'Inventory'), '''SELECT COUNT(*) AS total_items,
+            COALESCE(SUM(inv.quantity_on_hand <= inv.reorder_level), 0) AS low_stock,
+            COALESCE(SUM(inv.quantity_on_hand), 0) AS total_stock
+        FROM Items i LEFT JOIN Inventory inv ON inv.item_id = i.item_id'''),
+    'purchases': (('Purchase_Orders',), '''SELECT COUNT(*) AS total_pos,
+            COALESCE(SUM(status = 'Pending'), 0) AS pending_pos,
+            COALESCE(SUM(total_amount), 0) AS total_purchase,
+            COALESCE(SUM(total_gst), 0) AS input_gst
+        FROM Purchase_Orders'''),
+    'sales': (('Sales_Orders',), '''SELECT COUNT(*) AS total_sos,
+            COALESCE(SUM(status = 'Pending'), 0) AS pending_sos,
+            COALESCE(SUM(total_amount), 0) AS total_sales,
+            COALESCE(SUM(total_gst), 0) AS output_gst
+        FROM Sales_Orders'''),
+    # Plain row counts are read from the trigger-maintained counters
+    'counters': (('Row_Counters',), '''SELECT
+            COALESCE(SUM(CASE WHEN counter = 'Suppliers' THEN value END), 0) AS total_suppliers,
+            COALESCE(SUM(CASE WHEN counter = 'Customers' THEN value END), 0) AS total_customers
+        FROM Row_Counters WHERE counter IN ('Suppliers', 'Customers')'''),
+    'invoices': (('Invoices',), '''SELECT COUNT(*) AS total_invoices,
+            COALESCE(SUM(status = 'Unpaid'), 0) AS unpaid_invoices,
+            COALESCE(SUM(CASE WHEN status = 'Unpaid' THEN total_amount ELSE 0 END), 0) AS unpaid_amount
+        FROM Invoices'''),
+}
+
+
+def combined_query(names):
+    """One SELECT returning the columns of every named source in a single row"""
+    sources = ", ".join(f"({METRIC_SOURCES[name][1]}) AS {name}" for name in names)
+    return f"SELECT * FROM {sources}"
+
+
+class DashboardMetrics:
+    """Cached dashboard KPIs with table-level invalidation
+
+    The cache is only touched on the UI thread; load() is safe to run on the
+    query worker since it only uses the cursor it is given.
+    """
+
+    def __init__(self, changes):
+        self._cache = {}     # source name -> {metric: value}
+        self._versions = {}  # source name -> bumped on every invalidation
+        tables = {table for deps, _ in METRIC_SOURCES.values() for table in deps}
+        changes.subscribe(tables, self.invalidate)
+
+    def invalidate(self, tables):
+        """Drop cached sources that read any of tables"""
+        for name, (deps, _) in METRIC_SOURCES.items():
+            if tables.intersection(deps):
+                self._cache.pop(name, None)
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def stale(self):
+        """Sources that need to be queried, with their current versions"""
+        return {name: self._versions.get(name, 0) for name in METRIC_SOURCES if name not in self._cache}
+
+    @staticmethod
+    def load(cursor, names):
+        """Run the combined query for names; returns {source: {metric: value}}"""
+        if not names:
+            return {}
+        cursor.execute(combined_query(names))
+        row = dict(zip((column[0] for column in cursor.description), cursor.fetchone()))
+        return {name: {column: row[column] for column in _ALIAS.findall(METRIC_SOURCES[name][1])}
+                for name in names}
+
+    def store(self, loaded, versions):
+        """Cache loaded sources unless they were invalidated while loading"""
+        for name, values in loaded.items():
+            if self._versions.get(name, 0) == versions[name]:
+                self._cache[name] = values
+
+    def values(self, loaded=None):
+        """All metrics as one flat dict, preferring freshly loaded values"""
+        metrics = {}
+        for name in METRIC_SOURCES:
+            metrics.update(self._cache.get(name, {}))
+        for values in (loaded or {}).values():
+            metrics.update(values)
+        return metrics
+
@@ -2,210 +2,930 @@
 Database Module - Updated with GST Support for India
 """
 
+import re
 import sqlite3
-from datetime import datetime
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from change_bus import ChangeBus, trigger_targets, written_table
+
+# ==================== SCHEMA MIGRATIONS ====================
+# Ordered list of (version, description, steps). A step is either a SQL
+# string or a callable taking the cursor. Steps must be idempotent so that a
+# migration interrupted half-way can simply be re-run on the next start.
+# Never edit a released migration - append a new one instead.
+
+# Monetary columns, stored as integer paise (see money.py)
+MONEY_COLUMNS = {
+    'Items': ['purchase_rate', 'purchase_price', 'selling_rate', 'selling_price'],
+    'Customers': ['credit_limit'],
+    'Purchase_Orders': ['subtotal', 'total_gst', 'total_amount'],
+    'Purchase_Order_Items': ['rate', 'gst_amount', 'total_price'],
+    'Sales_Orders': ['subtotal', 'total_gst', 'total_amount'],
+    'Sales_Order_Items': ['rate', 'gst_amount', 'total_price'],
+    'Invoices': ['subtotal', 'total_gst', 'total_amount'],
+}
+
+
+def _money_to_paise(cursor):
+    """Rebuild tables whose money columns are still REAL rupees as INTEGER paise
+    
+    SQLite cannot change a column type in place, so each table is copied into
+    a new one, dropped and renamed back; its indexes are recreated afterwards.
+    Columns already declared INTEGER are left alone.
+    """
+    for table, money_columns in MONEY_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [(row[1], row[2].upper()) for row in cursor.fetchall()]
+        pending = [name for name, col_type in columns if name in money_columns and col_type == 'REAL']
+        if not pending:
+            continue
+        
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table,))
+        create_sql = cursor.fetchone()[0]
+        for name in pending:
+            create_sql = re.sub(rf"\b{name}\s+REAL\b", f"{name} INTEGER", create_sql)
+        create_sql = re.sub(rf"\b{table}\b", f"{table}_paise", create_sql, count=1)
+        
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+                       (table,))
+        indexes = [row[0] for row in cursor.fetchall()]
+        
+        names = ", ".join(name for name, _ in columns)
+        values = ", ".join(f"CAST(ROUND({name} * 100) AS INTEGER)" if name in pending else name
+                           for name, _ in columns)
+        cursor.execute(f"DROP TABLE IF EXISTS {table}_paise")
+        cursor.execute(create_sql)
+        cursor.execute(f"INSERT INTO {table}_paise ({names}) SELECT {values} FROM {table}")
+        cursor.execute(f"DROP TABLE {table}")
+        cursor.execute(f"ALTER TABLE {table}_paise RENAME TO {table}")
+        for index_sql in indexes:
+            cursor.execute(index_sql)
+
+
+def _add_column(table, column, declaration):
+    """Migration step adding a column unless the table already has it"""
+    def step(cursor):
+        cursor.execute(f"PRAGMA table_info({table})")
+        if column not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+    return step
+
+
+# Tables whose row count is kept in Row_Counters, with the column counted
+# per value ('Invoices:Unpaid' etc.) or None
+COUNTED_TABLES = {
+    'Items': None,
+    'Suppliers': None,
+    'Customers': None,
+    'Purchase_Orders': 'status',
+    'Sales_Orders': 'status',
+    'Invoices': 'status',
+}
+
+def _bump_counter(values):
+    """Upsert adding each (counter, delta) SQL value pair to Row_Counters"""
+    return (f"INSERT INTO Row_Counters (counter, value) VALUES {', '.join(values)} "
+            f"ON CONFLICT(counter) DO UPDATE SET value = value + excluded.value")
+
+
+def _counter_steps(table, status_column):
+    """Backfill and triggers keeping the Row_Counters rows of one table current"""
+    def counters(row, delta):
+        values = [f"('{table}', {delta})"]
+        if status_column:
+            values.append(f"('{table}:' || COALESCE({row}.{status_column}, ''), {delta})")
+        return _bump_counter(values)
+    
+    steps = [
+        f"DELETE FROM Row_Counters WHERE counter = '{table}' OR counter LIKE '{table}:%'",
+        f"INSERT INTO Row_Counters (counter, value) SELECT '{table}', COUNT(*) FROM {table}",
+    ]
+    if status_column:
+        steps.append(f"""INSERT INTO Row_Counters (counter, value)
+            SELECT '{table}:' || COALESCE({status_column}, ''), COUNT(*) FROM {table} GROUP BY 1""")
+    steps.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_count_insert AFTER INSERT ON {table}
+        BEGIN
+            {counters('NEW', 1)};
+        END""")
+    steps.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_count_delete AFTER DELETE ON {table}
+        BEGIN
+            {counters('OLD', -1)};
+        END""")
+    if status_column:
+        steps.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_count_status
+        AFTER UPDATE OF {status_column} ON {table}
+        BEGIN
+            {_bump_counter([f"('{table}:' || COALESCE(OLD.{status_column}, ''), -1)"])};
+            {_bump_counter([f"('{table}:' || COALESCE(NEW.{status_column}, ''), 1)"])};
+        END""")
+    return steps
+
+
+# GST_Rollup direction -> (line table, line key, header table, header key)
+GST_ROLLUP_SOURCES = {
+    'output': ('Sales_Order_Items', 'so_item_id', 'Sales_Orders', 'so_number'),
+    'input': ('Purchase_Order_Items', 'po_item_id', 'Purchase_Orders', 'po_number'),
+}
+
+_ADD_ROLLUP = (" ON CONFLICT(direction, gst_percent, period) DO UPDATE SET"
+               " base_amount = base_amount + excluded.base_amount,"
+               " gst_amount = gst_amount + excluded.gst_amount,"
+               " total_amount = total_amount + excluded.total_amount,"
+               " line_count = line_count + excluded.line_count,"
+               " order_count = order_count + excluded.order_count")
+
+
+def _gst_rollup_steps(direction, line_table, line_id, header_table, key):
+    """Backfill and triggers keeping the GST_Rollup rows of one direction current
+    
+    A row holds the lines of one GST rate in one month (by order date).
+    order_count counts orders with at least one line at that rate, so a line
+    only moves it when it is the first/last of its order at that rate.
+    """
+    def period(date):
+        return f"COALESCE(strftime('%Y-%m', {date}), '')"
+    
+    def line_change(row, sign):
+        header_period = f"(SELECT {period('h.order_date')} FROM {header_table} h WHERE h.{key} = {row}.{key})"
+        alone = (f"NOT EXISTS (SELECT 1 FROM {line_table} x WHERE x.{key} = {row}.{key} "
+                 f"AND x.gst_percent = {row}.gst_percent AND x.{line_id} != {row}.{line_id})")
+        return (f"INSERT INTO GST_Rollup (direction, gst_percent, period, base_amount, gst_amount, "
+                f"total_amount, line_count, order_count) VALUES ('{direction}', {row}.gst_percent, "
+                f"COALESCE({header_period}, ''), {sign} * {row}.rate * {row}.quantity, "
+                f"{sign} * COALESCE({row}.gst_amount, 0), {sign} * COALESCE({row}.total_price, 0), "
+                f"{sign}, {sign} * ({alone})){_ADD_ROLLUP}")
+    
+    def move_order(date, sign):
+        return (f"INSERT INTO GST_Rollup (direction, gst_percent, period, base_amount, gst_amount, "
+                f"total_amount, line_count, order_count) SELECT '{direction}', gst_percent, {period(date)}, "
+                f"{sign} * SUM(rate * quantity), {sign} * SUM(COALESCE(gst_amount, 0)), "
+                f"{sign} * SUM(COALESCE(total_price, 0)), {sign} * COUNT(*), {sign} "
+                f"FROM {line_table} WHERE {key} = NEW.{key} GROUP BY gst_percent{_ADD_ROLLUP}")
+    
+    prefix = f"trg_{line_table.lower()}_gst"
+    return [
+        f"DELETE FROM GST_Rollup WHERE direction = '{direction}'",
+        f"""INSERT INTO GST_Rollup (direction, gst_percent, period, base_amount, gst_amount,
+                total_amount, line_count, order_count)
+            SELECT '{direction}', l.gst_percent, {period('h.order_date')}, SUM(l.rate * l.quantity),
+                SUM(COALESCE(l.gst_amount, 0)), SUM(COALESCE(l.total_price, 0)), COUNT(*), COUNT(DISTINCT l.{key})
+            FROM {line_table} l LEFT JOIN {header_table} h ON h.{key} = l.{key}
+            GROUP BY 2, 3""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_insert AFTER INSERT ON {line_table}
+        BEGIN
+            {line_change('NEW', 1)};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_update
+        AFTER UPDATE OF {key}, quantity, rate, gst_percent, gst_amount, total_price ON {line_table}
+        BEGIN
+            {line_change('OLD', -1)};
+            {line_change('NEW', 1)};
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {prefix}_delete AFTER DELETE ON {line_table}
+        BEGIN
+            {line_change('OLD', -1)};
+        END""",
+        # Changing the order date moves all of the order's lines to the new month
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{header_table.lower()}_gst_period
+        AFTER UPDATE OF order_date ON {header_table}
+        WHEN {period('OLD.order_date')} != {period('NEW.order_date')}
+        BEGIN
+            {move_order('OLD.order_date', -1)};
+            {move_order('NEW.order_date', 1)};
+        END""",
+    ]
+
+
+def next_period(period):
+    """The month after a 'YYYY-MM' period"""
+    year, month = map(int, period.split('-'))
+    return f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+
+
+def _closed_through(cursor):
+    cursor.execute("SELECT MAX(period) FROM Period_Close")
+    return cursor.fetchone()[0] or ''
+
+
+def read_gst_rollup(cursor, direction, period_from=None, period_to=None):
+    """GST totals per rate, optionally limited to a range of months
+    
+    Closed months come from their Period_Snapshots rows and only the open
+    months are read from GST_Rollup. Periods are 'YYYY-MM' strings; both
+    ends are inclusive.
+    
+    Returns:
+        list of (gst_percent, base, gst, total, orders, lines), by rate
+    """
+    closed = _closed_through(cursor)
+    cursor.execute('''SELECT gst_percent, SUM(base_amount), SUM(gst_amount), SUM(total_amount),
+            SUM(order_count), SUM(line_count)
+        FROM (
+            SELECT gst_percent, base_amount, gst_amount, total_amount, order_count, line_count, period
+            FROM Period_Snapshots WHERE direction = ? AND hsn_code = ''
+            UNION ALL
+            SELECT gst_percent, base_amount, gst_amount, total_amount, order_count, line_count, period
+            FROM GST_Rollup WHERE direction = ? AND period > ?
+        )
+        WHERE period >= COALESCE(?, '') AND period <= COALESCE(?, '9999-99')
+        GROUP BY gst_percent
+        HAVING SUM(line_count) > 0
+        ORDER BY gst_percent''', (direction, direction, closed, period_from, period_to))
+    return cursor.fetchall()
+
+
+def read_gst_by_hsn(cursor, direction, period_from=None, period_to=None):
+    """GST totals per HSN code and rate, combining closed snapshots with open order lines
+    
+    Returns:
+        list of (hsn_code, gst_percent, base, gst, total, orders, lines)
+    """
+    line_table, _, header_table, key = GST_ROLLUP_SOURCES[direction]
+    closed = _closed_through(cursor)
+    open_from = max(next_period(closed) if closed else '', period_from or '')
+    open_to = next_period(period_to) if period_to else '9999-99'
+    cursor.execute(f'''SELECT hsn_code, gst_percent, SUM(base_amount), SUM(gst_amount), SUM(total_amount),
+            SUM(order_count), SUM(line_count)
+        FROM (
+            SELECT hsn_code, gst_percent, base_amount, gst_amount, total_amount, order_count, line_count
+            FROM Period_Snapshots
+            WHERE direction = ? AND hsn_code != ''
+            AND period >= COALESCE(?, '') AND period <= COALESCE(?, '9999-99')
+            UNION ALL
+            SELECT COALESCE(NULLIF(i.hsn_code, ''), '-'), l.gst_percent, SUM(l.rate * l.quantity),
+                SUM(COALESCE(l.gst_amount, 0)), SUM(COALESCE(l.total_price, 0)), COUNT(DISTINCT l.{key}), COUNT(*)
+            FROM {header_table} h
+            JOIN {line_table} l ON l.{key} = h.{key}
+            LEFT JOIN Items i ON i.item_id = l.item_id
+            WHERE h.order_date >= ? AND h.order_date < ?
+            GROUP BY 1, 2
+        )
+        GROUP BY hsn_code, gst_percent
+        HAVING SUM(line_count) > 0
+        ORDER BY hsn_code, gst_percent''', (direction, period_from, period_to, open_from, open_to))
+    return cursor.fetchall()
+
+
+# Full-text indexes: FTS5 table -> (content table, key column, indexed columns).
+# They are external-content tables, so only the terms are stored; triggers
+# keep them in step with the content table.
+SEARCH_INDEXES = {
+    'Items_FTS': ('Items', 'item_id', ('name', 'hsn_code', 'category')),
+    'Customers_FTS': ('Customers', 'customer_id', ('name', 'contact_person', 'gstin', 'phone', 'email')),
+    'Suppliers_FTS': ('Suppliers', 'supplier_id', ('name', 'contact_person', 'gstin', 'phone', 'email')),
+    'Receipts_FTS': ('Goods_Receipt', 'receipt_id', ('invoice_number', 'notes')),
+}
+
+
+def _search_index_step(fts_table, table, key, columns):
+    """Migration step creating, syncing and filling one FTS5 index
+    
+    Skipped when SQLite was built without FTS5; searches then fall back to
+    LIKE scans (see Database.search_items).
+    """
+    names = ", ".join(columns)
+    insert = (f"INSERT INTO {fts_table} (rowid, {names}) "
+              f"VALUES (NEW.{key}, {', '.join(f'NEW.{c}' for c in columns)})")
+    delete = (f"INSERT INTO {fts_table} ({fts_table}, rowid, {names}) "
+              f"VALUES ('delete', OLD.{key}, {', '.join(f'OLD.{c}' for c in columns)})")
+    prefix = f"trg_{fts_table.lower()}"
+    
+    def step(cursor):
+        try:
+            cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({names}, "
+                           f"content='{table}', content_rowid='{key}', prefix='2 3')")
+        except sqlite3.OperationalError:
+            return
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {prefix}_insert AFTER INSERT ON {table} "
+                       f"BEGIN {insert}; END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {prefix}_update AFTER UPDATE OF {names} ON {table} "
+                       f"BEGIN {delete}; {insert}; END")
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {prefix}_delete AFTER DELETE ON {table} "
+                       f"BEGIN {delete}; END")
+        cursor.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+    return step
+
+
+def fts_query(text):
+    """FTS5 query in which every word of text must start a term ("dell lap" -> "dell"* "lap"*)"""
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+def read_counters(cursor):
+    """All Row_Counters as {counter: value}; usable with any connection"""
+    cursor.execute("SELECT counter, value FROM Row_Counters")
+    return dict(cursor.fetchall())
+
+
+MIGRATIONS = [
+    (1, "Foreign-key and lookup indexes", [
+        # Order lines are always read by their header
+        "CREATE INDEX IF NOT EXISTS idx_poi_po_item ON Purchase_Order_Items(po_number, item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_soi_so_item ON Sales_Order_Items(so_number, item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_poi_item ON Purchase_Order_Items(item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_soi_item ON Sales_Order_Items(item_id)",
+        # Goods receipts: PO completion check, invoice grouping, item usage
+        "CREATE INDEX IF NOT EXISTS idx_gr_po_item ON Goods_Receipt(po_number, item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_gr_invoice ON Goods_Receipt(invoice_number)",
+        "CREATE INDEX IF NOT EXISTS idx_gr_item ON Goods_Receipt(item_id)",
+        "CREATE INDEX IF NOT EXISTS idx_gr_supplier ON Goods_Receipt(supplier_id)",
+        # Headers by party
+        "CREATE INDEX IF NOT EXISTS idx_po_supplier ON Purchase_Orders(supplier_id)",
+        "CREATE INDEX IF NOT EXISTS idx_so_customer ON Sales_Orders(customer_id)",
+        # Invoices by order and customer
+        "CREATE INDEX IF NOT EXISTS idx_invoices_so ON Invoices(so_number)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_customer ON Invoices(customer_id)",
+    ]),
+    (2, "Store money as integer paise", [
+        _money_to_paise,
+    ]),
+    (3, "Received / rejected quantity on PO lines", [
+        # Running totals of Goods_Receipt per PO line; received_quantity counts
+        # accepted units only, since that is what completes a PO
+        _add_column('Purchase_Order_Items', 'received_quantity', 'INTEGER DEFAULT 0'),
+        _add_column('Purchase_Order_Items', 'rejected_quantity', 'INTEGER DEFAULT 0'),
+        """UPDATE Purchase_Order_Items SET
+            received_quantity = (SELECT COALESCE(SUM(gr.accepted_quantity), 0) FROM Goods_Receipt gr
+                                 WHERE gr.po_number = Purchase_Order_Items.po_number
+                                 AND gr.item_id = Purchase_Order_Items.item_id),
+            rejected_quantity = (SELECT COALESCE(SUM(gr.rejected_quantity), 0) FROM Goods_Receipt gr
+                                 WHERE gr.po_number = Purchase_Order_Items.po_number
+                                 AND gr.item_id = Purchase_Order_Items.item_id)""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gr_insert_poi AFTER INSERT ON Goods_Receipt
+        BEGIN
+            UPDATE Purchase_Order_Items
+            SET received_quantity = received_quantity + COALESCE(NEW.accepted_quantity, 0),
+                rejected_quantity = rejected_quantity + COALESCE(NEW.rejected_quantity, 0)
+            WHERE po_number = NEW.po_number AND item_id = NEW.item_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gr_update_poi
+        AFTER UPDATE OF po_number, item_id, accepted_quantity, rejected_quantity ON Goods_Receipt
+        BEGIN
+            UPDATE Purchase_Order_Items
+            SET received_quantity = received_quantity - COALESCE(OLD.accepted_quantity, 0),
+                rejected_quantity = rejected_quantity - COALESCE(OLD.rejected_quantity, 0)
+            WHERE po_number = OLD.po_number AND item_id = OLD.item_id;
+            UPDATE Purchase_Order_Items
+            SET received_quantity = received_quantity + COALESCE(NEW.accepted_quantity, 0),
+                rejected_quantity = rejected_quantity + COALESCE(NEW.rejected_quantity, 0)
+            WHERE po_number = NEW.po_number AND item_id = NEW.item_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_gr_delete_poi AFTER DELETE ON Goods_Receipt
+        BEGIN
+            UPDATE Purchase_Order_Items
+            SET received_quantity = received_quantity - COALESCE(OLD.accepted_quantity, 0),
+                rejected_quantity = rejected_quantity - COALESCE(OLD.rejected_quantity, 0)
+            WHERE po_number = OLD.po_number AND item_id = OLD.item_id;
+        END""",
+    ]),
+    (4, "Delivery notes and delivered quantity on SO lines", [
+        _add_column('Sales_Order_Items', 'delivered_quantity', 'INTEGER DEFAULT 0'),
+        "CREATE INDEX IF NOT EXISTS idx_dn_so ON Delivery_Notes(so_number)",
+        "CREATE INDEX IF NOT EXISTS idx_dni_note ON Delivery_Note_Items(note_id)",
+        "CREATE INDEX IF NOT EXISTS idx_dni_so_item ON Delivery_Note_Items(so_item_id)",
+        """CREATE TRIGGER IF NOT EXISTS trg_dni_insert_soi AFTER INSERT ON Delivery_Note_Items
+        BEGIN
+            UPDATE Sales_Order_Items SET delivered_quantity = delivered_quantity + NEW.quantity
+            WHERE so_item_id = NEW.so_item_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_dni_update_soi AFTER UPDATE OF so_item_id, quantity ON Delivery_Note_Items
+        BEGIN
+            UPDATE Sales_Order_Items SET delivered_quantity = delivered_quantity - OLD.quantity
+            WHERE so_item_id = OLD.so_item_id;
+            UPDATE Sales_Order_Items SET delivered_quantity = delivered_quantity + NEW.quantity
+            WHERE so_item_id = NEW.so_item_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_dni_delete_soi AFTER DELETE ON Delivery_Note_Items
+        BEGIN
+            UPDATE Sales_Order_Items SET delivered_quantity = delivered_quantity - OLD.quantity
+            WHERE so_item_id = OLD.so_item_id;
+        END""",
+        # Fully delivered orders shipped every line in full. How much of a
+        # partially delivered order went out was never recorded, so those
+        # start at zero and the remainder is delivered through Edit Delivery.
+        """INSERT INTO Delivery_Notes (so_number, customer_id, delivery_date, created_at, notes)
+            SELECT so.so_number, so.customer_id, so.delivery_date, CURRENT_TIMESTAMP, 'Backfilled'
+            FROM Sales_Orders so
+            WHERE so.status = 'Delivered'
+            AND NOT EXISTS (SELECT 1 FROM Delivery_Notes dn WHERE dn.so_number = so.so_number)""",
+        """INSERT INTO Delivery_Note_Items (note_id, so_item_id, item_id, quantity)
+            SELECT dn.note_id, soi.so_item_id, soi.item_id, soi.quantity
+            FROM Delivery_Notes dn
+            JOIN Sales_Order_Items soi ON soi.so_number = dn.so_number
+            WHERE dn.notes = 'Backfilled'
+            AND NOT EXISTS (SELECT 1 FROM Delivery_Note_Items dni WHERE dni.note_id = dn.note_id)""",
+    ]),
+    (5, "Stock movement ledger and snapshots", [
+        "CREATE INDEX IF NOT EXISTS idx_sm_item_time ON Stock_Movements(item_id, movement_time)",
+        "CREATE INDEX IF NOT EXISTS idx_sm_source ON Stock_Movements(source_type, source_id)",
+        # Current stock becomes the opening balance of the ledger
+        """INSERT INTO Stock_Movements (item_id, delta, source_type, source_id, movement_time)
+            SELECT inv.item_id, inv.quantity_on_hand, 'opening', inv.item_id,
+                COALESCE(inv.last_updated, CURRENT_TIMESTAMP)
+            FROM Inventory inv
+            WHERE inv.quantity_on_hand != 0
+            AND NOT EXISTS (SELECT 1 FROM Stock_Movements sm WHERE sm.item_id = inv.item_id)""",
+    ]),
+    (6, "Trigger-maintained row counters", [
+        step for table, status_column in COUNTED_TABLES.items()
+        for step in _counter_steps(table, status_column)
+    ]),
+    (7, "GST rollup by direction, rate and month", [
+        step for direction, source in GST_ROLLUP_SOURCES.items()
+        for step in _gst_rollup_steps(direction, *source)
+    ]),
+    (8, "Order date indexes for period close", [
+        # Month ranges of orders (HSN snapshots and open-period reads)
+        "CREATE INDEX IF NOT EXISTS idx_so_order_date ON Sales_Orders(order_date)",
+        "CREATE INDEX IF NOT EXISTS idx_po_order_date ON Purchase_Orders(order_date)",
+    ]),
+    (9, "Sort and filter indexes for list tabs", [
+        # Status filters and amount / date sorts of the order and invoice lists
+        "CREATE INDEX IF NOT EXISTS idx_po_status ON Purchase_Orders(status)",
+        "CREATE INDEX IF NOT EXISTS idx_po_total ON Purchase_Orders(total_amount)",
+        "CREATE INDEX IF NOT EXISTS idx_so_status ON Sales_Orders(status)",
+        "CREATE INDEX IF NOT EXISTS idx_so_total ON Sales_Orders(total_amount)",
+        "CREATE INDEX IF NOT EXISTS idx_so_delivery_date ON Sales_Orders(delivery_date)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_status ON Invoices(status)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_date ON Invoices(invoice_date)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_due ON Invoices(due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_invoices_total ON Invoices(total_amount)",
+        "CREATE INDEX IF NOT EXISTS idx_gr_date ON Goods_Receipt(receipt_date)",
+        # Case-insensitive name prefix filters and name sorts
+        "CREATE INDEX IF NOT EXISTS idx_suppliers_name ON Suppliers(name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_customers_name ON Customers(name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_items_name ON Items(name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_items_category ON Items(category COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_inventory_qty ON Inventory(quantity_on_hand)",
+    ]),
+    (10, "Full-text item search", [
+        _search_index_step('Items_FTS', *SEARCH_INDEXES['Items_FTS']),
+    ]),
+    (11, "Full-text search of customers, suppliers and receipts", [
+        _search_index_step(fts_table, *SEARCH_INDEXES[fts_table])
+        for fts_table in ('Customers_FTS', 'Suppliers_FTS', 'Receipts_FTS')
+    ]),
+]
+
+
+# ==================== PERFORMANCE PROFILES ====================
+# Connection-level PRAGMAs applied at connect time. WAL lets readers run
+# alongside a writer; synchronous controls how often SQLite fsyncs.
+#   durable   - fsync on every commit, safest on power loss
+#   balanced  - fsync at WAL checkpoints only (default for the app)
+#   bulk-load - no fsync at all, for imports and test-data generation
+
+PERFORMANCE_PROFILES = {
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'mmap_size': 0,
+        'cache_size': -8000,          # negative = KiB, ~8 MB
+        'temp_store': 'DEFAULT',
+    },
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -32000,         # ~32 MB
+        'temp_store': 'MEMORY',
+    },
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -128000,        # ~128 MB
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+# Line table and header key for each order type (see insert_order_lines)
+ORDER_LINE_TABLES = {
+    'purchase': ('Purchase_Order_Items', 'po_number'),
+    'sales': ('Sales_Order_Items', 'so_number'),
+}
+
+
+# ==================== BASE SCHEMA ====================
+# Tables of a new database. Later changes to existing tables go in
+# MIGRATIONS; SCHEMA_FINGERPRINT changes whenever either list does.
+
+SCHEMA_TABLES = [
+    # COMPANY DETAILS TABLE (for company information)
+    # FIXED: Removed CHECK constraint from column definition
+    '''
+        CREATE TABLE IF NOT EXISTS Company_Details (
+            id INTEGER PRIMARY KEY,
+            company_name TEXT NOT NULL,
+            legal_name TEXT,
+            gstin TEXT,
+            pan TEXT,
+            address_line1 TEXT,
+            address_line2 TEXT,
+            city TEXT,
+            state TEXT,
+            pincode TEXT,
+            country TEXT DEFAULT 'India',
+            phone TEXT,
+            email TEXT,
+            website TEXT,
+            logo_path TEXT,
+            financial_year_start TEXT,
+            created_date DATE,
+            last_updated DATE
+        )
+    ''',
+    # SHARED TABLES (used by both Purchase and Sales)
+
+    # Items table - Now with GST rates
+    '''
+        CREATE TABLE IF NOT EXISTS Items (
+            item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            description TEXT,
+            category TEXT,
+            unit_of_measure TEXT,
+            purchase_rate INTEGER,
+            purchase_gst_percent REAL DEFAULT 18.0,
+            purchase_price INTEGER,
+            selling_rate INTEGER,
+            selling_gst_percent REAL DEFAULT 18.0,
+            selling_price INTEGER,
+            hsn_code TEXT
+        )
+    ''',
+
+    # Inventory table
+    '''
+        CREATE TABLE IF NOT EXISTS Inventory (
+            item_id INTEGER PRIMARY KEY,
+            quantity_on_hand INTEGER DEFAULT 0,
+            reorder_level INTEGER DEFAULT 10,
+            location TEXT,
+            last_updated TIMESTAMP,
+            FOREIGN KEY (item_id) REFERENCES Items(item_id)
+        )
+    ''',
+
+    # PURCHASE DEPARTMENT TABLES
+
+    # Suppliers table - with GST details
+    '''
+        CREATE TABLE IF NOT EXISTS Suppliers (
+            supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact_person TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            gstin TEXT,
+            payment_terms TEXT
+        )
+    ''',
+
+    # Purchase Orders table - with GST breakdown
+    '''
+        CREATE TABLE IF NOT EXISTS Purchase_Orders (
+            po_number INTEGER PRIMARY KEY AUTOINCREMENT,
+            supplier_id INTEGER,
+            order_date DATE,
+            expected_delivery DATE,
+            status TEXT DEFAULT 'Pending',
+            subtotal INTEGER,
+            total_gst INTEGER,
+            total_amount INTEGER,
+            FOREIGN KEY (supplier_id) REFERENCES Suppliers(supplier_id)
+        )
+    ''',
+
+    # Purchase Order Items table - with GST per item
+    '''
+        CREATE TABLE IF NOT EXISTS Purchase_Order_Items (
+            po_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_number INTEGER,
+            item_id INTEGER,
+            quantity INTEGER,
+            rate INTEGER,
+            gst_percent REAL,
+            gst_amount INTEGER,
+            total_price INTEGER,
+            received_quantity INTEGER DEFAULT 0,
+            rejected_quantity INTEGER DEFAULT 0,
+            FOREIGN KEY (po_number) REFERENCES Purchase_Orders(po_number),
+            FOREIGN KEY (item_id) REFERENCES Items(item_id)
+        )
+    ''',
+
+    # Goods Receipt table
+    '''
+        CREATE TABLE IF NOT EXISTS Goods_Receipt (
+            receipt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            po_number INTEGER,
+            item_id INTEGER,
+            supplier_id INTEGER,
+            invoice_number TEXT,
+            received_quantity INTEGER,
+            accepted_quantity INTEGER,
+            rejected_quantity INTEGER,
+            receipt_date DATE,
+            notes TEXT,
+            FOREIGN KEY (po_number) REFERENCES Purchase_Orders(po_number),
+            FOREIGN KEY (item_id) REFERENCES Items(item_id),
+            FOREIGN KEY (supplier_id) REFERENCES Suppliers(supplier_id)
+        )
+    ''',
+
+    # SALES DEPARTMENT TABLES
+
+    # Customers table - with GST details
+    '''
+        CREATE TABLE IF NOT EXISTS Customers (
+            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            contact_person TEXT,
+            phone TEXT,
+            email TEXT,
+            address TEXT,
+            gstin TEXT,
+            credit_limit INTEGER,
+            payment_terms TEXT
+        )
+    ''',
+
+    # Sales Orders table - with GST breakdown
+    '''
+        CREATE TABLE IF NOT EXISTS Sales_Orders (
+            so_number INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            order_date DATE,
+            delivery_date DATE,
+            status TEXT DEFAULT 'Pending',
+            subtotal INTEGER,
+            total_gst INTEGER,
+            total_amount INTEGER,
+            FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+        )
+    ''',
+
+    # Sales Order Items table - with GST per item
+    '''
+        CREATE TABLE IF NOT EXISTS Sales_Order_Items (
+            so_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            so_number INTEGER,
+            item_id INTEGER,
+            quantity INTEGER,
+            rate INTEGER,
+            gst_percent REAL,
+            gst_amount INTEGER,
+            total_price INTEGER,
+            delivered_quantity INTEGER DEFAULT 0,
+            FOREIGN KEY (so_number) REFERENCES Sales_Orders(so_number),
+            FOREIGN KEY (item_id) REFERENCES Items(item_id)
+        )
+    ''',
+
+    # Delivery notes - one per dispatch against a sales order
+    '''
+        CREATE TABLE IF NOT EXISTS Delivery_Notes (
+            note_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            so_number INTEGER,
+            customer_id INTEGER,
+            delivery_date DATE,
+            created_at TIMESTAMP,
+            notes TEXT,
+            FOREIGN KEY (so_number) REFERENCES Sales_Orders(so_number),
+            FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+        )
+    ''',
+
+    # Delivery note lines - quantity shipped per sales order line
+    '''
+        CREATE TABLE IF NOT EXISTS Delivery_Note_Items (
+            note_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            note_id INTEGER,
+            so_item_id INTEGER,
+            item_id INTEGER,
+            quantity INTEGER,
+            FOREIGN KEY (note_id) REFERENCES Delivery_Notes(note_id),
+            FOREIGN KEY (so_item_id) REFERENCES Sales_Order_Items(so_item_id),
+            FOREIGN KEY (item_id) REFERENCES Items(item_id)
+        )
+    ''',
+
+    # Invoices table - with GST breakdown
+    '''
+        CREATE TABLE IF NOT EXISTS Invoices (
+            invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            so_number INTEGER,
+            customer_id INTEGER,
+            invoice_date DATE,
+            due_date DATE,
+            subtotal INTEGER,
+            total_gst INTEGER,
+            total_amount INTEGER,
+            status TEXT DEFAULT 'Unpaid',
+            FOREIGN KEY (so_number) REFERENCES Sales_Orders(so_number),
+            FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
+        )
+    ''',
+
+    # Stock ledger - append-only, one row per item per posting
+    # source_type: opening | adjustment | receipt | receipt_edit | delivery | item_deleted
+    # source_id: item_id, po_number or delivery note_id depending on source_type
+    '''
+        CREATE TABLE IF NOT EXISTS Stock_Movements (
+            movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            item_id INTEGER,
+            delta INTEGER,
+            source_type TEXT,
+            source_id INTEGER,
+            movement_time TIMESTAMP,
+            FOREIGN KEY (item_id) REFERENCES Items(item_id)
+        )
+    ''',
+
+    # Stock snapshots - quantity on hand of every item at snapshot_time
+    '''
+        CREATE TABLE IF NOT EXISTS Stock_Snapshots (
+            snapshot_time TIMESTAMP,
+            item_id INTEGER,
+            quantity INTEGER,
+            PRIMARY KEY (snapshot_time, item_id)
+        )
+    ''',
+
+    # Row counters - COUNT(*) per table and per status, kept by triggers
+    # (see COUNTED_TABLES); read with get_counter()
+    '''
+        CREATE TABLE IF NOT EXISTS Row_Counters (
+            counter TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''',
+
+    # GST rollup - order line totals per direction ('output' = sales,
+    # 'input' = purchases), GST rate and order month; kept by triggers
+    '''
+        CREATE TABLE IF NOT EXISTS GST_Rollup (
+            direction TEXT,
+            gst_percent REAL,
+            period TEXT,
+            base_amount INTEGER DEFAULT 0,
+            gst_amount INTEGER DEFAULT 0,
+            total_amount INTEGER DEFAULT 0,
+            line_count INTEGER DEFAULT 0,
+            order_count INTEGER DEFAULT 0,
+            PRIMARY KEY (direction, gst_percent, period)
+        )
+    ''',
+
+    # Period close - every month up to MAX(period) is closed
+    '''
+        CREATE TABLE IF NOT EXISTS Period_Close (
+            period TEXT PRIMARY KEY,
+            closed_at TIMESTAMP
+        )
+    ''',
+
+    # Frozen monthly GST totals of closed periods; hsn_code '' rows are
+    # the per-rate totals, the others the per-HSN breakdown
+    '''
+        CREATE TABLE IF NOT EXISTS Period_Snapshots (
+            period TEXT,
+            direction TEXT,
+            gst_percent REAL,
+            hsn_code TEXT,
+            base_amount INTEGER,
+            gst_amount INTEGER,
+            total_amount INTEGER,
+            line_count INTEGER,
+            order_count INTEGER,
+            PRIMARY KEY (direction, hsn_code, period, gst_percent)
+        )
+    ''',
+
+    # Schema version history (one row per applied migration)
+    '''
+        CREATE TABLE IF NOT EXISTS Schema_Version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP
+        )
+    ''',
+]
+
+
+def schema_fingerprint():
+    """Checksum of the table DDL and migration list (a positive 31-bit int)"""
+    text = "\n".join(" ".join(ddl.split()) for ddl in SCHEMA_TABLES)
+    text += "".join(f"\n{version}: {description}" for version, description, _ in MIGRATIONS)
+    return zlib.crc32(text.encode()) & 0x7FFFFFFF or 1
+
+
+# Stored in PRAGMA user_version once the schema is up to date
+SCHEMA_FINGERPRINT = schema_fingerprint()
+
 
 class Database:
-    def __init__(self, db_name='integrated_system.db'):
+    def __init__(self, db_name='integrated_system.db', profile=DEFAULT_PROFILE):
+        self.db_name = db_name
         self.conn = sqlite3.connect(db_name)
         self.cursor = self.conn.cursor()
+        self._tx_depth = 0
+        self.stats = None  # QueryStats when instrumentation is enabled
+        self.changes = ChangeBus()  # tables written, published on commit
+        self._dirty = set()
+        self._search_indexes = None  # FTS5 tables present, read on first search
+        self.apply_profile(profile)
         self.init_tables()
+        self._trigger_targets = trigger_targets(self.cursor)
+    
+    def apply_profile(self, profile):
+        """Apply a named performance profile (see PERFORMANCE_PROFILES)"""
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(f"Unknown performance profile: {profile}")
+        settings = PERFORMANCE_PROFILES[profile]
+        for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store'):
+            self.cursor.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+        self.profile = profile
+    
+    def profile_settings(self):
+        """Read back the PRAGMA values actually in effect"""
+        settings = {}
+        for pragma in ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store'):
+            self.cursor.execute(f"PRAGMA {pragma}")
+            settings[pragma] = self.cursor.fetchone()[0]
+        return settings
     
     def init_tables(self):
-        """Initialize all database tables with GST support"""
-        # COMPANY DETAILS TABLE (for company information)
-        # FIXED: Removed CHECK constraint from column definition
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Company_Details (
-                id INTEGER PRIMARY KEY,
-                company_name TEXT NOT NULL,
-                legal_name TEXT,
-                gstin TEXT,
-                pan TEXT,
-                address_line1 TEXT,
-                address_line2 TEXT,
-                city TEXT,
-                state TEXT,
-                pincode TEXT,
-                country TEXT DEFAULT 'India',
-                phone TEXT,
-                email TEXT,
-                website TEXT,
-                logo_path TEXT,
-                financial_year_start TEXT,
-                created_date DATE,
-                last_updated DATE
-            )
-        ''')  
-        # SHARED TABLES (used by both Purchase and Sales)
-        
-        # Items table - Now with GST rates
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Items (
-                item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT,
-                category TEXT,
-                unit_of_measure TEXT,
-                purchase_rate REAL,
-                purchase_gst_percent REAL DEFAULT 18.0,
-                purchase_price REAL,
-                selling_rate REAL,
-                selling_gst_percent REAL DEFAULT 18.0,
-                selling_price REAL,
-                hsn_code TEXT
-            )
-        ''')
-        
-        # Inventory table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Inventory (
-                item_id INTEGER PRIMARY KEY,
-                quantity_on_hand INTEGER DEFAULT 0,
-                reorder_level INTEGER DEFAULT 10,
-                location TEXT,
-                last_updated TIMESTAMP,
-                FOREIGN KEY (item_id) REFERENCES Items(item_id)
-            )
-        ''')
-        
-        # PURCHASE DEPARTMENT TABLES
-        
-        # Suppliers table - with GST details
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Suppliers (
-                supplier_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                contact_person TEXT,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                gstin TEXT,
-                payment_terms TEXT
-            )
-        ''')
-        
-        # Purchase Orders table - with GST breakdown
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Purchase_Orders (
-                po_number INTEGER PRIMARY KEY AUTOINCREMENT,
-                supplier_id INTEGER,
-                order_date DATE,
-                expected_delivery DATE,
-                status TEXT DEFAULT 'Pending',
-                subtotal REAL,
-                total_gst REAL,
-                total_amount REAL,
-                FOREIGN KEY (supplier_id) REFERENCES Suppliers(supplier_id)
-            )
-        ''')
-        
-        # Purchase Order Items table - with GST per item
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Purchase_Order_Items (
-                po_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                po_number INTEGER,
-                item_id INTEGER,
-                quantity INTEGER,
-                rate REAL,
-                gst_percent REAL,
-                gst_amount REAL,
-                total_price REAL,
-                FOREIGN KEY (po_number) REFERENCES Purchase_Orders(po_number),
-                FOREIGN KEY (item_id) REFERENCES Items(item_id)
-            )
-        ''')
-        
-        # Goods Receipt table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Goods_Receipt (
-                receipt_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                po_number INTEGER,
-                item_id INTEGER,
-                supplier_id INTEGER,
-                invoice_number TEXT,
-                received_quantity INTEGER,
-                accepted_quantity INTEGER,
-                rejected_quantity INTEGER,
-                receipt_date DATE,
-                notes TEXT,
-                FOREIGN KEY (po_number) REFERENCES Purchase_Orders(po_number),
-                FOREIGN KEY (item_id) REFERENCES Items(item_id),
-                FOREIGN KEY (supplier_id) REFERENCES Suppliers(supplier_id)
-            )
-        ''')
-        
-        # SALES DEPARTMENT TABLES
-        
-        # Customers table - with GST details
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Customers (
-                customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                contact_person TEXT,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                gstin TEXT,
-                credit_limit REAL,
-                payment_terms TEXT
-            )
-        ''')
-        
-        # Sales Orders table - with GST breakdown
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Sales_Orders (
-                so_number INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER,
-                order_date DATE,
-                delivery_date DATE,
-                status TEXT DEFAULT 'Pending',
-                subtotal REAL,
-                total_gst REAL,
-                total_amount REAL,
-                FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
-            )
-        ''')
-        
-        # Sales Order Items table - with GST per item
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Sales_Order_Items (
-                so_item_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                so_number INTEGER,
-                item_id INTEGER,
-                quantity INTEGER,
-                rate REAL,
-                gst_percent REAL,
-                gst_amount REAL,
-                total_price REAL,
-                FOREIGN KEY (so_number) REFERENCES Sales_Orders(so_number),
-                FOREIGN KEY (item_id) REFERENCES Items(item_id)
-            )
-        ''')
-        
-        # Invoices table - with GST breakdown
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Invoices (
-                invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                so_number INTEGER,
-                customer_id INTEGER,
-                invoice_date DATE,
-                due_date DATE,
-                subtotal REAL,
-                total_gst REAL,
-                total_amount REAL,
-                status TEXT DEFAULT 'Unpaid',
-                FOREIGN KEY (so_number) REFERENCES Sales_Orders(so_number),
-                FOREIGN KEY (customer_id) REFERENCES Customers(customer_id)
-            )
-        ''')
+        """Create missing tables and apply pending migrations
         
+        PRAGMA user_version holds the SCHEMA_FINGERPRINT the database was
+        last brought up to, so a warm start is a single pragma read and the
+        DDL only runs for new or outdated databases.
+        """
+        self.cursor.execute("PRAGMA user_version")
+        if self.cursor.fetchone()[0] == SCHEMA_FINGERPRINT:
+            return
+        for ddl in SCHEMA_TABLES:
+            self.cursor.execute(ddl)
         self.conn.commit()
+        self.run_migrations()
+        self.cursor.execute(f"PRAGMA user_version = {SCHEMA_FINGERPRINT}")
+    
+    def schema_version(self):
+        """Get the highest applied migration version"""
+        self.cursor.execute("SELECT COALESCE(MAX(version), 0) FROM Schema_Version")
+        return self.cursor.fetchone()[0]
+    
+    def run_migrations(self):
+        """Apply pending migrations in order, each in its own transaction"""
+        current = self.schema_version()
+        for version, description, steps in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.transaction():
+                for step in steps:
+                    if callable(step):
+                        step(self.cursor)
+                    else:
+                        self.cursor.execute(step)
+                self.cursor.execute(
+                    "INSERT INTO Schema_Version (version, description, applied_at) VALUES (?, ?, ?)",
+                    (version, description, datetime.now()))
+    
+    def enable_instrumentation(self, slow_ms=50):
+        """Start timing every statement run through execute()/executemany()
+        
+        Statements slower than slow_ms are logged with their caller.
+        Returns the QueryStats collector (also available as self.stats).
+        """
+        from instrumentation import QueryStats
+        self.stats = QueryStats(slow_ms=slow_ms)
+        return self.stats
+    
+    def disable_instrumentation(self):
+        """Stop timing statements"""
+        self.stats = None
     
     def execute(self, query, params=()):
         """Execute a query"""
+        self._track(query)
+        if self.stats is not None:
+            return self.stats.timed(self.cursor.execute, query, params)
         return self.cursor.execute(query, params)
     
+    def executemany(self, query, seq_of_params):
+        """Execute a query once per parameter tuple"""
+        self._track(query)
+        if self.stats is not None:
+            return self.stats.timed(self.cursor.executemany, query, seq_of_params)
+        return self.cursor.executemany(query, seq_of_params)
+    
     def fetchall(self):
         """Fetch all results"""
         return self.cursor.fetchall()
@@ -215,8 +935,70 @@ class Database:
         return self.cursor.fetchone()
     
     def commit(self):
-        """Commit changes"""
-        self.conn.commit()
+        """Commit changes (deferred to the outermost transaction() block)"""
+        if self._tx_depth == 0:
+            self.conn.commit()
+            self._publish()
+    
+    def rollback(self):
+        """Roll back the current transaction"""
+        self.conn.rollback()
+        self._dirty.clear()
+    
+    def _track(self, query):
+        """Remember the tables a write statement touches, including via triggers"""
+        table = written_table(query)
+        if table:
+            self._dirty.add(table)
+            self._dirty.update(self._trigger_targets.get(table, ()))
+    
+    def _publish(self):
+        """Tell subscribers which tables the committed transaction changed"""
+        if self._dirty:
+            tables, self._dirty = self._dirty, set()
+            self.changes.publish(tables)
+    
+    @contextmanager
+    def transaction(self, immediate=True):
+        """Run a block of statements as one transaction
+        
+        Commits once when the outermost block exits and rolls back if it
+        raises. Nested blocks become savepoints, so an inner failure only
+        undoes the inner block. BEGIN IMMEDIATE takes the write lock up
+        front instead of failing with "database is locked" half-way.
+        
+        Usage:
+            with db.transaction():
+                db.execute(...)
+        """
+        if self._tx_depth == 0:
+            # Statements already issued through execute() join this transaction
+            if not self.conn.in_transaction:
+                self.cursor.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                self.conn.rollback()
+                self._dirty.clear()
+                raise
+            self._tx_depth -= 1
+            self.conn.commit()
+            self._publish()
+        else:
+            savepoint = f"sp_{self._tx_depth}"
+            self.cursor.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._tx_depth -= 1
+                self.cursor.execute(f"ROLLBACK TO {savepoint}")
+                self.cursor.execute(f"RELEASE {savepoint}")
+                raise
+            self._tx_depth -= 1
+            self.cursor.execute(f"RELEASE {savepoint}")
     
     def lastrowid(self):
         """Get last inserted row ID"""
@@ -225,7 +1007,319 @@ class Database:
     def close(self):
         """Close database connection"""
         self.conn.close()
+    
+    def open_reader(self):
+        """Open a separate read-only connection with the same performance profile
+        
+        Used by QueryWorker, which calls this on its own thread. WAL mode lets
+        it read while this connection writes; it sees committed data only.
+        """
+        conn = sqlite3.connect(self.db_name)
+        settings = PERFORMANCE_PROFILES[self.profile]
+        for pragma in ('mmap_size', 'cache_size', 'temp_store'):
+            conn.execute(f"PRAGMA {pragma} = {settings[pragma]}")
+        conn.execute("PRAGMA query_only = ON")
+        return conn
+        
+    # ==================== BULK POSTING ====================
+    
+    def insert_order_lines(self, order_type, order_number, lines):
+        """Insert every line of a purchase or sales order in one executemany
+        
+        Args:
+            order_type: 'purchase' or 'sales'
+            order_number: po_number / so_number of the header row
+            lines: iterable of (item_id, quantity, rate, gst_percent, gst_amount, total_price)
+        """
+        table, key = ORDER_LINE_TABLES[order_type]
+        self.executemany(f"""INSERT INTO {table}
+            ({key}, item_id, quantity, rate, gst_percent, gst_amount, total_price)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [(order_number,) + tuple(line) for line in lines])
+    
+    def insert_goods_receipt_lines(self, rows):
+        """Insert goods receipt rows in one executemany
+        
+        Args:
+            rows: iterable of (po_number, item_id, supplier_id, invoice_number,
+                  received_quantity, accepted_quantity, rejected_quantity,
+                  receipt_date, notes)
+        """
+        self.executemany('''
+            INSERT INTO Goods_Receipt 
+            (po_number, item_id, supplier_id, invoice_number, received_quantity, 
+            accepted_quantity, rejected_quantity, receipt_date, notes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', list(rows))
+    
+    def apply_stock_deltas(self, deltas, source_type, source_id=None, when=None):
+        """Add signed quantities to Inventory.quantity_on_hand
+        
+        Deltas for the same item are summed first, so each item is updated
+        once no matter how many lines reference it. Every change is also
+        appended to the Stock_Movements ledger.
+        
+        Args:
+            deltas: iterable of (item_id, delta)
+            source_type: what caused the movement (see Stock_Movements)
+            source_id: the causing document (PO number, delivery note, item)
+            when: movement date/time, defaults to now
+        """
+        totals = {}
+        for item_id, delta in deltas:
+            totals[item_id] = totals.get(item_id, 0) + delta
+        changes = [(item_id, delta) for item_id, delta in totals.items() if delta != 0]
+        
+        now = datetime.now()
+        if when is None:
+            when = now
+        elif not isinstance(when, datetime):
+            # A bare date keeps today's clock time so same-day postings stay in order
+            when = datetime.combine(when, now.time())
+        
+        self.executemany('''
+            UPDATE Inventory 
+            SET quantity_on_hand = quantity_on_hand + ?, last_updated = ?
+            WHERE item_id = ?
+        ''', [(delta, now, item_id) for item_id, delta in changes])
+        self.executemany('''
+            INSERT INTO Stock_Movements (item_id, delta, source_type, source_id, movement_time)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(item_id, delta, source_type, source_id, when) for item_id, delta in changes])
+    
+    # ==================== STOCK LEDGER ====================
+    
+    def take_stock_snapshot(self):
+        """Record the ledger balance of every item as of now
         
+        Balances come from the ledger rather than Inventory so movements dated
+        after the snapshot (e.g. a delivery entered for tomorrow) are not
+        counted twice by stock_as_of.
+        """
+        now = datetime.now()
+        balances = self.stock_as_of(now)
+        self.executemany("INSERT INTO Stock_Snapshots (snapshot_time, item_id, quantity) VALUES (?, ?, ?)",
+                         [(now, item_id, quantity) for item_id, quantity in balances.items()])
+    
+    def ensure_stock_snapshot(self, max_age_days=1):
+        """Take a snapshot if the latest one is older than max_age_days"""
+        self.execute("SELECT MAX(snapshot_time) FROM Stock_Snapshots")
+        latest = self.fetchone()[0]
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        if latest is None or latest < str(cutoff):
+            with self.transaction():
+                self.take_stock_snapshot()
+    
+    def stock_as_of(self, as_of, item_id=None):
+        """Quantity on hand at the end of as_of (a date or datetime)
+        
+        Starts from the latest snapshot at or before as_of and adds the
+        ledger movements after it, which is one index range read per item.
+        
+        Returns:
+            {item_id: quantity}, or a single quantity when item_id is given
+        """
+        if not isinstance(as_of, datetime):
+            as_of = datetime.combine(as_of, time.max)
+        self.execute("SELECT MAX(snapshot_time) FROM Stock_Snapshots WHERE snapshot_time <= ?", (as_of,))
+        snapshot_time = self.fetchone()[0] or ''
+        
+        query = '''SELECT i.item_id,
+                COALESCE((SELECT s.quantity FROM Stock_Snapshots s
+                          WHERE s.snapshot_time = ? AND s.item_id = i.item_id), 0)
+                + COALESCE((SELECT SUM(m.delta) FROM Stock_Movements m
+                            WHERE m.item_id = i.item_id AND m.movement_time > ? AND m.movement_time <= ?), 0)
+            FROM Items i'''
+        params = (snapshot_time, snapshot_time, as_of)
+        if item_id is not None:
+            self.execute(query + " WHERE i.item_id = ?", params + (item_id,))
+            row = self.fetchone()
+            return row[1] if row else 0
+        self.execute(query, params)
+        return dict(self.fetchall())
+    
+    def stock_movements(self, item_id, since=None):
+        """Ledger rows for one item with the running balance after each
+        
+        Returns:
+            list of (movement_time, source_type, source_id, delta, balance)
+        """
+        opening = 0
+        since_time = ''
+        if since is not None:
+            opening = self.stock_as_of(since, item_id)
+            since_time = datetime.combine(since, time.max) if not isinstance(since, datetime) else since
+        self.execute('''SELECT movement_time, source_type, source_id, delta,
+                ? + SUM(delta) OVER (ORDER BY movement_time, movement_id)
+            FROM Stock_Movements
+            WHERE item_id = ? AND movement_time > ?
+            ORDER BY movement_time, movement_id''', (opening, item_id, since_time))
+        return self.fetchall()
+    
+    def update_po_status(self, po_number):
+        """Set a PO to Completed or Partially Received from its line totals
+        
+        Reads the trigger-maintained received_quantity, so this only touches
+        the lines of one PO. Returns the new status.
+        """
+        self.execute("""SELECT COUNT(*) FROM Purchase_Order_Items
+            WHERE po_number = ? AND quantity > received_quantity""", (po_number,))
+        status = "Completed" if self.fetchone()[0] == 0 else "Partially Received"
+        self.execute("UPDATE Purchase_Orders SET status = ? WHERE po_number = ?", (status, po_number))
+        return status
+    
+    def record_delivery(self, so_number, lines, delivery_date=None, notes=None):
+        """Post a delivery note against a sales order
+        
+        Writes the note header and its lines, takes the stock out of
+        Inventory and updates the order status. Triggers keep
+        Sales_Order_Items.delivered_quantity in step with the note lines.
+        Call inside transaction().
+        
+        Args:
+            so_number: sales order being delivered
+            lines: iterable of (so_item_id, item_id, quantity); zero lines are skipped
+            delivery_date: defaults to today
+        
+        Returns:
+            (note_id, new_status)
+        """
+        lines = [line for line in lines if line[2] > 0]
+        delivery_date = delivery_date or datetime.now().date()
+        
+        self.execute("""INSERT INTO Delivery_Notes (so_number, customer_id, delivery_date, created_at, notes)
+            SELECT so_number, customer_id, ?, ?, ? FROM Sales_Orders WHERE so_number = ?""",
+            (delivery_date, datetime.now(), notes, so_number))
+        note_id = self.lastrowid()
+        self.executemany("""INSERT INTO Delivery_Note_Items (note_id, so_item_id, item_id, quantity)
+            VALUES (?, ?, ?, ?)""",
+            [(note_id, so_item_id, item_id, quantity) for so_item_id, item_id, quantity in lines])
+        self.apply_stock_deltas(((item_id, -quantity) for _, item_id, quantity in lines),
+                                'delivery', note_id, delivery_date)
+        
+        self.execute("""SELECT COUNT(*) FROM Sales_Order_Items
+            WHERE so_number = ? AND quantity > delivered_quantity""", (so_number,))
+        status = "Delivered" if self.fetchone()[0] == 0 else "Partially Delivered"
+        self.execute("UPDATE Sales_Orders SET status = ?, delivery_date = ? WHERE so_number = ?",
+                     (status, delivery_date, so_number))
+        return note_id, status
+    
+    # ==================== ROW COUNTERS ====================
+    
+    def get_counter(self, table, status=None):
+        """Number of rows in table (optionally with the given status) without a COUNT(*) scan"""
+        counter = f"{table}:{status}" if status is not None else table
+        self.execute("SELECT value FROM Row_Counters WHERE counter = ?", (counter,))
+        row = self.fetchone()
+        return row[0] if row else 0
+    
+    def get_counters(self):
+        """Every counter as {counter: value}, e.g. {'Invoices': 8, 'Invoices:Unpaid': 5}"""
+        return read_counters(self.cursor)
+    
+    def gst_by_rate(self, direction, period_from=None, period_to=None):
+        """GST totals per rate for 'output' (sales) or 'input' (purchases); see read_gst_rollup"""
+        return read_gst_rollup(self.cursor, direction, period_from, period_to)
+    
+    # ==================== SEARCH ====================
+    
+    def has_search_index(self, fts_table):
+        """Whether the FTS5 index exists (it is not created when SQLite lacks FTS5)"""
+        if self._search_indexes is None:
+            self.cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%_FTS'")
+            self._search_indexes = {row[0] for row in self.cursor.fetchall()}
+        return fts_table in self._search_indexes
+    
+    def search(self, fts_table, text, limit=20, select=None, joins="", where="", params=(), alias="t"):
+        """Rows of an indexed table matching what the user typed, best matches first
+        
+        Every word of text must start a word in one of the table's indexed
+        columns (SEARCH_INDEXES), so "dell lap" finds "Laptop - Dell
+        Inspiron". Callers pick the columns (the table is aliased alias) and
+        may narrow the rows with extra joins and a where condition taking
+        params. Empty text lists rows by the first indexed column.
+        """
+        table, key, columns = SEARCH_INDEXES[fts_table]
+        select = select or f"{alias}.{key}"
+        condition = f"AND {where}" if where else ""
+        order = f"{alias}.{columns[0]} COLLATE NOCASE"
+        words = text.split()
+        if not words:
+            self.execute(f"""SELECT {select} FROM {table} {alias} {joins} WHERE 1 {condition}
+                ORDER BY {order} LIMIT ?""", (*params, limit))
+        elif self.has_search_index(fts_table):
+            # Earlier columns weigh more, e.g. an item's name above its category
+            weights = ", ".join(f"{10 / (n + 1):.1f}" for n in range(len(columns)))
+            self.execute(f"""SELECT {select} FROM {fts_table}
+                JOIN {table} {alias} ON {alias}.{key} = {fts_table}.rowid {joins}
+                WHERE {fts_table} MATCH ? {condition}
+                ORDER BY bm25({fts_table}, {weights}), {order} LIMIT ?""",
+                (fts_query(text), *params, limit))
+        else:
+            any_column = " OR ".join(f"{alias}.{column} LIKE ?" for column in columns)
+            like = " AND ".join([f"({any_column})"] * len(words))
+            patterns = [f"%{word}%" for word in words for _ in columns]
+            self.execute(f"""SELECT {select} FROM {table} {alias} {joins} WHERE {like} {condition}
+                ORDER BY {order} LIMIT ?""", (*patterns, *params, limit))
+        return self.fetchall()
+    
+    def search_items(self, text, limit=20, select="i.item_id, i.name", joins="", where="", params=()):
+        """Items matching what the user typed by name, HSN code or category (see search)"""
+        return self.search('Items_FTS', text, limit, select, joins, where, params, alias='i')
+    
+    # ==================== PERIOD CLOSE ====================
+    
+    def closed_through(self):
+        """Last closed month ('YYYY-MM'), or None if nothing is closed"""
+        return _closed_through(self.cursor) or None
+    
+    def closable_periods(self):
+        """Open months before the current one that have orders, oldest first"""
+        self.execute('''SELECT DISTINCT period FROM GST_Rollup
+            WHERE period > ? AND period < ? AND line_count > 0
+            ORDER BY period''', (_closed_through(self.cursor), datetime.now().strftime('%Y-%m')))
+        return [row[0] for row in self.fetchall()]
+    
+    def close_period(self, period):
+        """Close every open month up to and including period
+        
+        Freezes each month's GST totals per rate (from GST_Rollup) and per
+        HSN code and rate (from the order lines) into Period_Snapshots.
+        Reports then read closed months from the snapshots only.
+        
+        Returns:
+            number of months with orders that were closed
+        """
+        if period >= datetime.now().strftime('%Y-%m'):
+            raise ValueError("Only months before the current one can be closed")
+        closed = _closed_through(self.cursor)
+        if period <= closed:
+            raise ValueError(f"{period} is already closed")
+        months = [p for p in self.closable_periods() if p <= period]
+        range_from = next_period(closed) + '-01' if closed else ''
+        range_to = next_period(period) + '-01'
+        
+        with self.transaction():
+            self.execute('''INSERT INTO Period_Snapshots (period, direction, gst_percent, hsn_code,
+                    base_amount, gst_amount, total_amount, line_count, order_count)
+                SELECT period, direction, gst_percent, '', base_amount, gst_amount, total_amount,
+                    line_count, order_count
+                FROM GST_Rollup WHERE period > ? AND period <= ? AND line_count > 0''', (closed, period))
+            for direction, (line_table, _, header_table, key) in GST_ROLLUP_SOURCES.items():
+                self.execute(f'''INSERT INTO Period_Snapshots (period, direction, gst_percent, hsn_code,
+                        base_amount, gst_amount, total_amount, line_count, order_count)
+                    SELECT strftime('%Y-%m', h.order_date), ?, l.gst_percent,
+                        COALESCE(NULLIF(i.hsn_code, ''), '-'), SUM(l.rate * l.quantity),
+                        SUM(COALESCE(l.gst_amount, 0)), SUM(COALESCE(l.total_price, 0)), COUNT(*),
+                        COUNT(DISTINCT l.{key})
+                    FROM {header_table} h
+                    JOIN {line_table} l ON l.{key} = h.{key}
+                    LEFT JOIN Items i ON i.item_id = l.item_id
+                    WHERE h.order_date >= ? AND h.order_date < ?
+                    GROUP BY 1, 3, 4''', (direction, range_from, range_to))
+            self.execute("INSERT INTO Period_Close (period, closed_at) VALUES (?, ?)", (period, datetime.now()))
+        return len(months)
+    
     def company_exists(self):
         """Check if company details exist"""
         self.cursor.execute("SELECT COUNT(*) FROM Company_Details WHERE id = 1")
@@ -246,7 +1340,7 @@ class Database:
         """
         if self.company_exists():
             # Update existing record
-            self.cursor.execute('''
+            self.execute('''
                 UPDATE Company_Details SET
                     company_name=?, legal_name=?, gstin=?, pan=?,
                     address_line1=?, address_line2=?, city=?, state=?, pincode=?, country=?,
@@ -255,7 +1349,7 @@ class Database:
             ''', details + (datetime.now().date(),))
         else:
             # Insert new record
-            self.cursor.execute('''
+            self.execute('''
                 INSERT INTO Company_Details (
                     id, company_name, legal_name, gstin, pan,
                     address_line1, address_line2, city, state, pincode, country,
@@ -264,4 +1358,4 @@ class Database:
                 ) VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?, ?)
             ''', details + (datetime.now().date(), datetime.now().date()))
         
-        self.conn.commit()
\ No newline at end of file
+        self.commit()
\ No newline at end of file
@@ -6,6 +6,7 @@ Run this script to fill an empty database with realistic test data
 import sqlite3
 from datetime import datetime, timedelta
 import random
+from money import to_paise, line_amounts
 
 def check_database_empty(db_name='integrated_system.db'):
     """Check if database exists and is empty"""
@@ -27,7 +28,7 @@ def fill_database(db_name='integrated_system.db'):
     
     # First initialize database structure
     from database import Database
-    db = Database(db_name)
+    db = Database(db_name, profile='bulk-load')
     
     print("🔄 Filling database with test data...")
     
@@ -108,12 +109,15 @@ def fill_database(db_name='integrated_system.db'):
         db.execute("""INSERT INTO Items (name, description, category, unit_of_measure, hsn_code,
             purchase_rate, purchase_gst_percent, purchase_price, 
             selling_rate, selling_gst_percent, selling_price) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", item[:11])
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            item[:5] + (to_paise(item[5]), item[6], to_paise(item[7]),
+                        to_paise(item[8]), item[9], to_paise(item[10])))
         item_id = db.lastrowid()
         
-        # Add to inventory
+        # Add to inventory; opening stock predates the generated orders
         db.execute("INSERT INTO Inventory (item_id, quantity_on_hand, reorder_level, location, last_updated) VALUES (?, ?, ?, ?, ?)",
-            (item_id, item[11], item[12], item[13], datetime.now()))
+            (item_id, 0, item[12], item[13], datetime.now()))
+        db.apply_stock_deltas([(item_id, item[11])], 'opening', item_id, datetime.now() - timedelta(days=90))
     
     db.commit()
     print(f"✅ Added {len(items)} items")
@@ -187,7 +191,8 @@ def fill_database(db_name='integrated_system.db'):
     ]
     
     for customer in customers:
-        db.execute("INSERT INTO Customers (name, contact_person, phone, email, address, gstin, credit_limit, payment_terms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", customer)
+        db.execute("INSERT INTO Customers (name, contact_person, phone, email, address, gstin, credit_limit, payment_terms) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            customer[:6] + (to_paise(customer[6]), customer[7]))
     
     db.commit()
     print(f"✅ Added {len(customers)} customers")
@@ -215,9 +220,7 @@ def fill_database(db_name='integrated_system.db'):
             rate, gst_percent = db.fetchone()
             qty = random.randint(5, 30)
             
-            item_subtotal = rate * qty
-            item_gst = (item_subtotal * gst_percent) / 100
-            item_total = item_subtotal + item_gst
+            item_subtotal, item_gst, item_total = line_amounts(rate, qty, gst_percent)
             
             subtotal += item_subtotal
             total_gst += item_gst
@@ -275,8 +278,7 @@ def fill_database(db_name='integrated_system.db'):
                  rejected_qty, receipt_date.date(), "Quality checked and verified"))
             
             # Update inventory
-            db.execute("UPDATE Inventory SET quantity_on_hand = quantity_on_hand + ?, last_updated = ? WHERE item_id = ?",
-                (accepted_qty, datetime.now(), item_id))
+            db.apply_stock_deltas([(item_id, accepted_qty)], 'receipt', po_number, receipt_date)
             
             gr_count += 1
     
@@ -311,9 +313,7 @@ def fill_database(db_name='integrated_system.db'):
             rate, gst_percent, stock = db.fetchone()
             qty = random.randint(1, min(10, stock // 2))
             
-            item_subtotal = rate * qty
-            item_gst = (item_subtotal * gst_percent) / 100
-            item_total = item_subtotal + item_gst
+            item_subtotal, item_gst, item_total = line_amounts(rate, qty, gst_percent)
             
             subtotal += item_subtotal
             total_gst += item_gst
@@ -334,15 +334,19 @@ def fill_database(db_name='integrated_system.db'):
             (customer_id, order_date.date(), delivery_date.date(), status, subtotal, total_gst, total_amount))
         so_number = db.lastrowid()
         
+        delivery_lines = []
         for item_id, qty, rate, gst_percent, gst_amt, total in items_data:
             db.execute("INSERT INTO Sales_Order_Items (so_number, item_id, quantity, rate, gst_percent, gst_amount, total_price) VALUES (?, ?, ?, ?, ?, ?, ?)",
                 (so_number, item_id, qty, rate, gst_percent, gst_amt, total))
             
-            # Reduce inventory for delivered orders
+            # Ship the full line for delivered orders, part of it otherwise
             if status in ["Delivered", "Partially Delivered"]:
-                reduce_qty = qty if status == "Delivered" else random.randint(int(qty * 0.5), qty)
-                db.execute("UPDATE Inventory SET quantity_on_hand = quantity_on_hand - ?, last_updated = ? WHERE item_id = ?",
-                    (reduce_qty, datetime.now(), item_id))
+                deliver_qty = qty if status == "Delivered" else random.randint(int(qty * 0.5), qty - 1)
+                delivery_lines.append((db.lastrowid(), item_id, deliver_qty))
+        
+        # Delivery note reduces inventory and sets delivered quantities
+        if any(line[2] > 0 for line in delivery_lines):
+            db.record_delivery(so_number, delivery_lines, delivery_date.date())
         
         so_count += 1
     
@@ -0,0 +1,122 @@
+"""
+Filter Bar - filter controls above a list tab
+Each field turns what the user entered into a SQL condition on a result
+column of the list's query. The list applies the conditions in SQLite,
+where they can use the supporting indexes, instead of filtering rows that
+were already loaded.
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import datetime, timedelta
+from money import to_paise
+
+# Upper bound for a case-insensitive prefix range (sorts after any character)
+_PREFIX_END = "\U0010ffff"
+
+
+class FilterBar:
+    """Row of filter inputs with Apply / Clear buttons
+
+    Fields are (kind, column, label[, choices]) tuples where kind is one of:
+        'choice'  exact match from a dropdown of choices ("All" = no filter)
+        'prefix'  case-insensitive "starts with" text match
+        'dates'   inclusive From / To dates (YYYY-MM-DD)
+        'amount'  inclusive Min / Max amounts in rupees
+    on_apply(where, params) is called with the combined condition.
+    """
+
+    def __init__(self, parent, fields, on_apply):
+        self.fields = fields
+        self.on_apply = on_apply
+        self.inputs = {}
+        self.frame = ttk.Frame(parent)
+
+        for field in fields:
+            kind, column, label = field[:3]
+            ttk.Label(self.frame, text=f"{label}:").pack(side='left', padx=(8, 2))
+            if kind == 'choice':
+                var = tk.StringVar(value="All")
+                combo = ttk.Combobox(self.frame, textvariable=var, values=("All",) + tuple(field[3]),
+                                     state='readonly', width=16)
+                combo.pack(side='left')
+                combo.bind('<<ComboboxSelected>>', lambda e: self.apply())
+                self.inputs[column] = (var,)
+            elif kind == 'prefix':
+                var = tk.StringVar()
+                self._entry(var, 16)
+                self.inputs[column] = (var,)
+            else:
+                low, high = tk.StringVar(), tk.StringVar()
+                self._entry(low, 10)
+                ttk.Label(self.frame, text="to").pack(side='left', padx=2)
+                self._entry(high, 10)
+                self.inputs[column] = (low, high)
+
+        ttk.Button(self.frame, text="🔍 Apply", command=self.apply).pack(side='left', padx=(10, 3))
+        ttk.Button(self.frame, text="✖ Clear", command=self.clear).pack(side='left', padx=3)
+
+    def _entry(self, var, width):
+        entry = ttk.Entry(self.frame, textvariable=var, width=width)
+        entry.pack(side='left')
+        entry.bind('<Return>', lambda e: self.apply())
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def conditions(self):
+        """Combined SQL condition and parameters; raises ValueError on bad input"""
+        conditions = []
+        params = []
+        for field in self.fields:
+            kind, column, label = field[:3]
+            values = [var.get().strip() for var in self.inputs[column]]
+            if kind == 'choice':
+                if values[0] != "All":
+                    conditions.append(f"{column} = ?")
+                    params.append(values[0])
+            elif kind == 'prefix':
+                if values[0]:
+                    conditions.append(f"{column} COLLATE NOCASE >= ? AND {column} COLLATE NOCASE < ?")
+                    params += [values[0], values[0] + _PREFIX_END]
+            elif kind == 'dates':
+                start, end = (self._date(value, label) for value in values)
+                if start:
+                    conditions.append(f"{column} >= ?")
+                    params.append(start.isoformat())
+                if end:
+                    # Before the next day, so timestamps on the end date match too
+                    conditions.append(f"{column} < ?")
+                    params.append((end + timedelta(days=1)).isoformat())
+            elif kind == 'amount':
+                low, high = values
+                if low:
+                    conditions.append(f"{column} >= ?")
+                    params.append(to_paise(low))
+                if high:
+                    conditions.append(f"{column} <= ?")
+                    params.append(to_paise(high))
+        return " AND ".join(conditions), params
+
+    @staticmethod
+    def _date(value, label):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError(f"{label}: enter dates as YYYY-MM-DD")
+
+    def apply(self):
+        try:
+            where, params = self.conditions()
+        except ValueError as e:
+            messagebox.showerror("Invalid Filter", str(e))
+            return
+        self.on_apply(where, params)
+
+    def clear(self):
+        for field in self.fields:
+            for var in self.inputs[field[1]]:
+                var.set("All" if field[0] == 'choice' else "")
+        self.apply()
@@ -0,0 +1,55 @@
+"""
+Global Search - one search box over items, customers, suppliers and receipts
+Each entity type has its own FTS5 index (see SEARCH_INDEXES in database.py).
+Hits are ranked within each type and listed under a heading per type; each
+hit is a (type, key) pair the app opens in the matching detail dialog.
+"""
+
+HITS_PER_TYPE = 5
+
+# Entity type -> (heading, FTS index, columns selected with the key first)
+SEARCH_TYPES = {
+    'item': ("📦 Items", 'Items_FTS', "t.item_id, t.name, t.category, t.hsn_code"),
+    'customer': ("👥 Customers", 'Customers_FTS', "t.customer_id, t.name, t.contact_person, t.phone"),
+    'supplier': ("🏢 Suppliers", 'Suppliers_FTS', "t.supplier_id, t.name, t.contact_person, t.phone"),
+    'receipt': ("📥 Goods Receipts", 'Receipts_FTS', "t.invoice_number, t.po_number, t.receipt_date, t.notes"),
+}
+
+
+def _label(kind, row):
+    key, *details = row
+    if kind == 'item':
+        name, category, hsn = details
+        return f"{name}  ·  {category or 'N/A'}  ·  HSN: {hsn or 'N/A'}"
+    if kind == 'receipt':
+        po_number, receipt_date, notes = details
+        notes = f"  ·  {notes[:40]}" if notes else ""
+        return f"Invoice {key}  ·  PO #{po_number}  ·  {receipt_date}{notes}"
+    name, contact, phone = details
+    return f"{name}  ·  {contact or 'N/A'}  ·  {phone or 'N/A'}"
+
+
+def search_everything(db, text, limit=HITS_PER_TYPE):
+    """Hits for text as (label, value) rows grouped under a heading per type
+
+    value is (type, key) - the invoice number for receipts - or None for
+    the headings. Types without hits are left out.
+    """
+    if not text.split():
+        return []
+    rows = []
+    for kind, (heading, fts_table, select) in SEARCH_TYPES.items():
+        if kind == 'receipt':
+            # One Goods_Receipt row per item line; show each invoice once
+            hits, seen = [], set()
+            for row in db.search(fts_table, text, limit * 4, select):
+                if row[0] not in seen:
+                    seen.add(row[0])
+                    hits.append(row)
+            hits = hits[:limit]
+        else:
+            hits = db.search(fts_table, text, limit, select)
+        if hits:
+            rows.append((heading, None))
+            rows += [("    " + _label(kind, row), (kind, row[0])) for row in hits]
+    return rows
@@ -0,0 +1,112 @@
+"""
+Query Instrumentation - per-statement timing and slow query log
+Enabled with Database.enable_instrumentation(); off by default
+"""
+
+import logging
+import os
+import re
+import sys
+import time
+from collections import deque
+
+logger = logging.getLogger("inventory.sql")
+
+# Latencies kept per statement for the p95 estimate
+SAMPLE_SIZE = 1000
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames from these files are skipped when looking for the caller
+_INTERNAL_FILES = {"database.py", "instrumentation.py", "contextlib.py"}
+
+
+def normalize_sql(query):
+    """Collapse whitespace and literals so equivalent statements share one entry"""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _WHITESPACE.sub(" ", query).strip()
+    return _IN_LIST.sub("(?...)", query)
+
+
+def find_caller():
+    """Return 'module.function' of the first frame outside the data layer"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES:
+            module = os.path.splitext(filename)[0]
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class StatementStats:
+    """Running totals for one normalized statement"""
+
+    __slots__ = ("sql", "calls", "total", "max", "samples", "callers")
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.callers = set()
+
+    @property
+    def mean(self):
+        return self.total / self.calls if self.calls else 0.0
+
+    @property
+    def p95(self):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class QueryStats:
+    """Collects timing for every statement run through Database.execute"""
+
+    def __init__(self, slow_ms=50):
+        self.slow_ms = slow_ms
+        self.statements = {}
+
+    def record(self, query, elapsed):
+        """Record one execution (elapsed is in seconds)"""
+        sql = normalize_sql(query)
+        stats = self.statements.get(sql)
+        if stats is None:
+            stats = self.statements[sql] = StatementStats(sql)
+        caller = find_caller()
+
+        stats.calls += 1
+        stats.total += elapsed
+        stats.max = max(stats.max, elapsed)
+        stats.samples.append(elapsed)
+        stats.callers.add(caller)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= self.slow_ms:
+            logger.warning("slow query %.1f ms in %s: %s", elapsed_ms, caller, sql)
+
+    def timed(self, run, query, *args):
+        """Call run(query, *args), recording how long it took"""
+        start = time.perf_counter()
+        try:
+            return run(query, *args)
+        finally:
+            self.record(query, time.perf_counter() - start)
+
+    def top(self, limit=25, key="total"):
+        """Statements ordered by total, p95, max or calls (descending)"""
+        return sorted(self.statements.values(),
+                      key=lambda s: getattr(s, key), reverse=True)[:limit]
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        self.statements.clear()
@@ -0,0 +1,153 @@
+"""
+Item Picker - type-ahead search entry for the order dialogs and global search
+Nothing is loaded up front: each pause in typing runs one indexed search
+(see Database.search_items) and the best matches are listed under the entry.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+DEBOUNCE_MS = 120  # wait for a pause in typing before searching
+MAX_MATCHES = 15   # rows shown in the drop-down
+
+
+class ItemPicker:
+    """Entry with a drop-down list of matching items
+
+    search(text, limit) returns (label, value) pairs, best match first;
+    rows with value None are headings and cannot be picked. Picking a row
+    shows its label in the entry, sets .value and calls on_select(value);
+    typing again clears .value. Typing, a click or the Down key opens the
+    list; Up/Down, Enter and Escape work inside it. anchor 'ne' aligns the
+    list with the entry's right edge instead of its left.
+    """
+
+    def __init__(self, parent, search, width=50, on_select=None, anchor='nw'):
+        self.search = search
+        self.on_select = on_select
+        self.anchor = anchor
+        self.value = None
+        self._matches = []
+        self._pending = None
+        self._picking = False
+
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(parent, textvariable=self.var, width=width)
+        # Placed over the dialog below the entry, so it can overlap other widgets
+        self.listbox = tk.Listbox(self.entry.winfo_toplevel(), exportselection=False,
+                                  activestyle='dotbox', font=('Arial', 10))
+
+        self.var.trace_add('write', self._on_typed)
+        self.entry.bind('<Button-1>', lambda e: self.open())
+        self.entry.bind('<Down>', self._enter_list)
+        self.entry.bind('<Return>', lambda e: self._pick(self._first_match()))
+        self.entry.bind('<Escape>', lambda e: self.hide())
+        self.entry.bind('<FocusOut>', self._on_focus_out)
+        self.listbox.bind('<ButtonRelease-1>', lambda e: self._pick(self.listbox.nearest(e.y)))
+        self.listbox.bind('<Return>', lambda e: self._pick(self.listbox.index('active')))
+        self.listbox.bind('<Escape>', lambda e: (self.hide(), self.entry.focus_set()))
+        self.listbox.bind('<FocusOut>', self._on_focus_out)
+
+    def grid(self, **kwargs):
+        self.entry.grid(**kwargs)
+
+    def pack(self, **kwargs):
+        self.entry.pack(**kwargs)
+
+    def set_enabled(self, enabled):
+        self.entry.state(['!disabled'] if enabled else ['disabled'])
+        if not enabled:
+            self.hide()
+
+    def clear(self):
+        self._set_text("")
+        self.value = None
+        self.hide()
+
+    def open(self):
+        """Search now for the current text and show the matches"""
+        if self._pending:
+            self.entry.after_cancel(self._pending)
+            self._pending = None
+        if self.entry.winfo_exists() and 'disabled' not in self.entry.state():
+            self._show(self.search(self.var.get().strip(), MAX_MATCHES))
+
+    def hide(self):
+        self.listbox.place_forget()
+
+    def _set_text(self, text):
+        self._picking = True
+        try:
+            self.var.set(text)
+        finally:
+            self._picking = False
+
+    def _on_typed(self, *args):
+        if self._picking:
+            return
+        self.value = None
+        if self._pending:
+            self.entry.after_cancel(self._pending)
+        if self.var.get().strip():
+            self._pending = self.entry.after(DEBOUNCE_MS, self.open)
+        else:
+            self._pending = None
+            self.hide()
+
+    def _show(self, matches):
+        self._matches = matches
+        self.listbox.delete(0, 'end')
+        if not matches:
+            self.hide()
+            return
+        labels = [label for label, _ in matches]
+        self.listbox.insert('end', *labels)
+        for index, (_, value) in enumerate(matches):
+            if value is None:
+                self.listbox.itemconfig(index, foreground='gray', selectforeground='gray',
+                                        selectbackground=self.listbox.cget('background'))
+        self.listbox.configure(height=len(labels), width=min(max(map(len, labels)), 90))
+        self.listbox.place(in_=self.entry, relx=1.0 if 'e' in self.anchor else 0.0, rely=1.0,
+                           anchor=self.anchor)
+        self.listbox.lift()
+
+    def _first_match(self):
+        return next((index for index, (_, value) in enumerate(self._matches) if value is not None), -1)
+
+    def _enter_list(self, event):
+        if not self.listbox.winfo_manager():
+            self.open()
+        first = self._first_match()
+        if first >= 0:
+            self.listbox.focus_set()
+            self.listbox.selection_clear(0, 'end')
+            self.listbox.selection_set(first)
+            self.listbox.activate(first)
+        return 'break'
+
+    def _pick(self, index):
+        if not self.listbox.winfo_manager() or not 0 <= index < len(self._matches):
+            return
+        label, value = self._matches[index]
+        if value is None:
+            return
+        self._set_text(label)
+        self.value = value
+        self.hide()
+        self.entry.focus_set()
+        self.entry.icursor('end')
+        if self.on_select:
+            self.on_select(value)
+
+    def _on_focus_out(self, event):
+        # Focus moving between the entry and its list keeps the list open
+        def check():
+            if not self.entry.winfo_exists():
+                return  # dialog closed
+            try:
+                focused = self.entry.focus_get()
+            except KeyError:
+                focused = None
+            if focused not in (self.entry, self.listbox):
+                self.hide()
+        self.entry.after(100, check)
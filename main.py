@@ -3,11 +3,20 @@ Main Application File - Integrated Purchase & Sales Management System with Menu
 Run this file to start the application
 """
 
+import os
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
+from dashboard_metrics import DashboardMetrics
+from master_data import MasterData
 from database import Database
+from money import fmt
 from purchase_module import PurchaseModule
+from query_worker import QueryWorker
 from sales_module import SalesModule
+from startup_timing import LOG_FILE, StartupTimer, read_history
+from item_picker import ItemPicker
+from global_search import search_everything
 
 
 # ==================== GLOBAL UI SETTINGS ====================
@@ -19,14 +28,56 @@ SMALL_FONT = ("Arial", 14)
 TITLE_FONT = ("Arial", 18, "bold")
 HEADER_FONT = ("Arial", 16, "bold")
 
+DB_PROFILE = "balanced" # durable | balanced | bulk-load (see database.PERFORMANCE_PROFILES)
+DB_INSTRUMENT = False # time every SQL statement (Home > Performance)
+SLOW_QUERY_MS = 50 # statements slower than this are logged with their caller
+STOCK_SNAPSHOT_DAYS = 1 # take a stock snapshot at startup if the last one is older than this
+
+# Dashboard cards: (section, [(metric, label, is money, colour or colour(value))])
+DASHBOARD_SECTIONS = [
+    ("📦 Inventory Status", [
+        ("total_items", "Total Items", False, "blue"),
+        ("low_stock", "Low Stock Items", False, lambda v: "red" if v > 0 else "green"),
+        ("total_stock", "Total Stock Units", False, "blue"),
+    ]),
+    ("🛒 Purchase Overview", [
+        ("total_pos", "Total POs", False, "blue"),
+        ("pending_pos", "Pending POs", False, "orange"),
+        ("total_purchase", "Total Purchase Value", True, "green"),
+        ("total_suppliers", "Suppliers", False, "blue"),
+    ]),
+    ("🛍️ Sales Overview", [
+        ("total_sos", "Total SOs", False, "blue"),
+        ("pending_sos", "Pending SOs", False, "orange"),
+        ("total_sales", "Total Sales Value", True, "green"),
+        ("total_customers", "Customers", False, "blue"),
+    ]),
+    ("📄 Invoice Status", [
+        ("total_invoices", "Total Invoices", False, "blue"),
+        ("unpaid_invoices", "Unpaid Invoices", False, lambda v: "red" if v > 0 else "green"),
+        ("unpaid_amount", "Unpaid Amount", True, lambda v: "red" if v > 0 else "green"),
+    ]),
+    ("💰 GST Summary", [
+        ("output_gst", "Output GST (Collected)", True, "green"),
+        ("input_gst", "Input GST (Paid)", True, "orange"),
+        ("net_gst", "Net GST Liability", True, lambda v: "red" if v > 0 else "blue"),
+    ]),
+]
+
 class IntegratedManagementSystem:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
         self.root = root
         self.root.title("Integrated Purchase & Sales Management System")
         self.root.geometry("1440x900")
+        self.startup = startup or StartupTimer()
         
         # Initialize database
-        self.db = Database()
+        self.db = Database(profile=DB_PROFILE)
+        if DB_INSTRUMENT:
+            self.db.enable_instrumentation(slow_ms=SLOW_QUERY_MS)
+        self.startup.mark("database")
+        self.db.ensure_stock_snapshot(max_age_days=STOCK_SNAPSHOT_DAYS)
+        self.startup.mark("stock snapshot")
         
         # Check if company details exist - FIRST TIME SETUP
         if not self.db.company_exists():
@@ -39,18 +90,38 @@ class IntegratedManagementSystem:
 
     def initialize_main_app(self):
         """Initialize the main application after company setup"""
+        # Tabs are built the first time they are shown (see add_tab)
+        self.lazy_tabs = {}  # tab path -> (tab text, build)
+        
         # Create main content area with notebook (before menu bar)
         self.create_main_content()
         
+        # Tab refreshes run their queries on this background worker
+        self.busy_tabs = set()
+        self.tab_watchers = []  # (tab path, refresh) registered with watch_tables
+        self.stale_tabs = {}    # tab path -> refreshes waiting until the tab is shown
+        self.dashboard_metrics = DashboardMetrics(self.db.changes)
+        self.master_data = MasterData(self.db)
+        self.worker = QueryWorker(self.root, self.db.open_reader, on_busy=self.set_tab_busy)
+        
         # Initialize modules (before menu bar)
         self.purchase_module = PurchaseModule(self.notebook, self.db, self)
         self.sales_module = SalesModule(self.notebook, self.db, self)
+        self.startup.mark("modules")
         
         # Create menu bar (after modules are initialized)
         self.create_menu_bar()
         
         # Show welcome screen by default
         self.show_dashboard()
+        self.startup.mark("dashboard")
+        self.root.after_idle(self.on_first_paint)
+    
+    def on_first_paint(self):
+        """Record time-to-first-paint once the window has been drawn"""
+        self.root.update_idletasks()
+        log_path = os.path.join(os.path.dirname(os.path.abspath(self.db.db_name)), LOG_FILE)
+        self.startup.first_paint(log_path, db_size_mb=round(os.path.getsize(self.db.db_name) / 2**20, 1))
         
     # ==================== MENU BAR ====================
 
@@ -64,12 +135,16 @@ class IntegratedManagementSystem:
         menubar.add_cascade(label="🏠 Home", menu=home_menu)
     
         home_menu.add_command(label="📊 Dashboard", command=self.show_dashboard)
+        home_menu.add_command(label="🔍 Search", accelerator="Ctrl+F",
+                              command=lambda: self.search_box.entry.focus_set())
         home_menu.add_separator()
         home_menu.add_command(label="🔄 Refresh All Data", command=self.refresh_all_tabs)
         home_menu.add_separator()
         
         home_menu.add_command(label="📖 About", command=self.show_about)
         home_menu.add_command(label="ℹ️ System Info", command=self.show_system_info)
+        home_menu.add_command(label="⏱️ Performance", command=self.show_performance)
+        home_menu.add_command(label="🚀 Startup Timing", command=self.show_startup_timing)
         home_menu.add_command(label="🚪 Exit", command=self.on_closing)
     
         # ==================== MASTERS MENU ====================
@@ -131,7 +206,8 @@ class IntegratedManagementSystem:
         invoice_submenu.add_command(label="📋 View Invoices", 
                                    command=lambda: self.switch_to_tab("📄 Invoices"))
         invoice_submenu.add_command(label="💰 Mark as Paid", 
-                                   command=self.sales_module.mark_invoice_paid)
+                                   command=lambda: self.switch_to_tab("📄 Invoices")
+                                   or self.sales_module.mark_invoice_paid())
     
         # ==================== REPORTS MENU ====================
         reports_menu = tk.Menu(menubar, tearoff=0)
@@ -143,6 +219,9 @@ class IntegratedManagementSystem:
                                 command=lambda: self.switch_to_tab("📊 Reports"))
         reports_menu.add_command(label="⚠️ Low Stock Alerts", 
                                 command=lambda: self.switch_to_tab("⚠️ Alerts"))
+        reports_menu.add_separator()
+        reports_menu.add_command(label="🔒 Close Period...",
+                                command=self.sales_module.close_period_dialog)
     
         
 
@@ -169,6 +248,19 @@ class IntegratedManagementSystem:
         ttk.Button(quick_frame, text="🔄 Refresh", 
                   command=self.refresh_all_tabs, width=10).pack(side='left', padx=2)
         
+        # Global search over items, customers, suppliers and receipts (Ctrl+F)
+        search_frame = ttk.Frame(header)
+        search_frame.pack(side='right', padx=10, pady=10)
+        ttk.Label(search_frame, text="🔍").pack(side='left', padx=2)
+        self.search_box = ItemPicker(search_frame, lambda text, limit: search_everything(self.db, text),
+                                     width=30, on_select=self.open_search_hit, anchor='ne')
+        self.search_box.pack(side='left')
+        self.root.bind('<Control-f>', lambda e: self.search_box.entry.focus_set())
+        
+        # Loading indicator for the visible tab (see set_tab_busy)
+        self.busy_label = ttk.Label(header, text="", font=BASE_FONT, foreground="gray")
+        self.busy_label.pack(side='right', padx=10)
+        
         # Separator
         ttk.Separator(self.root, orient='horizontal').pack(fill='x', padx=10)
         
@@ -179,6 +271,7 @@ class IntegratedManagementSystem:
         # HIDE NOTEBOOK TABS
         style = ttk.Style()
         style.layout("TNotebook.Tab", [])
+        self.notebook.bind('<<NotebookTabChanged>>', lambda e: self.on_tab_changed())
     
         # ==================== NAVIGATION ====================
     
@@ -187,9 +280,88 @@ class IntegratedManagementSystem:
         for i in range(self.notebook.index("end")):
             if self.notebook.tab(i, "text") == tab_name:
                 self.notebook.select(i)
+                self.build_tab(self.notebook.select())
                 return
         messagebox.showinfo("Info", f"Tab '{tab_name}' not found")
     
+    def open_search_hit(self, hit):
+        """Open the detail dialog of a global search hit"""
+        kind, key = hit
+        self.search_box.clear()
+        openers = {
+            'item': self.purchase_module.edit_item,
+            'customer': self.sales_module.edit_customer,
+            'supplier': self.purchase_module.edit_supplier,
+            'receipt': self.purchase_module.view_receipt_details,
+        }
+        openers[kind](key)
+    
+    def add_tab(self, text, build):
+        """Add an empty tab that build(frame) fills the first time it is shown"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=text)
+        self.lazy_tabs[str(frame)] = (text, build, frame)
+        return frame
+    
+    def build_tab(self, tab):
+        """Build a lazily added tab (by path) if it has not been built yet"""
+        entry = self.lazy_tabs.pop(tab, None)
+        if entry is None:
+            return
+        text, build, frame = entry
+        started = time.perf_counter()
+        build(frame)
+        self.startup.tab_built(text, (time.perf_counter() - started) * 1000)
+    
+    def tab_of(self, widget):
+        """Return the notebook page that contains widget"""
+        while widget is not None and widget.master is not self.notebook:
+            widget = widget.master
+        return widget
+    
+    def on_tab_changed(self):
+        """Build the newly selected tab or run the refreshes it missed while hidden"""
+        self.build_tab(self.notebook.select())
+        for refresh in self.stale_tabs.pop(self.notebook.select(), []):
+            refresh()
+        self.update_busy_indicator()
+    
+    def watch_tables(self, widget, tables, refresh):
+        """Call refresh when a commit changes one of tables
+        
+        The tab holding widget refreshes straight away if it is visible;
+        otherwise the refresh waits until the tab is next selected.
+        """
+        tab = str(self.tab_of(widget))
+        self.tab_watchers.append((tab, refresh))
+        self.db.changes.subscribe(tables, lambda changed: self.mark_stale(tab, refresh))
+    
+    def mark_stale(self, tab, refresh):
+        if tab == self.notebook.select():
+            refresh()
+            return
+        pending = self.stale_tabs.setdefault(tab, [])
+        if refresh not in pending:
+            pending.append(refresh)
+    
+    def set_tab_busy(self, key, busy):
+        """QueryWorker callback: mark the tab containing key as loading or idle"""
+        tab = self.tab_of(key)
+        if tab is None:
+            return
+        if busy:
+            self.busy_tabs.add(tab)
+        else:
+            self.busy_tabs.discard(tab)
+        key.configure(cursor='watch' if busy else '')
+        self.update_busy_indicator()
+    
+    def update_busy_indicator(self):
+        """Show the loading label while the selected tab is refreshing"""
+        selected = self.notebook.select()
+        busy = any(str(tab) == selected for tab in self.busy_tabs)
+        self.busy_label.config(text="⏳ Loading..." if busy else "")
+    
     # ==================== DASHBOARD ====================
     
     def show_dashboard(self):
@@ -198,7 +370,6 @@ class IntegratedManagementSystem:
         for i in range(self.notebook.index("end")):
             if self.notebook.tab(i, "text") == "🏠 Dashboard":
                 self.notebook.select(i)
-                self.refresh_dashboard()
                 return
             
         # Create dashboard tab
@@ -219,17 +390,13 @@ class IntegratedManagementSystem:
         
         # Create dashboard content
         self.dashboard_frame = dashboard_frame
+        self.build_dashboard()
+        self.watch_tables(dashboard_frame, ('Items', 'Inventory', 'Suppliers', 'Customers', 'Purchase_Orders',
+                                            'Sales_Orders', 'Invoices'), self.refresh_dashboard)
         self.refresh_dashboard()
     
-    def refresh_dashboard(self):
-        """Refresh dashboard statistics - HORIZONTAL LAYOUT"""
-        if not hasattr(self, 'dashboard_frame'):
-            return
-
-        # Clear existing widgets (except title)
-        for widget in self.dashboard_frame.winfo_children()[1:]:
-           widget.destroy()
-
+    def build_dashboard(self):
+        """Create the dashboard cards once; refresh_dashboard only updates their values"""
         # Create scrollable frame
         canvas = tk.Canvas(self.dashboard_frame, bg='#f5f5f5')
         scrollbar = ttk.Scrollbar(self.dashboard_frame, orient="vertical", command=canvas.yview)
@@ -247,133 +414,18 @@ class IntegratedManagementSystem:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
-        # === INVENTORY SECTION - HORIZONTAL ===
-        inv_section = ttk.LabelFrame(scrollable, text="📦 Inventory Status", padding=15)
-        inv_section.pack(fill='x', pady=(0, 15), padx=10)
-
-        self.db.execute("SELECT COUNT(*) FROM Items")
-        total_items = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Items i JOIN Inventory inv ON i.item_id = inv.item_id WHERE inv.quantity_on_hand <= inv.reorder_level")
-        low_stock = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COALESCE(SUM(quantity_on_hand), 0) FROM Inventory")
-        total_stock = self.db.fetchone()[0]
-
-        stats_frame = ttk.Frame(inv_section)
-        stats_frame.pack(fill='both', expand=True)
+        # === KPI SECTIONS - HORIZONTAL ===
+        self.dashboard_cards = {}
+        for title, cards in DASHBOARD_SECTIONS:
+            section = ttk.LabelFrame(scrollable, text=title, padding=15)
+            section.pack(fill='x', pady=(0, 15), padx=10)
 
-        # Configure columns to distribute evenly
-        for i in range(3):
-            stats_frame.grid_columnconfigure(i, weight=1)
-        stats_frame.grid_rowconfigure(0, weight=1)
-
-        self.create_stat_card(stats_frame, "Total Items", str(total_items), "blue", 0, 0)
-        self.create_stat_card(stats_frame, "Low Stock Items", str(low_stock), "red" if low_stock > 0 else "green", 0, 1)
-        self.create_stat_card(stats_frame, "Total Stock Units", str(total_stock), "blue", 0, 2)
-
-        # === PURCHASE SECTION - HORIZONTAL ===
-        purchase_section = ttk.LabelFrame(scrollable, text="🛒 Purchase Overview", padding=15)
-        purchase_section.pack(fill='x', pady=(0, 15), padx=10)
-
-        self.db.execute("SELECT COUNT(*) FROM Purchase_Orders")
-        total_pos = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Purchase_Orders WHERE status = 'Pending'")
-        pending_pos = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Purchase_Orders")
-        total_purchase = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Suppliers")
-        total_suppliers = self.db.fetchone()[0]
-
-        stats_frame = ttk.Frame(purchase_section)
-        stats_frame.pack(fill='both', expand=True)
-
-        for i in range(4):
-            stats_frame.grid_columnconfigure(i, weight=1)
-        stats_frame.grid_rowconfigure(0, weight=1)
-    
-        self.create_stat_card(stats_frame, "Total POs", str(total_pos), "blue", 0, 0)
-        self.create_stat_card(stats_frame, "Pending POs", str(pending_pos), "orange", 0, 1)
-        self.create_stat_card(stats_frame, "Total Purchase Value", f"₹{total_purchase:,.2f}", "green", 0, 2)
-        self.create_stat_card(stats_frame, "Suppliers", str(total_suppliers), "blue", 0, 3)
+            stats_frame = ttk.Frame(section)
+            stats_frame.pack(fill='both', expand=True)
 
-        # === SALES SECTION - HORIZONTAL ===
-        sales_section = ttk.LabelFrame(scrollable, text="🛍️ Sales Overview", padding=15)
-        sales_section.pack(fill='x', pady=(0, 15), padx=10)
-
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders")
-        total_sos = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders WHERE status = 'Pending'")
-        pending_sos = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Sales_Orders")
-        total_sales = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Customers")
-        total_customers = self.db.fetchone()[0]
-
-        stats_frame = ttk.Frame(sales_section)
-        stats_frame.pack(fill='both', expand=True)
-
-        for i in range(4):
-            stats_frame.grid_columnconfigure(i, weight=1)
-        stats_frame.grid_rowconfigure(0, weight=1)
-    
-        self.create_stat_card(stats_frame, "Total SOs", str(total_sos), "blue", 0, 0)
-        self.create_stat_card(stats_frame, "Pending SOs", str(pending_sos), "orange", 0, 1)
-        self.create_stat_card(stats_frame, "Total Sales Value", f"₹{total_sales:,.2f}", "green", 0, 2)
-        self.create_stat_card(stats_frame, "Customers", str(total_customers), "blue", 0, 3)
-
-        # === INVOICES SECTION - HORIZONTAL ===
-        invoice_section = ttk.LabelFrame(scrollable, text="📄 Invoice Status", padding=15)
-        invoice_section.pack(fill='x', pady=(0, 15), padx=10)
-
-        self.db.execute("SELECT COUNT(*) FROM Invoices")
-        total_invoices = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COUNT(*) FROM Invoices WHERE status = 'Unpaid'")
-        unpaid_invoices = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Invoices WHERE status = 'Unpaid'")
-        unpaid_amount = self.db.fetchone()[0]
-
-        stats_frame = ttk.Frame(invoice_section)
-        stats_frame.pack(fill='both', expand=True)
-
-        for i in range(3):
-            stats_frame.grid_columnconfigure(i, weight=1)
-        stats_frame.grid_rowconfigure(0, weight=1)
-    
-        self.create_stat_card(stats_frame, "Total Invoices", str(total_invoices), "blue", 0, 0)
-        self.create_stat_card(stats_frame, "Unpaid Invoices", str(unpaid_invoices), "red" if unpaid_invoices > 0 else "green", 0, 1)
-        self.create_stat_card(stats_frame, "Unpaid Amount", f"₹{unpaid_amount:,.2f}", "red" if unpaid_amount > 0 else "green", 0, 2)
-
-        # === GST SECTION - HORIZONTAL ===
-        gst_section = ttk.LabelFrame(scrollable, text="💰 GST Summary", padding=15)
-        gst_section.pack(fill='x', pady=(0, 15), padx=10)
-
-        self.db.execute("SELECT COALESCE(SUM(total_gst), 0) FROM Sales_Orders")
-        output_gst = self.db.fetchone()[0]
-
-        self.db.execute("SELECT COALESCE(SUM(total_gst), 0) FROM Purchase_Orders")
-        input_gst = self.db.fetchone()[0]
-
-        net_gst = output_gst - input_gst
-
-        stats_frame = ttk.Frame(gst_section)
-        stats_frame.pack(fill='both', expand=True)
-
-        for i in range(3):
-            stats_frame.grid_columnconfigure(i, weight=1)
-        stats_frame.grid_rowconfigure(0, weight=1)
-    
-        self.create_stat_card(stats_frame, "Output GST (Collected)", f"₹{output_gst:,.2f}", "green", 0, 0)
-        self.create_stat_card(stats_frame, "Input GST (Paid)", f"₹{input_gst:,.2f}", "orange", 0, 1)
-        self.create_stat_card(stats_frame, "Net GST Liability", f"₹{net_gst:,.2f}", "red" if net_gst > 0 else "blue", 0, 2)
+            for col, (metric, label, is_money, color) in enumerate(cards):
+                value_label = self.create_stat_card(stats_frame, label, "…", "gray", 0, col)
+                self.dashboard_cards[metric] = (value_label, is_money, color)
 
         # Quick Actions - HORIZONTAL
         actions_section = ttk.LabelFrame(scrollable, text="⚡ Quick Actions", padding=15)
@@ -392,6 +444,31 @@ class IntegratedManagementSystem:
         ttk.Button(actions_frame, text="📄 Generate Invoice", 
                   command=self.sales_module.generate_invoice, width=25).pack(side='left', padx=5, pady=5)
 
+    def refresh_dashboard(self):
+        """Update the dashboard cards, querying only metrics invalidated since the last load"""
+        if not hasattr(self, 'dashboard_frame'):
+            return
+        stale = self.dashboard_metrics.stale()
+        if not stale:
+            self.show_dashboard_metrics({})
+            return
+        self.worker.submit(self.dashboard_frame, lambda cursor: self.dashboard_metrics.load(cursor, list(stale)),
+                           lambda loaded: self.show_dashboard_metrics(loaded, stale))
+
+    def show_dashboard_metrics(self, loaded, versions=None):
+        if versions:
+            self.dashboard_metrics.store(loaded, versions)
+        metrics = self.dashboard_metrics.values(loaded)
+        if 'output_gst' in metrics and 'input_gst' in metrics:
+            metrics['net_gst'] = metrics['output_gst'] - metrics['input_gst']
+        for metric, (value_label, is_money, color) in self.dashboard_cards.items():
+            if metric not in metrics:
+                continue
+            value = metrics[metric]
+            if callable(color):
+                color = color(value)
+            value_label.config(text=fmt(value, ',.2f') if is_money else str(value), foreground=color)
+
     def create_stat_card(self, parent, label, value, color, row, col):
         """Create a statistics card"""
         card_frame = ttk.Frame(parent, relief='solid', borderwidth=1)
@@ -401,8 +478,10 @@ class IntegratedManagementSystem:
     
         ttk.Label(card_frame, text=label, font=('Arial', 9), 
                  foreground='gray').pack(pady=(10, 5))
-        ttk.Label(card_frame, text=value, font=('Arial', 16, 'bold'), 
-                 foreground=color).pack(pady=(0, 10))
+        value_label = ttk.Label(card_frame, text=value, font=('Arial', 16, 'bold'), 
+                 foreground=color)
+        value_label.pack(pady=(0, 10))
+        return value_label
     
     def show_about(self):
         """Show about dialog"""
@@ -426,24 +505,27 @@ Developed with Python & Tkinter
     
     def show_system_info(self):
         """Show system information"""
-        self.db.execute("SELECT COUNT(*) FROM Items")
-        items = self.db.fetchone()[0]
+        counters = self.db.get_counters()
+        items = counters.get('Items', 0)
+        suppliers = counters.get('Suppliers', 0)
+        customers = counters.get('Customers', 0)
+        pos = counters.get('Purchase_Orders', 0)
+        sos = counters.get('Sales_Orders', 0)
         
-        self.db.execute("SELECT COUNT(*) FROM Suppliers")
-        suppliers = self.db.fetchone()[0]
-        
-        self.db.execute("SELECT COUNT(*) FROM Customers")
-        customers = self.db.fetchone()[0]
-        
-        self.db.execute("SELECT COUNT(*) FROM Purchase_Orders")
-        pos = self.db.fetchone()[0]
-        
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders")
-        sos = self.db.fetchone()[0]
+        settings = self.db.profile_settings()
+        synchronous = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}.get(settings['synchronous'], settings['synchronous'])
+        temp_store = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}.get(settings['temp_store'], settings['temp_store'])
         
         info_text = f"""System Information
 
-Database: SQLite (integrated_system.db)
+Database: SQLite ({self.db.db_name})
+
+Performance Profile: {self.db.profile}
+• Journal Mode: {settings['journal_mode'].upper()}
+• Synchronous: {synchronous}
+• Memory Map: {settings['mmap_size'] // (1024 * 1024)} MB
+• Page Cache: {abs(settings['cache_size']) // 1000} MB
+• Temp Store: {temp_store}
 
 Current Data:
 • Items: {items}
@@ -456,17 +538,99 @@ Status: Operational ✓"""
         
         messagebox.showinfo("System Information", info_text)
     
+    def show_performance(self):
+        """Show the slowest SQL statements recorded by the instrumentation layer"""
+        win = tk.Toplevel(self.root)
+        win.title("Performance - Top SQL Statements")
+        win.geometry("1200x600")
+        win.transient(self.root)
+        
+        top_frame = ttk.Frame(win, padding=10)
+        top_frame.pack(fill='x')
+        
+        status_label = ttk.Label(top_frame, font=BASE_FONT)
+        status_label.pack(side='left')
+        
+        ttk.Label(top_frame, text="Sort by:").pack(side='left', padx=(30, 5))
+        sort_var = tk.StringVar(value="total")
+        sort_combo = ttk.Combobox(top_frame, textvariable=sort_var, state='readonly', width=10,
+                                  values=["total", "p95", "max", "calls"])
+        sort_combo.pack(side='left')
+        
+        tree_frame = ttk.Frame(win, padding=(10, 0))
+        tree_frame.pack(fill='both', expand=True)
+        
+        columns = ("Calls", "Total (ms)", "Mean (ms)", "P95 (ms)", "Max (ms)", "Caller", "Statement")
+        tree = ttk.Treeview(tree_frame, columns=columns, show='headings')
+        widths = (70, 100, 90, 90, 90, 250, 600)
+        for col, width in zip(columns, widths):
+            tree.heading(col, text=col)
+            tree.column(col, width=width, anchor='w' if col in ("Caller", "Statement") else 'e')
+        
+        scrollbar = ttk.Scrollbar(tree_frame, orient='vertical', command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        
+        def load():
+            tree.delete(*tree.get_children())
+            stats = self.db.stats
+            if stats is None:
+                status_label.config(text="Instrumentation is off", foreground='red')
+                toggle_btn.config(text="▶ Enable")
+                return
+            status_label.config(text=f"Recording {len(stats.statements)} statements "
+                                     f"(slow threshold {stats.slow_ms} ms)", foreground='green')
+            toggle_btn.config(text="⏹ Disable")
+            for s in stats.top(50, key=sort_var.get()):
+                tree.insert('', 'end', values=(
+                    s.calls, f"{s.total * 1000:.1f}", f"{s.mean * 1000:.2f}",
+                    f"{s.p95 * 1000:.2f}", f"{s.max * 1000:.2f}",
+                    ", ".join(sorted(s.callers)), s.sql))
+        
+        def toggle():
+            if self.db.stats is None:
+                self.db.enable_instrumentation(slow_ms=SLOW_QUERY_MS)
+            else:
+                self.db.disable_instrumentation()
+            load()
+        
+        def reset():
+            if self.db.stats is not None:
+                self.db.stats.reset()
+            load()
+        
+        btn_frame = ttk.Frame(win, padding=10)
+        btn_frame.pack(fill='x')
+        toggle_btn = ttk.Button(btn_frame, command=toggle)
+        toggle_btn.pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="🔄 Refresh", command=load).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="🗑️ Reset", command=reset).pack(side='left', padx=5)
+        ttk.Button(btn_frame, text="Close", command=win.destroy).pack(side='right', padx=5)
+        
+        sort_combo.bind('<<ComboboxSelected>>', lambda e: load())
+        load()
+    
+    def show_startup_timing(self):
+        """Show this start's phase timings and recent time-to-first-paint history"""
+        log_path = os.path.join(os.path.dirname(os.path.abspath(self.db.db_name)), LOG_FILE)
+        history = read_history(log_path)
+        lines = [self.startup.report()]
+        if history:
+            lines += ["", "Recent starts (first paint):"]
+            lines += [f"  {run['time']}  {run['first_paint_ms']:8.1f} ms" for run in history]
+        messagebox.showinfo("Startup Timing", "\n".join(lines))
+    
     def refresh_all_tabs(self):
-        """Refresh all tabs across both modules"""
-        self.purchase_module.refresh_all()
-        self.sales_module.refresh_all()
-        if hasattr(self, 'dashboard_frame'):
-            self.refresh_dashboard()
-        messagebox.showinfo("Success", "All data refreshed successfully!")
+        """Reload the visible tab now and every other tab when it is next shown"""
+        for tab, refresh in self.tab_watchers:
+            self.mark_stale(tab, refresh)
     
     def on_closing(self):
         """Handle application close"""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
+            if hasattr(self, 'worker'):
+                self.worker.close()
             self.db.close()
             self.root.destroy()
 
@@ -819,6 +983,7 @@ Status: Operational ✓"""
 
 
 if __name__ == "__main__":
+    startup = StartupTimer()
     root = tk.Tk()
 
     # Global scaling (THIS fixes small text everywhere)
@@ -829,6 +994,8 @@ if __name__ == "__main__":
     style.configure("Treeview", font=BASE_FONT, rowheight=28)
     style.configure("Treeview.Heading", font=(BASE_FONT[0], BASE_FONT[1], "bold"))
 
-    app = IntegratedManagementSystem(root)
+    startup.mark("tk init")
+
+    app = IntegratedManagementSystem(root, startup)
     root.protocol("WM_DELETE_WINDOW", app.on_closing)
     root.mainloop()
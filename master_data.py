@@ -0,0 +1,155 @@
+"""
+Master Data - shared cache of item, customer and supplier records
+Both modules read master records through one MasterData, so each record is
+held once, as a compact __slots__ object, and dialogs open without
+re-querying the tables. A commit that writes a master table (reported by the
+change bus) drops that table's cached records.
+"""
+
+from money import fmt
+
+
+class Item:
+    """An item's master fields (amounts in paise)"""
+    __slots__ = ('id', 'name', 'description', 'category', 'unit_of_measure', 'hsn_code',
+                 'purchase_rate', 'purchase_gst_percent', 'purchase_price',
+                 'selling_rate', 'selling_gst_percent', 'selling_price')
+
+    def __init__(self, id, name, description, category, unit_of_measure, hsn_code,
+                 purchase_rate, purchase_gst_percent, purchase_price,
+                 selling_rate, selling_gst_percent, selling_price):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.category = category
+        self.unit_of_measure = unit_of_measure
+        self.hsn_code = hsn_code
+        self.purchase_rate = purchase_rate
+        self.purchase_gst_percent = purchase_gst_percent
+        self.purchase_price = purchase_price
+        self.selling_rate = selling_rate
+        self.selling_gst_percent = selling_gst_percent
+        self.selling_price = selling_price
+
+    def purchase_label(self):
+        return (f"{self.name} [HSN: {self.hsn_code or 'N/A'}] (Rate: {fmt(self.purchase_rate)} + "
+                f"{self.purchase_gst_percent:.1f}% GST = {fmt(self.purchase_price)})")
+
+    def sales_label(self):
+        return (f"{self.name} [HSN: {self.hsn_code or 'N/A'}] (Rate: {fmt(self.selling_rate)} + "
+                f"{self.selling_gst_percent:.1f}% GST = {fmt(self.selling_price)})")
+
+
+class Party:
+    """A customer or supplier (credit_limit is always 0 for suppliers)"""
+    __slots__ = ('id', 'name', 'contact_person', 'phone', 'email', 'address', 'gstin',
+                 'payment_terms', 'credit_limit')
+
+    def __init__(self, id, name, contact_person, phone, email, address, gstin, payment_terms, credit_limit):
+        self.id = id
+        self.name = name
+        self.contact_person = contact_person
+        self.phone = phone
+        self.email = email
+        self.address = address
+        self.gstin = gstin
+        self.payment_terms = payment_terms
+        self.credit_limit = credit_limit
+
+    def label(self):
+        return f"{self.name} (GSTIN: {self.gstin or 'N/A'})"
+
+
+class MasterTable:
+    """Records of one table by id, loaded one at a time or all at once"""
+
+    def __init__(self, db, table, select, record):
+        self.db = db
+        self.table = table
+        self.select = select  # columns in the record's slot order, the key first
+        self.record = record
+        self.key = select.split(",")[0].strip()
+        self.clear()
+
+    def clear(self):
+        self._by_id = {}
+        self._by_name = {}     # lower-case name -> record, filled by all()
+        self._complete = False
+        self._sorted = None
+        self._choices = None
+
+    def _load(self, where, params):
+        self.db.execute(f"SELECT {self.select} FROM {self.table} {where}", params)
+        records = []
+        for row in self.db.fetchall():
+            # Keep the cached copy so each record exists once
+            record = self._by_id.get(row[0]) or self.record(*row)
+            self._by_id[record.id] = record
+            records.append(record)
+        return records
+
+    def get(self, record_id):
+        """The record with id record_id, or None"""
+        record = self._by_id.get(record_id)
+        if record is None and not self._complete:
+            found = self._load(f"WHERE {self.key} = ?", (record_id,))
+            record = found[0] if found else None
+        return record
+
+    def get_many(self, ids):
+        """Records for ids in the same order, loading the missing ones in one query"""
+        missing = [record_id for record_id in ids if record_id not in self._by_id]
+        if missing and not self._complete:
+            self._load(f"WHERE {self.key} IN ({', '.join('?' * len(missing))})", missing)
+        return [self._by_id[record_id] for record_id in ids if record_id in self._by_id]
+
+    def by_name(self, name):
+        """The first record named name (ignoring case), or None"""
+        if self._complete:
+            return self._by_name.get(name.strip().lower())
+        found = self._load(f"WHERE name = ? COLLATE NOCASE ORDER BY {self.key} LIMIT 1", (name.strip(),))
+        return found[0] if found else None
+
+    def all(self):
+        """Every record, sorted by name"""
+        if not self._complete:
+            self._sorted = sorted(self._load("", ()), key=lambda r: (r.name or "").lower())
+            for record in reversed(self._sorted):
+                self._by_name[(record.name or "").lower()] = record
+            self._complete = True
+        return self._sorted
+
+    def choices(self):
+        """{label: record} of every customer or supplier for a combobox, labels unique"""
+        if self._choices is None:
+            self._choices = {}
+            for record in self.all():
+                label = record.label()
+                if label in self._choices:
+                    label = f"{label} #{record.id}"
+                self._choices[label] = record
+        return self._choices
+
+
+class MasterData:
+    """Item, customer and supplier caches invalidated by writes to their tables
+
+    Only used on the UI thread, like the change bus that invalidates it.
+    """
+
+    def __init__(self, db):
+        self.items = MasterTable(db, 'Items', '''item_id, name, description, category, unit_of_measure,
+            hsn_code, purchase_rate, purchase_gst_percent, purchase_price,
+            selling_rate, selling_gst_percent, selling_price''', Item)
+        self.customers = MasterTable(db, 'Customers', '''customer_id, name, contact_person, phone, email,
+            address, gstin, payment_terms, credit_limit''', Party)
+        self.suppliers = MasterTable(db, 'Suppliers', '''supplier_id, name, contact_person, phone, email,
+            address, gstin, payment_terms, 0''', Party)
+        self._tables = {master.table: master for master in (self.items, self.customers, self.suppliers)}
+        db.changes.subscribe(set(self._tables), self.invalidate)
+
+    def invalidate(self, tables):
+        """Drop the cached records of every master table in tables"""
+        for table in tables:
+            if table in self._tables:
+                self._tables[table].clear()
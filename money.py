@@ -0,0 +1,69 @@
+"""
+Money Module - fixed-point amounts in integer paise
+All monetary values are stored and computed as int paise (1 ₹ = 100 paise);
+rupees only appear at the UI boundary (parse on input, format on display).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
+
+PAISE_PER_RUPEE = 100
+
+
+def to_paise(rupees):
+    """Convert a rupee amount (str, int, float or Decimal) to int paise
+
+    Rounds half up to the nearest paisa. Raises ValueError for input that is
+    not a number.
+    """
+    try:
+        value = Decimal(str(rupees).strip() or "0")
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {rupees!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {rupees!r}")
+    return int((value * PAISE_PER_RUPEE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_paise(paise):
+    """Convert int paise to an exact Decimal rupee amount"""
+    return Decimal(paise or 0) / PAISE_PER_RUPEE
+
+
+def plain(paise):
+    """Paise as a bare rupee string for entry fields, e.g. 123450 -> '1234.50'"""
+    return f"{from_paise(paise):.2f}"
+
+
+def fmt(paise, spec=".2f"):
+    """Paise formatted for display, e.g. 123450 -> '₹1234.50'
+
+    spec is a format spec applied to the rupee value (',.2f' adds
+    thousands separators).
+    """
+    return f"₹{from_paise(paise):{spec}}"
+
+
+def gst_breakup(base_paise, gst_percent):
+    """GST on a base amount, rounded half up to the paisa
+
+    This is the single place GST is computed, so line amounts are identical
+    wherever they are calculated.
+
+    Returns:
+        (gst_paise, total_paise)
+    """
+    gst = (Decimal(int(base_paise)) * Decimal(str(gst_percent)) / 100).quantize(
+        Decimal(1), rounding=ROUND_HALF_UP)
+    gst = int(gst)
+    return gst, int(base_paise) + gst
+
+
+def line_amounts(rate_paise, quantity, gst_percent):
+    """Base, GST and total of an order line
+
+    Returns:
+        (base_paise, gst_paise, total_paise)
+    """
+    base = int(rate_paise) * int(quantity)
+    gst, total = gst_breakup(base, gst_percent)
+    return base, gst, total
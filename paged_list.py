@@ -0,0 +1,503 @@
+"""
+Paged List - keyset-paged loading for Treeview lists
+List tabs show one page of rows at a time and fetch the next page when the
+user scrolls near the bottom. Pages are read with a keyset cursor on the
+list's unique key (WHERE key > last ORDER BY key LIMIT n), so every page
+costs the same however deep the user has scrolled.
+"""
+
+from abc import ABC, abstractmethod
+from tkinter import messagebox, ttk
+
+from database import read_counters
+
+# Rows fetched per page
+PAGE_SIZE = 200
+
+# Fetch the next page once the visible part of the list reaches this fraction
+PREFETCH_AT = 0.9
+
+# Blocks of PAGE_SIZE rows a VirtualList keeps cached
+MAX_BLOCKS = 20
+
+
+def reconcile(tree, rows, shown):
+    """Update tree to show rows using only the inserts, updates, moves and deletes needed
+    
+    Args:
+        rows: (iid, values, tags) tuples in display order
+        shown: {iid: (values, tags)} of the rows tree currently shows, kept
+            by the caller and updated in place
+    """
+    # A key can repeat when blocks were read on either side of a change; show it once
+    unique = {}
+    for iid, values, tags in rows:
+        unique.setdefault(iid, (values, tags))
+    rows = [(iid, values, tags) for iid, (values, tags) in unique.items()]
+    wanted = set(unique)
+    stale = [iid for iid in shown if iid not in wanted]
+    if stale:
+        tree.delete(*stale)
+        for iid in stale:
+            del shown[iid]
+    
+    children = list(tree.get_children())
+    for index, (iid, values, tags) in enumerate(rows):
+        row = (tuple(values), tuple(tags))
+        current = shown.get(iid)
+        if current is None:
+            tree.insert('', index, iid=iid, values=row[0], tags=row[1])
+            children.insert(index, iid)
+        else:
+            if current != row:
+                tree.item(iid, values=row[0], tags=row[1])
+            if children[index] != iid:
+                tree.move(iid, '', index)
+                children.remove(iid)
+                children.insert(index, iid)
+        shown[iid] = row
+
+
+def counted(table, include=None, exclude=()):
+    """Row count of table from Row_Counters
+    
+    include limits the count to rows with those statuses; exclude subtracts
+    rows with those statuses.
+    """
+    def count(cursor):
+        counters = read_counters(cursor)
+        if include is not None:
+            total = sum(counters.get(f"{table}:{status}", 0) for status in include)
+        else:
+            total = counters.get(table, 0)
+        return total - sum(counters.get(f"{table}:{status}", 0) for status in exclude)
+    return count
+
+
+class KeysetList(ABC):
+    """Query building shared by PagedList and VirtualList
+
+    The query is a plain SELECT without ORDER BY whose result has a unique
+    key column. It is wrapped as a subquery so filters, sorting and the
+    keyset condition all apply to result columns; SQLite flattens the
+    wrapper, so they reach the indexes of the underlying tables. Rows are
+    ordered by the sort column (if any) and then by the key, both in the
+    same direction, so (sort value, key) identifies a position in the list.
+    """
+
+    def __init__(self, app, tree, scrollbar, render, key, descending, count, status_label):
+        """
+        Args:
+            app: main application (provides the query worker)
+            tree, scrollbar: the Treeview and its vertical scrollbar
+            render: callable(row) returning (values, tags) for the Treeview
+            key: unique result column the rows are split on
+            descending: default order of the key
+            count: optional callable(cursor) returning the unfiltered row
+                count; defaults to COUNT(*) over the query
+            status_label: optional label showing the row count
+        """
+        self.app = app
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.render = render
+        self.key = key
+        self.descending = descending
+        self.count = count
+        self.status_label = status_label
+        self.query = None
+        self.params = ()
+        self.sort = None  # result column expression, e.g. "name COLLATE NOCASE"
+        self.sort_descending = False
+        self.where = ""
+        self.where_params = ()
+        self._headings = {}
+        self._columns = []  # result column names, from the last fetch
+
+    @abstractmethod
+    def load(self, query, params=()):
+        """Show the rows of query"""
+
+    @abstractmethod
+    def restart(self):
+        """Reload from the top after the order or filter changed"""
+
+    def refresh(self):
+        """Reload the current query"""
+        if self.query is not None:
+            self.load(self.query, self.params)
+
+    # ==================== SORT & FILTER ====================
+
+    def sortable(self, columns):
+        """Let clicks on headings sort the list
+
+        Args:
+            columns: {heading: result column expression}; only list columns
+                backed by an index, since every sort runs in SQL
+        """
+        self._headings = dict(columns)
+        for heading in columns:
+            self.tree.heading(heading, command=lambda h=heading: self.sort_by(h))
+
+    def sort_by(self, heading):
+        """Sort by a heading's column; clicking the same heading again reverses it"""
+        expression = self._headings[heading]
+        if self.sort == expression:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort, self.sort_descending = expression, False
+        for name, column in self._headings.items():
+            arrow = (" ▼" if self.sort_descending else " ▲") if column == self.sort else ""
+            self.tree.heading(name, text=name + arrow)
+        self.restart()
+
+    def set_filter(self, where, params=()):
+        """Limit the list to rows matching where, a condition on result columns"""
+        self.where = where
+        self.where_params = tuple(params)
+        self.restart()
+
+    # ==================== SQL ====================
+
+    def _is_descending(self):
+        return self.descending if self.sort is None else self.sort_descending
+
+    def _order(self):
+        direction = "DESC" if self._is_descending() else "ASC"
+        if self.sort is None:
+            return f"{self.key} {direction}"
+        return f"{self.sort} {direction}, {self.key} {direction}"
+
+    def _after(self, row):
+        """Keyset condition selecting the rows that follow row"""
+        op = "<" if self._is_descending() else ">"
+        key = row[self._columns.index(self.key)]
+        if self.sort is None:
+            return f"{self.key} {op} ?", (key,)
+        column = self.sort.split()[0]
+        value = row[self._columns.index(column)]
+        # NULLs sort before every value, so they need their own conditions
+        if value is None:
+            if self._is_descending():
+                return f"({column} IS NULL AND {self.key} < ?)", (key,)
+            return f"({column} IS NULL AND {self.key} > ? OR {column} IS NOT NULL)", (key,)
+        after = f"({self.sort}, {self.key}) {op} (?, ?)"
+        if self._is_descending():
+            after = f"({after} OR {column} IS NULL)"
+        return after, (value, key)
+
+    def _select(self, after=None):
+        """SQL and parameters for the ordered rows, optionally those after a row"""
+        conditions = []
+        params = self.params
+        if self.where:
+            conditions.append(f"({self.where})")
+            params += self.where_params
+        if after is not None:
+            condition, values = self._after(after)
+            conditions.append(condition)
+            params += values
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"SELECT * FROM ({self.query}) {where} ORDER BY {self._order()}", params
+
+    def _counter(self):
+        """Callable(cursor) returning the number of rows the list shows"""
+        if self.count and not self.where:
+            return self.count
+        query, where = self.query, f"WHERE {self.where}" if self.where else ""
+        params = self.params + self.where_params
+        return lambda cursor: cursor.execute(f"SELECT COUNT(*) FROM ({query}) {where}", params).fetchone()[0]
+
+
+class PagedList(KeysetList):
+    """Treeview fed page by page from a query through the query worker
+
+    The first page is shown on load and the next one is fetched when the
+    list is scrolled near its end.
+    """
+
+    def __init__(self, app, tree, scrollbar, render, key, descending=False,
+                 count=None, status_label=None, page_size=PAGE_SIZE):
+        super().__init__(app, tree, scrollbar, render, key, descending, count, status_label)
+        self.page_size = page_size
+        self.last_row = None
+        self.loaded = 0
+        self.total = None
+        self.exhausted = True
+        self.loading = False
+        self._shown = {}
+        tree.configure(yscrollcommand=self._on_scroll)
+
+    def load(self, query, params=()):
+        """Show query from the top, keeping as many rows as are loaded now"""
+        self.query = query
+        self.params = tuple(params)
+        limit = max(self.loaded, self.page_size)
+        sql, params = self._select()
+        self._submit(f"{sql} LIMIT ?", params + (limit,), limit, reset=True)
+
+    def restart(self):
+        self.loaded = 0
+        self.tree.yview_moveto(0)
+        self.refresh()
+
+    def load_more(self):
+        """Append the next page, unless one is loading or the end was reached"""
+        if self.loading or self.exhausted or self.query is None:
+            return
+        sql, params = self._select(after=self.last_row)
+        self._submit(f"{sql} LIMIT ?", params + (self.page_size,), self.page_size, reset=False)
+
+    def _submit(self, sql, params, limit, reset):
+        count = self._counter()
+
+        def job(cursor):
+            cursor.execute(sql, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+            return rows, columns, count(cursor) if reset else None
+
+        self.loading = True
+        self.app.worker.submit(self.tree, job, lambda result: self._show(result, limit, reset),
+                               on_error=self._failed)
+
+    def _failed(self, error):
+        """Keep the rows already shown and stop fetching until the next refresh"""
+        self.loading = False
+        self.loaded = len(self._shown)
+        self.exhausted = True
+        self._update_status()
+        messagebox.showerror("Error", f"Failed to load rows: {error}")
+
+    def _show(self, result, limit, reset):
+        rows, self._columns, total = result
+        self.loading = False
+        key_index = self._columns.index(self.key)
+        keyed = [(str(row[key_index]),) + tuple(self.render(row)) for row in rows]
+        if reset:
+            reconcile(self.tree, keyed, self._shown)
+            self.loaded = 0
+            self.total = total
+        else:
+            for iid, values, tags in keyed:
+                # A row may move between pages if the list changed in between
+                if iid not in self._shown:
+                    self.tree.insert('', 'end', iid=iid, values=values, tags=tags)
+                    self._shown[iid] = (tuple(values), tuple(tags))
+        if rows:
+            self.last_row = rows[-1]
+        self.loaded += len(rows)
+        self.exhausted = len(rows) < limit
+        self._update_status()
+
+    def _update_status(self):
+        if self.status_label is None:
+            return
+        if self.total is None:
+            self.status_label.config(text=f"Showing {self.loaded:,}")
+        else:
+            self.status_label.config(text=f"Showing {self.loaded:,} of {self.total:,}")
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) >= PREFETCH_AT:
+            self.load_more()
+
+
+class VirtualList(KeysetList):
+    """Treeview that only holds the rows currently on screen
+
+    The list is addressed by row offset: the scrollbar maps to
+    offset / total, and the rows of the visible window are read from a
+    cache of fixed-size blocks. A block is fetched with a keyset cursor
+    when the block before it is cached (the usual case while scrolling)
+    and with OFFSET only for jumps. Visible items use the row key as their
+    iid, so selection survives scrolling and refreshes.
+    """
+
+    def __init__(self, app, tree, scrollbar, render, key, descending=False,
+                 count=None, status_label=None, block_size=PAGE_SIZE, max_blocks=MAX_BLOCKS):
+        super().__init__(app, tree, scrollbar, render, key, descending, count, status_label)
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.total = 0
+        self.offset = 0
+        self.visible = int(tree.cget('height'))
+        self._blocks = {}       # block index -> rows, least recently used first
+        self._stale = True      # cache and total must be reloaded
+        self._selected = set()  # keys of selected rows, visible or not
+        self._shown_selection = set()
+        self._shown = {}
+        self._select_edge = None  # 0 / -1: select the first / last row after scrolling
+        self._row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand='')
+        tree.bind('<Configure>', self._on_resize)
+        tree.bind('<<TreeviewSelect>>', self._on_select, add='+')
+        tree.bind('<MouseWheel>', lambda e: self.scroll(-3 if e.delta > 0 else 3))
+        tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll(3))
+        tree.bind('<Up>', lambda e: self._step(-1))
+        tree.bind('<Down>', lambda e: self._step(1))
+        tree.bind('<Prior>', lambda e: self.scroll(-self.visible))
+        tree.bind('<Next>', lambda e: self.scroll(self.visible))
+
+    def load(self, query, params=()):
+        """Show query, keeping the scroll position"""
+        self.query = query
+        self.params = tuple(params)
+        self._stale = True
+        self._show_window()
+
+    def restart(self):
+        self.offset = 0
+        self.refresh()
+
+    # ==================== SCROLLING ====================
+
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            self.scroll(step * self.visible if args[2] == 'pages' else step)
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+        return 'break'
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.total - self.visible))
+        if offset != self.offset:
+            self.offset = offset
+            self._show_window()
+
+    def _step(self, direction):
+        """Arrow keys at the first / last visible row scroll the window by one"""
+        items = self.tree.get_children()
+        edge = -1 if direction > 0 else 0
+        if not items or self.tree.focus() != items[edge]:
+            return None  # Treeview moves within the window itself
+        offset = self.offset
+        self._select_edge = edge
+        self.scroll(direction)
+        if self.offset == offset:
+            self._select_edge = None
+        return 'break'
+
+    def _on_resize(self, event):
+        visible = max(1, event.height // self._row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.offset = max(0, min(self.offset, self.total - self.visible))
+            self._show_window()
+
+    def _on_select(self, event):
+        selection = set(self.tree.selection())
+        # Events caused by re-rendering the window keep the selection as it is
+        if selection != self._shown_selection:
+            self._selected = selection
+            self._shown_selection = selection
+
+    # ==================== DATA ====================
+
+    def _needed_blocks(self):
+        first = self.offset // self.block_size
+        last = (self.offset + self.visible - 1) // self.block_size
+        return range(first, last + 1)
+
+    def _show_window(self):
+        if self.query is None:
+            return
+        blocks = self._needed_blocks()
+        if not self._stale and all(b in self._blocks for b in blocks):
+            self._render()
+            return
+        # Plan the fetch on the UI thread: keyset after a cached block, else OFFSET
+        reset = self._stale
+        plan = []
+        for b in blocks:
+            if not reset and b in self._blocks:
+                continue
+            before = None if reset else self._blocks.get(b - 1)
+            if before:
+                sql, params = self._select(after=before[-1])
+                plan.append((b, f"{sql} LIMIT ?", params + (self.block_size,)))
+            else:
+                sql, params = self._select()
+                plan.append((b, f"{sql} LIMIT ? OFFSET ?", params + (self.block_size, b * self.block_size)))
+        self.app.worker.submit(self.tree, self._fetch_job(plan, reset),
+                               lambda result: self._loaded(result, reset))
+
+    def _fetch_job(self, plan, reset):
+        count = self._counter()
+
+        def job(cursor):
+            fetched = {}
+            columns = None
+            for block, sql, params in plan:
+                cursor.execute(sql, params)
+                columns = [column[0] for column in cursor.description]
+                fetched[block] = cursor.fetchall()
+            return fetched, columns, count(cursor) if reset else None
+        return job
+
+    def _loaded(self, result, reset):
+        fetched, columns, total = result
+        if reset:
+            self._blocks.clear()
+            self.total = total
+            self._stale = False
+        if columns is not None:
+            self._columns = columns
+        for block, rows in fetched.items():
+            self._blocks[block] = rows
+            if len(rows) < self.block_size:
+                # Short block: the real end of the list
+                self.total = min(self.total, block * self.block_size + len(rows))
+        needed = set(self._needed_blocks())
+        for block in [b for b in self._blocks if b not in needed][:max(0, len(self._blocks) - self.max_blocks)]:
+            del self._blocks[block]
+        if self.status_label is not None:
+            self.status_label.config(text=f"{self.total:,} rows")
+        offset = max(0, min(self.offset, self.total - self.visible))
+        if offset != self.offset:
+            self.offset = offset
+            self._show_window()
+        else:
+            self._render()
+
+    def _window_rows(self):
+        rows = []
+        for b in self._needed_blocks():
+            block = self._blocks.get(b, [])
+            # Mark as recently used
+            self._blocks.pop(b, None)
+            self._blocks[b] = block
+            start = max(self.offset - b * self.block_size, 0)
+            stop = self.offset + self.visible - b * self.block_size
+            rows.extend(block[start:stop])
+        return rows
+
+    def _render(self):
+        tree = self.tree
+        focus = tree.focus()
+        key_index = self._columns.index(self.key) if self._columns else 0
+        reconcile(tree, [(str(row[key_index]),) + tuple(self.render(row)) for row in self._window_rows()],
+                  self._shown)
+        shown = tree.get_children()
+        if self._select_edge is not None and shown:
+            focus = shown[self._select_edge]
+            self._selected = {focus}
+            self._select_edge = None
+        self._shown_selection = {iid for iid in shown if iid in self._selected}
+        tree.selection_set(list(self._shown_selection))
+        if focus in shown:
+            tree.focus(focus)
+        if self.total:
+            self.scrollbar.set(self.offset / self.total, min(1.0, (self.offset + self.visible) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
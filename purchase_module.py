@@ -5,6 +5,10 @@ Purchase Module with GST Support (India)
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
+from money import to_paise, fmt, plain, gst_breakup, line_amounts
+from paged_list import PagedList, VirtualList, counted, reconcile
+from filter_bar import FilterBar
+from item_picker import ItemPicker
 
 class PurchaseModule:
     def __init__(self, notebook, db, app):
@@ -12,36 +16,27 @@ class PurchaseModule:
         self.db = db
         self.app = app
         self.show_completed_pos = False
-        self.create_inventory_tab()
-        self.create_purchase_order_tab()
-        self.create_suppliers_tab()
-        self.create_goods_receipt_tab()
-        self.create_alerts_tab()
-    
-    def refresh_all(self):
-        self.refresh_inventory()
-        self.refresh_purchase_orders()
-        self.refresh_suppliers()
-        self.refresh_receipt_history()
-        self.refresh_alerts()
-    
-    def calculate_gst_price(self, rate, gst_percent):
-        """Calculate final price from rate and GST"""
-        gst_amount = (rate * gst_percent) / 100
-        final_price = rate + gst_amount
-        return gst_amount, final_price
+        app.add_tab("📦 Inventory", self.create_inventory_tab)
+        app.add_tab("🛒 Purchase Orders", self.create_purchase_order_tab)
+        app.add_tab("🏢 Suppliers", self.create_suppliers_tab)
+        app.add_tab("📥 Goods Receipt", self.create_goods_receipt_tab)
+        app.add_tab("⚠️ Alerts", self.create_alerts_tab)
     
     # ==================== INVENTORY TAB ====================
     
-    def create_inventory_tab(self):
-        inv_frame = ttk.Frame(self.notebook)
-        self.notebook.add(inv_frame, text="📦 Inventory")
+    def create_inventory_tab(self, inv_frame):
         top_btn_frame = ttk.Frame(inv_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
         ttk.Button(top_btn_frame, text="➕ Add Item", command=self.add_new_item).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="✏️ Edit", command=self.edit_item).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🗑️ Delete", command=self.delete_item).pack(side='left', padx=3)
+        ttk.Button(top_btn_frame, text="📜 Stock History", command=self.view_stock_history).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🔄 Refresh", command=self.refresh_inventory).pack(side='right', padx=3)
+        inv_count_label = ttk.Label(top_btn_frame, foreground='gray')
+        inv_count_label.pack(side='right', padx=10)
+        inv_filter = FilterBar(inv_frame, [('prefix', 'name', 'Name'), ('prefix', 'category', 'Category')],
+                               lambda where, params: self.inv_pages.set_filter(where, params))
+        inv_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         columns = ("ID", "Name", "Category", "Qty", "Reorder", "Buy Rate", "Buy GST%", "Buy Price", "Sell Rate", "Sell GST%", "Sell Price", "Status")
         self.inv_tree = ttk.Treeview(inv_frame, columns=columns, show='headings', height=25)
         widths = [40, 140, 100, 60, 70, 90, 70, 100, 90, 70, 100, 70]
@@ -51,30 +46,33 @@ class PurchaseModule:
         self.inv_tree.pack(side='left', fill='both', expand=True, padx=10, pady=(0, 10))
         scrollbar = ttk.Scrollbar(inv_frame, orient='vertical', command=self.inv_tree.yview)
         scrollbar.pack(side='right', fill='y', pady=(0, 10), padx=(0, 10))
-        self.inv_tree.configure(yscrollcommand=scrollbar.set)
+        self.inv_tree.tag_configure('low', background='#ffcccc')
+        self.inv_pages = VirtualList(self.app, self.inv_tree, scrollbar, self.render_inventory_row, 'item_id',
+                                   count=counted('Items'), status_label=inv_count_label)
+        self.inv_pages.sortable({"ID": "item_id", "Name": "name COLLATE NOCASE",
+                                 "Category": "category COLLATE NOCASE", "Qty": "quantity_on_hand"})
+        self.app.watch_tables(self.inv_tree, ('Items', 'Inventory'), self.refresh_inventory)
         self.refresh_inventory()
     
     def refresh_inventory(self):
-        for item in self.inv_tree.get_children():
-            self.inv_tree.delete(item)
-        self.db.execute('''SELECT i.item_id, i.name, i.category, inv.quantity_on_hand, inv.reorder_level,
+        self.inv_pages.load('''SELECT i.item_id, i.name, i.category, inv.quantity_on_hand, inv.reorder_level,
             i.purchase_rate, i.purchase_gst_percent, i.purchase_price, 
             i.selling_rate, i.selling_gst_percent, i.selling_price
-            FROM Items i JOIN Inventory inv ON i.item_id = inv.item_id ORDER BY i.item_id''')
-        for row in self.db.fetchall():
-            status = "LOW" if row[3] <= row[4] else "OK"
-            tag = 'low' if status == "LOW" else ''
-            display_row = (row[0], row[1], row[2], row[3], row[4], 
-                          f"₹{row[5]:.2f}", f"{row[6]:.1f}%", f"₹{row[7]:.2f}",
-                          f"₹{row[8]:.2f}", f"{row[9]:.1f}%", f"₹{row[10]:.2f}", status)
-            self.inv_tree.insert('', 'end', values=display_row, tags=(tag,))
-        self.inv_tree.tag_configure('low', background='#ffcccc')
+            FROM Items i JOIN Inventory inv ON i.item_id = inv.item_id''')
+    
+    def render_inventory_row(self, row):
+        status = "LOW" if row[3] <= row[4] else "OK"
+        tag = 'low' if status == "LOW" else ''
+        display_row = (row[0], row[1], row[2], row[3], row[4], 
+                      fmt(row[5]), f"{row[6]:.1f}%", fmt(row[7]),
+                      fmt(row[8]), f"{row[9]:.1f}%", fmt(row[10]), status)
+        return display_row, (tag,)
     
     def validate_item_data(self, name, purchase_rate, purchase_gst, selling_rate, selling_gst, qty, reorder):
         if not name or not name.strip():
             raise ValueError("Item name cannot be empty")
         try:
-            p_rate = float(purchase_rate)
+            p_rate = to_paise(purchase_rate)
             if p_rate < 0:
                 raise ValueError("Purchase rate cannot be negative")
         except (ValueError, TypeError):
@@ -86,7 +84,7 @@ class PurchaseModule:
         except (ValueError, TypeError):
             raise ValueError("Invalid purchase GST")
         try:
-            s_rate = float(selling_rate)
+            s_rate = to_paise(selling_rate)
             if s_rate < 0:
                 raise ValueError("Selling rate cannot be negative")
         except (ValueError, TypeError):
@@ -153,14 +151,14 @@ class PurchaseModule:
         
         def update_preview(*args):
             try:
-                p_rate = float(entries["p_rate"].get() or 0)
+                p_rate = to_paise(entries["p_rate"].get())
                 p_gst = float(entries["p_gst"].get() or 0)
-                s_rate = float(entries["s_rate"].get() or 0)
+                s_rate = to_paise(entries["s_rate"].get())
                 s_gst = float(entries["s_gst"].get() or 0)
-                _, p_final = self.calculate_gst_price(p_rate, p_gst)
-                _, s_final = self.calculate_gst_price(s_rate, s_gst)
-                p_price_label.config(text=f"₹{p_final:.2f} (Rate: ₹{p_rate:.2f} + GST: ₹{p_final-p_rate:.2f})")
-                s_price_label.config(text=f"₹{s_final:.2f} (Rate: ₹{s_rate:.2f} + GST: ₹{s_final-s_rate:.2f})")
+                p_gst_amt, p_final = gst_breakup(p_rate, p_gst)
+                s_gst_amt, s_final = gst_breakup(s_rate, s_gst)
+                p_price_label.config(text=f"{fmt(p_final)} (Rate: {fmt(p_rate)} + GST: {fmt(p_gst_amt)})")
+                s_price_label.config(text=f"{fmt(s_final)} (Rate: {fmt(s_rate)} + GST: {fmt(s_gst_amt)})")
             except:
                 pass
         
@@ -173,24 +171,29 @@ class PurchaseModule:
                     entries["name"].get(), entries["p_rate"].get(), entries["p_gst"].get(),
                     entries["s_rate"].get(), entries["s_gst"].get(), entries["qty"].get(), entries["reorder"].get())
                 
-                _, p_price = self.calculate_gst_price(p_rate, p_gst)
-                _, s_price = self.calculate_gst_price(s_rate, s_gst)
+                if self.app.master_data.items.by_name(entries["name"].get()) and not messagebox.askyesno(
+                        "Duplicate Name", f"An item named '{entries['name'].get().strip()}' already exists. Add anyway?"):
+                    return
                 
-                self.db.execute("""INSERT INTO Items (name, description, category, unit_of_measure, hsn_code,
-                    purchase_rate, purchase_gst_percent, purchase_price, 
-                    selling_rate, selling_gst_percent, selling_price) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (entries["name"].get().strip(), entries["desc"].get(), entries["cat"].get(), 
-                     entries["uom"].get(), entries["hsn"].get(), p_rate, p_gst, p_price, s_rate, s_gst, s_price))
-                item_id = self.db.lastrowid()
+                _, p_price = gst_breakup(p_rate, p_gst)
+                _, s_price = gst_breakup(s_rate, s_gst)
                 
-                self.db.execute("INSERT INTO Inventory (item_id, quantity_on_hand, reorder_level, location, last_updated) VALUES (?, ?, ?, ?, ?)",
-                    (item_id, qty_val, reorder_val, entries["loc"].get(), datetime.now()))
+                with self.db.transaction():
+                    self.db.execute("""INSERT INTO Items (name, description, category, unit_of_measure, hsn_code,
+                        purchase_rate, purchase_gst_percent, purchase_price, 
+                        selling_rate, selling_gst_percent, selling_price) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                        (entries["name"].get().strip(), entries["desc"].get(), entries["cat"].get(), 
+                         entries["uom"].get(), entries["hsn"].get(), p_rate, p_gst, p_price, s_rate, s_gst, s_price))
+                    item_id = self.db.lastrowid()
+                    
+                    # Initial quantity is posted through the stock ledger as the opening balance
+                    self.db.execute("INSERT INTO Inventory (item_id, quantity_on_hand, reorder_level, location, last_updated) VALUES (?, ?, ?, ?, ?)",
+                        (item_id, 0, reorder_val, entries["loc"].get(), datetime.now()))
+                    self.db.apply_stock_deltas([(item_id, qty_val)], 'opening', item_id)
                 
-                self.db.commit()
-                messagebox.showinfo("Success", f"Item added!\nPurchase: ₹{p_price:.2f}\nSelling: ₹{s_price:.2f}")
+                messagebox.showinfo("Success", f"Item added!\nPurchase: {fmt(p_price)}\nSelling: {fmt(s_price)}")
                 dialog.destroy()
-                self.app.refresh_all_tabs()
             except ValueError as ve:
                 messagebox.showerror("Validation Error", str(ve))
             except Exception as e:
@@ -199,21 +202,28 @@ class PurchaseModule:
         ttk.Button(dialog, text="Save Item", command=save).grid(row=len(fields)+2, column=0, columnspan=2, pady=15)
         update_preview()
     
-    def edit_item(self):
-        selected = self.inv_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Please select an item")
+    def edit_item(self, item_id=None):
+        """Edit the selected item, or item_id (e.g. from a search hit)"""
+        if item_id is None:
+            selected = self.inv_tree.selection()
+            if not selected:
+                messagebox.showwarning("Warning", "Please select an item")
+                return
+            
+            # Get item ID from first column
+            values = self.inv_tree.item(selected[0])['values']
+            item_id = values[0]
+        
+        item = self.app.master_data.items.get(item_id)
+        stock = None
+        if item is not None:
+            self.db.execute("SELECT quantity_on_hand, reorder_level, location FROM Inventory WHERE item_id = ?", (item_id,))
+            stock = self.db.fetchone()
+        if stock is None:
+            messagebox.showwarning("Warning", "This item no longer exists")
             return
-        
-        # Get item ID from first column
-        values = self.inv_tree.item(selected[0])['values']
-        item_id = values[0]
-        
-        self.db.execute('''SELECT i.name, i.description, i.category, i.unit_of_measure, i.hsn_code,
-            i.purchase_rate, i.purchase_gst_percent, i.selling_rate, i.selling_gst_percent,
-            inv.quantity_on_hand, inv.reorder_level, inv.location
-            FROM Items i JOIN Inventory inv ON i.item_id = inv.item_id WHERE i.item_id = ?''', (item_id,))
-        data = self.db.fetchone()
+        data = (item.name, item.description, item.category, item.unit_of_measure, item.hsn_code,
+                item.purchase_rate, item.purchase_gst_percent, item.selling_rate, item.selling_gst_percent) + stock
         
         dialog = tk.Toplevel(self.app.root)
         dialog.title("Edit Item")
@@ -227,9 +237,9 @@ class PurchaseModule:
             ("Category:", data[2] or ""),
             ("Unit of Measure:", data[3] or ""),
             ("HSN Code:", data[4] or ""),
-            ("Purchase Rate (₹):", data[5]),
+            ("Purchase Rate (₹):", plain(data[5])),
             ("Purchase GST (%):", data[6]),
-            ("Selling Rate (₹):", data[7]),
+            ("Selling Rate (₹):", plain(data[7])),
             ("Selling GST (%):", data[8]),
             ("Quantity:", data[9]),
             ("Reorder Level:", data[10]),
@@ -252,14 +262,14 @@ class PurchaseModule:
         
         def update_preview(*args):
             try:
-                p_rate = float(entries[5].get() or 0)
+                p_rate = to_paise(entries[5].get())
                 p_gst = float(entries[6].get() or 0)
-                s_rate = float(entries[7].get() or 0)
+                s_rate = to_paise(entries[7].get())
                 s_gst = float(entries[8].get() or 0)
-                _, p_final = self.calculate_gst_price(p_rate, p_gst)
-                _, s_final = self.calculate_gst_price(s_rate, s_gst)
-                p_price_label.config(text=f"Purchase Price: ₹{p_final:.2f}")
-                s_price_label.config(text=f"Selling Price: ₹{s_final:.2f}")
+                _, p_final = gst_breakup(p_rate, p_gst)
+                _, s_final = gst_breakup(s_rate, s_gst)
+                p_price_label.config(text=f"Purchase Price: {fmt(p_final)}")
+                s_price_label.config(text=f"Selling Price: {fmt(s_final)}")
             except:
                 pass
         
@@ -272,20 +282,23 @@ class PurchaseModule:
                     entries[0].get(), entries[5].get(), entries[6].get(),
                     entries[7].get(), entries[8].get(), entries[9].get(), entries[10].get())
                 
-                _, p_price = self.calculate_gst_price(p_rate, p_gst)
-                _, s_price = self.calculate_gst_price(s_rate, s_gst)
+                _, p_price = gst_breakup(p_rate, p_gst)
+                _, s_price = gst_breakup(s_rate, s_gst)
                 
-                self.db.execute("""UPDATE Items SET name=?, description=?, category=?, unit_of_measure=?, hsn_code=?,
-                    purchase_rate=?, purchase_gst_percent=?, purchase_price=?,
-                    selling_rate=?, selling_gst_percent=?, selling_price=? WHERE item_id=?""",
-                    (entries[0].get().strip(), entries[1].get(), entries[2].get(), entries[3].get(), entries[4].get(),
-                     p_rate, p_gst, p_price, s_rate, s_gst, s_price, item_id))
-                self.db.execute("UPDATE Inventory SET quantity_on_hand=?, reorder_level=?, location=?, last_updated=? WHERE item_id=?",
-                    (qty_val, reorder_val, entries[11].get(), datetime.now(), item_id))
-                self.db.commit()
+                with self.db.transaction():
+                    self.db.execute("""UPDATE Items SET name=?, description=?, category=?, unit_of_measure=?, hsn_code=?,
+                        purchase_rate=?, purchase_gst_percent=?, purchase_price=?,
+                        selling_rate=?, selling_gst_percent=?, selling_price=? WHERE item_id=?""",
+                        (entries[0].get().strip(), entries[1].get(), entries[2].get(), entries[3].get(), entries[4].get(),
+                         p_rate, p_gst, p_price, s_rate, s_gst, s_price, item_id))
+                    self.db.execute("UPDATE Inventory SET reorder_level=?, location=?, last_updated=? WHERE item_id=?",
+                        (reorder_val, entries[11].get(), datetime.now(), item_id))
+                    
+                    # A changed quantity is a manual stock adjustment
+                    self.db.execute("SELECT quantity_on_hand FROM Inventory WHERE item_id=?", (item_id,))
+                    self.db.apply_stock_deltas([(item_id, qty_val - self.db.fetchone()[0])], 'adjustment', item_id)
                 messagebox.showinfo("Success", "Item updated!")
                 dialog.destroy()
-                self.app.refresh_all_tabs()
             except ValueError as ve:
                 messagebox.showerror("Validation Error", str(ve))
             except Exception as e:
@@ -320,19 +333,77 @@ class PurchaseModule:
         
         if messagebox.askyesno("Confirm", f"Delete '{item_name}'?"):
             try:
-                self.db.execute("DELETE FROM Inventory WHERE item_id = ?", (item_id,))
-                self.db.execute("DELETE FROM Items WHERE item_id = ?", (item_id,))
-                self.db.commit()
+                with self.db.transaction():
+                    # Close the item's ledger before its inventory row goes
+                    self.db.execute("SELECT quantity_on_hand FROM Inventory WHERE item_id = ?", (item_id,))
+                    row = self.db.fetchone()
+                    if row:
+                        self.db.apply_stock_deltas([(item_id, -row[0])], 'item_deleted', item_id)
+                    self.db.execute("DELETE FROM Inventory WHERE item_id = ?", (item_id,))
+                    self.db.execute("DELETE FROM Items WHERE item_id = ?", (item_id,))
                 messagebox.showinfo("Success", "Deleted!")
-                self.app.refresh_all_tabs()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
     
+    def view_stock_history(self):
+        """Show the stock ledger of the selected item and its stock on a given date"""
+        selected = self.inv_tree.selection()
+        if not selected:
+            messagebox.showwarning("Warning", "Please select an item")
+            return
+        values = self.inv_tree.item(selected[0])['values']
+        item_id, item_name = values[0], values[1]
+        
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title(f"Stock History - {item_name}")
+        dialog.geometry("800x550")
+        dialog.transient(self.app.root)
+        
+        as_of_frame = ttk.LabelFrame(dialog, text="Stock As Of", padding=10)
+        as_of_frame.pack(fill='x', padx=10, pady=10)
+        
+        ttk.Label(as_of_frame, text="Date (YYYY-MM-DD):").pack(side='left', padx=5)
+        date_entry = ttk.Entry(as_of_frame, width=15)
+        date_entry.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        date_entry.pack(side='left', padx=5)
+        result_label = ttk.Label(as_of_frame, text="", font=('Arial', 10, 'bold'), foreground='blue')
+        
+        def check_stock():
+            try:
+                as_of = datetime.strptime(date_entry.get().strip(), "%Y-%m-%d").date()
+            except ValueError:
+                messagebox.showerror("Error", "Enter date as YYYY-MM-DD")
+                return
+            qty = self.db.stock_as_of(as_of, item_id)
+            result_label.config(text=f"{qty} on hand at end of {as_of}")
+        
+        ttk.Button(as_of_frame, text="Check", command=check_stock).pack(side='left', padx=5)
+        result_label.pack(side='left', padx=15)
+        
+        history_frame = ttk.LabelFrame(dialog, text="Movements", padding=10)
+        history_frame.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        columns = ("Date/Time", "Type", "Reference", "Change", "Balance")
+        tree = ttk.Treeview(history_frame, columns=columns, show='headings', height=15)
+        col_widths = [180, 120, 140, 80, 80]
+        for i, col in enumerate(columns):
+            tree.heading(col, text=col)
+            tree.column(col, width=col_widths[i])
+        tree.pack(side='left', fill='both', expand=True)
+        scrollbar = ttk.Scrollbar(history_frame, orient='vertical', command=tree.yview)
+        scrollbar.pack(side='right', fill='y')
+        tree.configure(yscrollcommand=scrollbar.set)
+        
+        references = {'receipt': "PO #{}", 'receipt_edit': "PO #{}", 'delivery': "Delivery Note #{}"}
+        for movement_time, source_type, source_id, delta, balance in self.db.stock_movements(item_id):
+            reference = references.get(source_type, "").format(source_id)
+            tree.insert('', 'end', values=(str(movement_time)[:19], source_type.replace('_', ' ').title(),
+                                           reference, f"{delta:+d}", balance))
+        check_stock()
+    
     # ==================== PURCHASE ORDERS TAB ====================
     
-    def create_purchase_order_tab(self):
-        po_frame = ttk.Frame(self.notebook)
-        self.notebook.add(po_frame, text="🛒 Purchase Orders")
+    def create_purchase_order_tab(self, po_frame):
         top_btn_frame = ttk.Frame(po_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
         ttk.Button(top_btn_frame, text="➕ Create PO", command=self.create_purchase_order).pack(side='left', padx=3)
@@ -341,6 +412,14 @@ class PurchaseModule:
         self.toggle_completed_btn = ttk.Button(top_btn_frame, text = "👁️ Show Completed", command=self.toggle_completed_orders)
         self.toggle_completed_btn.pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🔄 Refresh", command=self.refresh_purchase_orders).pack(side='right', padx=3)
+        po_count_label = ttk.Label(top_btn_frame, foreground='gray')
+        po_count_label.pack(side='right', padx=10)
+        po_filter = FilterBar(po_frame, [
+            ('choice', 'status', 'Status', ("Pending", "Partially Received", "Completed")),
+            ('dates', 'order_date', 'Order Date'), ('prefix', 'name', 'Supplier'),
+            ('amount', 'total_amount', 'Total')],
+            lambda where, params: self.po_pages.set_filter(where, params))
+        po_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         columns = ("PO#", "Supplier", "Order Date", "Delivery", "Status", "Subtotal", "GST", "Total", "Items")
         self.po_tree = ttk.Treeview(po_frame, columns=columns, show='headings', height=25)
         widths = [50, 130, 90, 90, 90, 80, 70, 90, 50]
@@ -350,7 +429,14 @@ class PurchaseModule:
         self.po_tree.pack(side='left', fill='both', expand=True, padx=10, pady=(0, 10))
         scrollbar = ttk.Scrollbar(po_frame, orient='vertical', command=self.po_tree.yview)
         scrollbar.pack(side='right', fill='y', pady=(0, 10), padx=(0, 10))
-        self.po_tree.configure(yscrollcommand=scrollbar.set)
+        # Completed orders are grayed out
+        self.po_tree.tag_configure('completed', background='#e8e8e8', foreground='#666666')
+        self.po_pages = VirtualList(self.app, self.po_tree, scrollbar, self.render_purchase_order_row,
+                                  'po_number', descending=True, status_label=po_count_label)
+        self.po_pages.sortable({"PO#": "po_number", "Supplier": "name COLLATE NOCASE", "Order Date": "order_date",
+                                "Status": "status", "Total": "total_amount"})
+        self.app.watch_tables(self.po_tree, ('Purchase_Orders', 'Purchase_Order_Items', 'Suppliers'),
+                              self.refresh_purchase_orders)
         self.refresh_purchase_orders()
     
     def toggle_completed_orders(self):
@@ -363,44 +449,33 @@ class PurchaseModule:
         self.refresh_purchase_orders()
     
     def refresh_purchase_orders(self):
-        for item in self.po_tree.get_children():
-            self.po_tree.delete(item)
-    
         # Build query based on filter
         if self.show_completed_pos:
             query = '''SELECT po.po_number, s.name, po.order_date, po.expected_delivery, po.status, 
                 po.subtotal, po.total_gst, po.total_amount,
                 (SELECT COUNT(*) FROM Purchase_Order_Items WHERE po_number = po.po_number) as item_count
-                FROM Purchase_Orders po JOIN Suppliers s ON po.supplier_id = s.supplier_id 
-                ORDER BY po.po_number DESC'''
+                FROM Purchase_Orders po JOIN Suppliers s ON po.supplier_id = s.supplier_id'''
+            self.po_pages.count = counted('Purchase_Orders')
         else:
             query = '''SELECT po.po_number, s.name, po.order_date, po.expected_delivery, po.status, 
                 po.subtotal, po.total_gst, po.total_amount,
                 (SELECT COUNT(*) FROM Purchase_Order_Items WHERE po_number = po.po_number) as item_count
                 FROM Purchase_Orders po JOIN Suppliers s ON po.supplier_id = s.supplier_id 
                 WHERE po.status != 'Completed'
-                ORDER BY po.po_number DESC'''
+                '''
+            self.po_pages.count = counted('Purchase_Orders', exclude=('Completed',))
+        self.po_pages.load(query)
     
-        self.db.execute(query)
-        for row in self.db.fetchall():
-            display_row = (row[0], row[1], row[2], row[3], row[4], 
-                          f"₹{row[5]:.2f}", f"₹{row[6]:.2f}", f"₹{row[7]:.2f}", row[8])
-            # Optionally color completed orders differently
-            if row[4] == "Completed":
-                self.po_tree.insert('', 'end', values=display_row, tags=('completed',))
-            else:
-                self.po_tree.insert('', 'end', values=display_row)
-    
-        # Configure tag for completed orders (grayed out)
-        self.po_tree.tag_configure('completed', background='#e8e8e8', foreground='#666666')
+    def render_purchase_order_row(self, row):
+        display_row = (row[0], row[1], row[2], row[3], row[4], 
+                      fmt(row[5]), fmt(row[6]), fmt(row[7]), row[8])
+        return display_row, ('completed',) if row[4] == "Completed" else ()
     
     def create_purchase_order(self):
-        self.db.execute("SELECT COUNT(*) FROM Suppliers")
-        if self.db.fetchone()[0] == 0:
+        if self.db.get_counter('Suppliers') == 0:
             messagebox.showwarning("Warning", "Add suppliers first")
             return
-        self.db.execute("SELECT COUNT(*) FROM Items")
-        if self.db.fetchone()[0] == 0:
+        if self.db.get_counter('Items') == 0:
             messagebox.showwarning("Warning", "Add items first")
             return
         
@@ -412,11 +487,9 @@ class PurchaseModule:
         
         # Supplier
         ttk.Label(dialog, text="Supplier:*", font=('Arial', 10, 'bold')).grid(row=0, column=0, padx=10, pady=10, sticky='w')
-        self.db.execute("SELECT supplier_id, name, gstin FROM Suppliers ORDER BY name")
-        suppliers = self.db.fetchall()
-        supplier_dict = {f"{s[1]} (GSTIN: {s[2] or 'N/A'})": s[0] for s in suppliers}
+        supplier_choices = self.app.master_data.suppliers.choices()
         supplier_var = tk.StringVar()
-        supplier_combo = ttk.Combobox(dialog, textvariable=supplier_var, values=list(supplier_dict.keys()), width=50, state='readonly')
+        supplier_combo = ttk.Combobox(dialog, textvariable=supplier_var, values=list(supplier_choices), width=50, state='readonly')
         supplier_combo.grid(row=0, column=1, padx=10, pady=10, columnspan=3)
         
         # Delivery Date
@@ -430,12 +503,13 @@ class PurchaseModule:
         item_frame.grid(row=3, column=0, columnspan=4, padx=10, pady=10, sticky='ew')
         
         ttk.Label(item_frame, text="Item:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        self.db.execute("SELECT item_id, name, purchase_rate, purchase_gst_percent, purchase_price FROM Items ORDER BY name")
-        items = self.db.fetchall()
-        item_dict = {f"{i[1]} (Rate: ₹{i[2]:.2f} + {i[3]:.1f}% GST = ₹{i[4]:.2f})": (i[0], i[2], i[3]) for i in items}
-        item_var = tk.StringVar()
-        item_combo = ttk.Combobox(item_frame, textvariable=item_var, values=list(item_dict.keys()), width=50, state='readonly')
-        item_combo.grid(row=0, column=1, padx=5, pady=5, columnspan=2)
+        
+        def find_items(text, limit):
+            ids = [row[0] for row in self.db.search_items(text, limit, select="i.item_id")]
+            return [(item.purchase_label(), item) for item in self.app.master_data.items.get_many(ids)]
+        
+        item_picker = ItemPicker(item_frame, find_items, width=50)
+        item_picker.grid(row=0, column=1, padx=5, pady=5, columnspan=2)
         
         ttk.Label(item_frame, text="Qty:").grid(row=0, column=3, padx=5, pady=5)
         qty_entry = ttk.Entry(item_frame, width=10)
@@ -444,7 +518,7 @@ class PurchaseModule:
         selected_items = []
         
         def add_item():
-            if not item_var.get():
+            if item_picker.value is None:
                 messagebox.showwarning("Warning", "Select an item")
                 return
             try:
@@ -452,19 +526,19 @@ class PurchaseModule:
                 if qty <= 0:
                     messagebox.showerror("Error", "Quantity must be positive")
                     return
-                item_id, rate, gst_percent = item_dict[item_var.get()]
-                item_name = item_var.get().split(' (Rate:')[0]
+                item = item_picker.value
+                item_id, item_name, rate, gst_percent = item.id, item.name, item.purchase_rate, item.purchase_gst_percent
                 
                 for existing in selected_items:
                     if existing[0] == item_id:
                         messagebox.showwarning("Warning", "Item already added")
                         return
                 
-                gst_amt, total = self.calculate_gst_price(rate * qty, gst_percent)
+                _, gst_amt, total = line_amounts(rate, qty, gst_percent)
                 selected_items.append((item_id, item_name, qty, rate, gst_percent, gst_amt, total))
-                items_tree.insert('', 'end', values=(item_name, qty, f"₹{rate:.2f}", f"{gst_percent:.1f}%", f"₹{gst_amt:.2f}", f"₹{total:.2f}"))
+                items_tree.insert('', 'end', values=(item_name, qty, fmt(rate), f"{gst_percent:.1f}%", fmt(gst_amt), fmt(total)))
                 update_total()
-                item_var.set('')
+                item_picker.clear()
                 qty_entry.delete(0, tk.END)
             except ValueError:
                 messagebox.showerror("Error", "Invalid quantity")
@@ -483,7 +557,7 @@ class PurchaseModule:
             subtotal = sum(item[3] * item[2] for item in selected_items)
             total_gst = sum(item[5] for item in selected_items)
             total = sum(item[6] for item in selected_items)
-            total_label.config(text=f"Subtotal: ₹{subtotal:.2f}  |  GST: ₹{total_gst:.2f}  |  Total: ₹{total:.2f}")
+            total_label.config(text=f"Subtotal: {fmt(subtotal)}  |  GST: {fmt(total_gst)}  |  Total: {fmt(total)}")
         
         ttk.Button(item_frame, text="➕ Add", command=add_item).grid(row=0, column=5, padx=5, pady=5)
         ttk.Button(item_frame, text="➖ Remove", command=remove_item).grid(row=0, column=6, padx=5, pady=5)
@@ -514,23 +588,22 @@ class PurchaseModule:
                     messagebox.showerror("Error", "Add at least one item")
                     return
                 
-                supplier_id = supplier_dict[supplier_var.get()]
+                supplier_id = supplier_choices[supplier_var.get()].id
                 subtotal = sum(item[3] * item[2] for item in selected_items)
                 total_gst = sum(item[5] for item in selected_items)
                 total_amount = sum(item[6] for item in selected_items)
                 
-                self.db.execute("INSERT INTO Purchase_Orders (supplier_id, order_date, expected_delivery, status, subtotal, total_gst, total_amount) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (supplier_id, datetime.now().date(), delivery_entry.get(), "Pending", subtotal, total_gst, total_amount))
-                po_number = self.db.lastrowid()
-                
-                for item_id, item_name, qty, rate, gst_percent, gst_amt, total in selected_items:
-                    self.db.execute("INSERT INTO Purchase_Order_Items (po_number, item_id, quantity, rate, gst_percent, gst_amount, total_price) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (po_number, item_id, qty, rate, gst_percent, gst_amt, total))
+                with self.db.transaction():
+                    self.db.execute("INSERT INTO Purchase_Orders (supplier_id, order_date, expected_delivery, status, subtotal, total_gst, total_amount) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (supplier_id, datetime.now().date(), delivery_entry.get(), "Pending", subtotal, total_gst, total_amount))
+                    po_number = self.db.lastrowid()
+                    
+                    self.db.insert_order_lines('purchase', po_number,
+                        [(item_id, qty, rate, gst_percent, gst_amt, total)
+                         for item_id, item_name, qty, rate, gst_percent, gst_amt, total in selected_items])
                 
-                self.db.commit()
-                messagebox.showinfo("Success", f"PO #{po_number} created!\n\nItems: {len(selected_items)}\nSubtotal: ₹{subtotal:.2f}\nGST: ₹{total_gst:.2f}\nTotal: ₹{total_amount:.2f}")
+                messagebox.showinfo("Success", f"PO #{po_number} created!\n\nItems: {len(selected_items)}\nSubtotal: {fmt(subtotal)}\nGST: {fmt(total_gst)}\nTotal: {fmt(total_amount)}")
                 dialog.destroy()
-                self.refresh_purchase_orders()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed: {str(e)}")
         
@@ -554,11 +627,10 @@ class PurchaseModule:
         
         if messagebox.askyesno("Confirm", f"Delete PO #{po_number} and all items?"):
             try:
-                self.db.execute("DELETE FROM Purchase_Order_Items WHERE po_number = ?", (po_number,))
-                self.db.execute("DELETE FROM Purchase_Orders WHERE po_number = ?", (po_number,))
-                self.db.commit()
+                with self.db.transaction():
+                    self.db.execute("DELETE FROM Purchase_Order_Items WHERE po_number = ?", (po_number,))
+                    self.db.execute("DELETE FROM Purchase_Orders WHERE po_number = ?", (po_number,))
                 messagebox.showinfo("Success", f"PO #{po_number} deleted!")
-                self.refresh_purchase_orders()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
     
@@ -601,44 +673,49 @@ class PurchaseModule:
         summary_frame.pack(fill='x', padx=10, pady=10)
         
         ttk.Label(summary_frame, text=f"Subtotal (Before GST):", font=('Arial', 10)).grid(row=0, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{po_info[6]:.2f}", font=('Arial', 10, 'bold')).grid(row=0, column=1, sticky='e', padx=10, pady=3)
+        ttk.Label(summary_frame, text=fmt(po_info[6]), font=('Arial', 10, 'bold')).grid(row=0, column=1, sticky='e', padx=10, pady=3)
         
         ttk.Label(summary_frame, text=f"Total GST:", font=('Arial', 10)).grid(row=1, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{po_info[7]:.2f}", font=('Arial', 10, 'bold'), foreground='blue').grid(row=1, column=1, sticky='e', padx=10, pady=3)
+        ttk.Label(summary_frame, text=fmt(po_info[7]), font=('Arial', 10, 'bold'), foreground='blue').grid(row=1, column=1, sticky='e', padx=10, pady=3)
         
         ttk.Separator(summary_frame, orient='horizontal').grid(row=2, column=0, columnspan=2, sticky='ew', padx=10, pady=5)
         
         ttk.Label(summary_frame, text=f"Total Amount:", font=('Arial', 11, 'bold')).grid(row=3, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{po_info[8]:.2f}", font=('Arial', 11, 'bold'), foreground='green').grid(row=3, column=1, sticky='e', padx=10, pady=3)
+        ttk.Label(summary_frame, text=fmt(po_info[8]), font=('Arial', 11, 'bold'), foreground='green').grid(row=3, column=1, sticky='e', padx=10, pady=3)
         
         # Items
         items_frame = ttk.LabelFrame(dialog, text="Items", padding=10)
         items_frame.pack(fill='both', expand=True, padx=10, pady=10)
         
-        columns = ("Item", "Qty", "Rate", "GST%", "GST Amount", "Total Price")
+        columns = ("Item", "Qty", "Received", "Rejected", "Rate", "GST%", "GST Amount", "Total Price")
         tree = ttk.Treeview(items_frame, columns=columns, show='headings', height=10)
-        col_widths = [300, 70, 100, 80, 120, 120]
+        col_widths = [260, 60, 80, 80, 100, 70, 110, 110]
         for i, col in enumerate(columns):
             tree.heading(col, text=col)
             tree.column(col, width=col_widths[i])
         tree.pack(fill='both', expand=True)
         
-        self.db.execute('''SELECT i.name, poi.quantity, poi.rate, poi.gst_percent, poi.gst_amount, poi.total_price
+        self.db.execute('''SELECT i.name, poi.quantity, poi.received_quantity, poi.rejected_quantity,
+            poi.rate, poi.gst_percent, poi.gst_amount, poi.total_price
             FROM Purchase_Order_Items poi JOIN Items i ON poi.item_id = i.item_id WHERE poi.po_number = ?''', (po_number,))
         for row in self.db.fetchall():
-            tree.insert('', 'end', values=(row[0], row[1], f"₹{row[2]:.2f}", f"{row[3]:.1f}%", f"₹{row[4]:.2f}", f"₹{row[5]:.2f}"))
+            tree.insert('', 'end', values=(row[0], row[1], row[2], row[3],
+                fmt(row[4]), f"{row[5]:.1f}%", fmt(row[6]), fmt(row[7])))
     
     # ==================== SUPPLIERS TAB ====================
     
-    def create_suppliers_tab(self):
-        sup_frame = ttk.Frame(self.notebook)
-        self.notebook.add(sup_frame, text="🏢 Suppliers")
+    def create_suppliers_tab(self, sup_frame):
         top_btn_frame = ttk.Frame(sup_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
         ttk.Button(top_btn_frame, text="➕ Add", command=self.add_supplier).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="✏️ Edit", command=self.edit_supplier).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🗑️ Delete", command=self.delete_supplier).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🔄 Refresh", command=self.refresh_suppliers).pack(side='right', padx=3)
+        sup_count_label = ttk.Label(top_btn_frame, foreground='gray')
+        sup_count_label.pack(side='right', padx=10)
+        sup_filter = FilterBar(sup_frame, [('prefix', 'name', 'Name')],
+                               lambda where, params: self.sup_pages.set_filter(where, params))
+        sup_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         columns = ("ID", "Name", "Contact", "Phone", "Email", "GSTIN", "Terms")
         self.sup_tree = ttk.Treeview(sup_frame, columns=columns, show='headings', height=25)
         widths = [40, 150, 120, 100, 150, 150, 100]
@@ -648,15 +725,14 @@ class PurchaseModule:
         self.sup_tree.pack(side='left', fill='both', expand=True, padx=10, pady=(0, 10))
         scrollbar = ttk.Scrollbar(sup_frame, orient='vertical', command=self.sup_tree.yview)
         scrollbar.pack(side='right', fill='y', pady=(0, 10), padx=(0, 10))
-        self.sup_tree.configure(yscrollcommand=scrollbar.set)
+        self.sup_pages = PagedList(self.app, self.sup_tree, scrollbar, lambda row: (row, ()), 'supplier_id',
+                                   count=counted('Suppliers'), status_label=sup_count_label)
+        self.sup_pages.sortable({"ID": "supplier_id", "Name": "name COLLATE NOCASE"})
+        self.app.watch_tables(self.sup_tree, ('Suppliers',), self.refresh_suppliers)
         self.refresh_suppliers()
     
     def refresh_suppliers(self):
-        for item in self.sup_tree.get_children():
-            self.sup_tree.delete(item)
-        self.db.execute("SELECT supplier_id, name, contact_person, phone, email, gstin, payment_terms FROM Suppliers")
-        for row in self.db.fetchall():
-            self.sup_tree.insert('', 'end', values=row)
+        self.sup_pages.load("SELECT supplier_id, name, contact_person, phone, email, gstin, payment_terms FROM Suppliers")
     
     def add_supplier(self):
         dialog = tk.Toplevel(self.app.root)
@@ -678,25 +754,32 @@ class PurchaseModule:
                 if not entries["name"].get().strip():
                     messagebox.showerror("Error", "Supplier name required")
                     return
+                if self.app.master_data.suppliers.by_name(entries["name"].get()) and not messagebox.askyesno(
+                        "Duplicate Name", f"A supplier named '{entries['name'].get().strip()}' already exists. Add anyway?"):
+                    return
                 self.db.execute("INSERT INTO Suppliers (name, contact_person, phone, email, address, gstin, payment_terms) VALUES (?, ?, ?, ?, ?, ?, ?)",
                     (entries["name"].get().strip(), entries["contact"].get(), entries["phone"].get(),
                      entries["email"].get(), entries["address"].get(), entries["gstin"].get(), entries["terms"].get()))
                 self.db.commit()
                 messagebox.showinfo("Success", "Supplier added!")
                 dialog.destroy()
-                self.refresh_suppliers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         ttk.Button(dialog, text="Save", command=save).grid(row=len(fields), column=0, columnspan=2, pady=15)
     
-    def edit_supplier(self):
-        selected = self.sup_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Select a supplier")
+    def edit_supplier(self, supplier_id=None):
+        """Edit the selected supplier, or supplier_id (e.g. from a search hit)"""
+        if supplier_id is None:
+            selected = self.sup_tree.selection()
+            if not selected:
+                messagebox.showwarning("Warning", "Select a supplier")
+                return
+            supplier_id = self.sup_tree.item(selected[0])['values'][0]
+        s = self.app.master_data.suppliers.get(supplier_id)
+        if s is None:
+            messagebox.showwarning("Warning", "This supplier no longer exists")
             return
-        supplier_id = self.sup_tree.item(selected[0])['values'][0]
-        self.db.execute("SELECT name, contact_person, phone, email, address, gstin, payment_terms FROM Suppliers WHERE supplier_id = ?", (supplier_id,))
-        data = self.db.fetchone()
+        data = (s.name, s.contact_person, s.phone, s.email, s.address, s.gstin, s.payment_terms)
         dialog = tk.Toplevel(self.app.root)
         dialog.title("Edit Supplier")
         dialog.geometry("500x400")
@@ -721,7 +804,6 @@ class PurchaseModule:
                 self.db.commit()
                 messagebox.showinfo("Success", "Updated!")
                 dialog.destroy()
-                self.refresh_suppliers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         ttk.Button(dialog, text="Update", command=update).grid(row=len(fields), column=0, columnspan=2, pady=15)
@@ -741,21 +823,23 @@ class PurchaseModule:
                 self.db.execute("DELETE FROM Suppliers WHERE supplier_id = ?", (supplier_id,))
                 self.db.commit()
                 messagebox.showinfo("Success", "Deleted!")
-                self.refresh_suppliers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
             
             # ==================== GOODS RECEIPT TABS ====================
-    def create_goods_receipt_tab(self):
+    def create_goods_receipt_tab(self, gr_frame):
         """Create goods receipt tab"""
-        gr_frame = ttk.Frame(self.notebook)
-        self.notebook.add(gr_frame, text="📥 Goods Receipt")
     
         top_frame = ttk.Frame(gr_frame)
         top_frame.pack(side='top', fill='x', padx=10, pady=10)
         
         ttk.Button(top_frame, text="➕ New Receipt", command=self.new_goods_receipt).pack(side = 'left',padx=2)
+        receipt_count_label = ttk.Label(top_frame, foreground='gray')
+        receipt_count_label.pack(side='right', padx=10)
     
+        receipt_filter = FilterBar(gr_frame, [('dates', 'receipt_date', 'Date'), ('prefix', 'name', 'Supplier')],
+                                   lambda where, params: self.receipt_pages.set_filter(where, params))
+        receipt_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         history_frame = ttk.LabelFrame(gr_frame, text="Receipt History", padding=10)
         history_frame.pack(fill='both', expand=True, padx=10, pady=10)
     
@@ -771,21 +855,20 @@ class PurchaseModule:
     
         scrollbar = ttk.Scrollbar(history_frame, orient='vertical', command=self.receipt_tree.yview)
         scrollbar.pack(side='right', fill='y')
-        self.receipt_tree.configure(yscrollcommand=scrollbar.set)
+        self.receipt_pages = PagedList(self.app, self.receipt_tree, scrollbar, lambda row: (row, ()), 'receipt_id',
+                                       status_label=receipt_count_label)
     
         # Bind double-click to view details
         self.receipt_tree.bind('<Double-1>', lambda e: self.view_receipt_details())
         ttk.Button(top_frame, text="✏️ Edit Receipt", command=self.edit_receipt).pack(side = 'left',padx=2)
         
+        self.app.watch_tables(self.receipt_tree, ('Goods_Receipt', 'Suppliers'), self.refresh_receipt_history)
         self.refresh_receipt_history()
     
     def refresh_receipt_history(self):
         """Refresh goods receipt history - showing grouped receipts"""
-        for item in self.receipt_tree.get_children():
-            self.receipt_tree.delete(item)
-        
         # Get unique receipts grouped by invoice number and PO
-        self.db.execute('''
+        self.receipt_pages.load('''
             SELECT 
                 MIN(gr.receipt_id) as receipt_id,
                 gr.po_number, 
@@ -798,21 +881,24 @@ class PurchaseModule:
                 FROM Goods_Receipt gr
                 JOIN Suppliers s ON gr.supplier_id = s.supplier_id
             GROUP BY gr.invoice_number, gr.po_number, gr.receipt_date
-            ORDER BY MIN(gr.receipt_id) 
         ''')
     
-        for row in self.db.fetchall():
-            self.receipt_tree.insert('', 'end', values=row)
-    
-    def view_receipt_details(self):
-        """View detailed items in a receipt"""
-        selected = self.receipt_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Select a receipt to view details")
-            return
-    
-        values = self.receipt_tree.item(selected[0])['values']
-        invoice_number = values[3]
+    def view_receipt_details(self, invoice_number=None):
+        """View detailed items in the selected receipt, or the one for invoice_number"""
+        if invoice_number is None:
+            selected = self.receipt_tree.selection()
+            if not selected:
+                messagebox.showwarning("Warning", "Select a receipt to view details")
+                return
+            
+            values = self.receipt_tree.item(selected[0])['values']
+            invoice_number = values[3]
+            po_number, supplier, receipt_date = values[1], values[2], values[7]
+        else:
+            self.db.execute('''SELECT gr.po_number, s.name, gr.receipt_date FROM Goods_Receipt gr
+                LEFT JOIN Suppliers s ON s.supplier_id = gr.supplier_id
+                WHERE gr.invoice_number = ? LIMIT 1''', (invoice_number,))
+            po_number, supplier, receipt_date = self.db.fetchone()
     
         dialog = tk.Toplevel(self.app.root)
         dialog.title(f"Receipt Details - Invoice: {invoice_number}")
@@ -827,7 +913,7 @@ class PurchaseModule:
         info_frame = ttk.LabelFrame(dialog, text="Receipt Information", padding=10)
         info_frame.pack(fill='x', padx=10, pady=10)
         
-        ttk.Label(info_frame, text=f"PO #: {values[1]}  |  Supplier: {values[2]}  |  Invoice: {values[3]}  |  Date: {values[7]}", 
+        ttk.Label(info_frame, text=f"PO #: {po_number}  |  Supplier: {supplier}  |  Invoice: {invoice_number}  |  Date: {receipt_date}", 
                 font=('Arial', 10, 'bold')).pack()
     
         #Items details
@@ -1121,49 +1207,26 @@ class PurchaseModule:
                     
                     updates.append((recv, acc, rej, notes, rec_id, item_id, diff))
                 
-                # Apply all updates
-                for recv, acc, rej, notes, rec_id, item_id, diff in updates:
-                    self.db.execute("""
+                # Apply all updates in one transaction
+                with self.db.transaction():
+                    self.db.executemany("""
                         UPDATE Goods_Receipt
                         SET received_quantity=?, accepted_quantity=?, rejected_quantity=?, notes=?
                         WHERE receipt_id=?
-                    """, (recv, acc, rej, notes, rec_id))
+                    """, [(recv, acc, rej, notes, rec_id) for recv, acc, rej, notes, rec_id, item_id, diff in updates])
 
                     # Update inventory only by the difference
-                    if diff != 0:
-                        self.db.execute("""
-                            UPDATE Inventory 
-                            SET quantity_on_hand = quantity_on_hand + ?, last_updated=?
-                            WHERE item_id=?
-                        """, (diff, datetime.now(), item_id))
-            
-                # Check if all items in the PO have been fully received
-                    self.db.execute('''
-                    SELECT COUNT(*) FROM Purchase_Order_Items poi
-                    WHERE poi.po_number = ?
-                    AND poi.quantity > (
-                        SELECT COALESCE(SUM(gr.accepted_quantity), 0)
-                        FROM Goods_Receipt gr
-                        WHERE gr.po_number = poi.po_number 
-                        AND gr.item_id = poi.item_id
-                    )
-                ''', (po_number,))
-        
-                unreceived_items = self.db.fetchone()[0]
-        
-                # Update PO status based on receipt completion
-                if unreceived_items == 0:
-                    self.db.execute('UPDATE Purchase_Orders SET status = "Completed" WHERE po_number = ?', (po_number,))
-                else:
-                    self.db.execute('UPDATE Purchase_Orders SET status = "Partially Received" WHERE po_number = ?', (po_number,))
+                    self.db.apply_stock_deltas(
+                        ((item_id, diff) for recv, acc, rej, notes, rec_id, item_id, diff in updates),
+                        'receipt_edit', po_number)
+                
+                    # Update PO status based on receipt completion
+                    self.db.update_po_status(po_number)
             
-                self.db.commit()
                 messagebox.showinfo("Success", f"Receipt updated successfully!\n{len(updates)} item(s) updated.")
                 dialog.destroy()
-                self.app.refresh_all_tabs()
 
             except Exception as e:
-                self.db.rollback()
                 messagebox.showerror("Error", f"Failed to save changes: {str(e)}")
 
         # Buttons
@@ -1175,8 +1238,7 @@ class PurchaseModule:
     
     def new_goods_receipt(self):
         """Create new goods receipt - multi-item"""
-        self.db.execute("SELECT COUNT(*) FROM Suppliers")
-        if self.db.fetchone()[0] == 0:
+        if self.db.get_counter('Suppliers') == 0:
             messagebox.showwarning("Warning", "Add suppliers first")
             return
     
@@ -1193,13 +1255,11 @@ class PurchaseModule:
     
         ttk.Label(header_frame, text="Supplier:*").grid(row=0, column=0, padx=10, pady=8, sticky='w')
     
-        self.db.execute("SELECT supplier_id, name FROM Suppliers ORDER BY name")
-        suppliers = self.db.fetchall()
-        supplier_dict = {f"{s[1]} (ID: {s[0]})": s[0] for s in suppliers}
+        supplier_choices = self.app.master_data.suppliers.choices()
     
         supplier_var = tk.StringVar()
         supplier_combo = ttk.Combobox(header_frame, textvariable=supplier_var, 
-                                    values=list(supplier_dict.keys()), width=40, state='readonly')
+                                    values=list(supplier_choices), width=40, state='readonly')
         supplier_combo.grid(row=0, column=1, padx=10, pady=8)
     
         ttk.Label(header_frame, text="Purchase Order:*").grid(row=1, column=0, padx=10, pady=8, sticky='w')
@@ -1221,9 +1281,24 @@ class PurchaseModule:
         items_input_frame.pack(fill='x', padx=10, pady=10)
     
         ttk.Label(items_input_frame, text="Select Item:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        item_var = tk.StringVar()
-        item_combo = ttk.Combobox(items_input_frame, textvariable=item_var, width=40, state='disabled')
-        item_combo.grid(row=0, column=1, padx=5, pady=5)
+        
+        def find_po_items(text, limit):
+            """Lines of the selected PO matching text"""
+            if po_var.get() not in po_dict:
+                return []
+            rows = self.db.search_items(text, limit, select="i.item_id, i.name, poi.quantity, poi.received_quantity",
+                                        joins="JOIN Purchase_Order_Items poi ON poi.item_id = i.item_id",
+                                        where="poi.po_number = ?", params=(po_dict[po_var.get()],))
+            return [(f"{name} (Ordered: {ordered}, Received: {received})", (item_id, name, ordered))
+                    for item_id, name, ordered, received in rows]
+        
+        def on_item_selected(value):
+            """Show ordered quantity"""
+            ordered_label.config(text=str(value[2]))
+        
+        item_picker = ItemPicker(items_input_frame, find_po_items, width=40, on_select=on_item_selected)
+        item_picker.grid(row=0, column=1, padx=5, pady=5)
+        item_picker.set_enabled(False)
     
         ttk.Label(items_input_frame, text="Ordered:").grid(row=0, column=2, padx=5, pady=5)
         ordered_label = ttk.Label(items_input_frame, text="0", font=('Arial', 10, 'bold'), foreground='blue')
@@ -1288,7 +1363,6 @@ class PurchaseModule:
         
         # Store data
         po_dict = {}
-        item_dict = {}
         selected_items = []  # List of tuples: (item_id, item_name, ordered_qty, recv, accept, reject, notes)
         
         def update_summary():
@@ -1304,7 +1378,7 @@ class PurchaseModule:
             if not supplier_var.get():
                     return
         
-            supplier_id = supplier_dict[supplier_var.get()]
+            supplier_id = supplier_choices[supplier_var.get()].id
             
             self.db.execute('''
                 SELECT po_number, order_date, status 
@@ -1329,8 +1403,8 @@ class PurchaseModule:
             po_combo.set('')
             
             #Reset items
-            item_combo['state'] = 'disabled'
-            item_combo.set('')
+            item_picker.set_enabled(False)
+            item_picker.clear()
             selected_items.clear()
             for item in items_tree.get_children():
                 items_tree.delete(item)
@@ -1343,28 +1417,16 @@ class PurchaseModule:
         
             po_number = po_dict[po_var.get()]
         
-            #Get items for this PO
-            self.db.execute('''
-                SELECT poi.item_id, i.name, poi.quantity
-                FROM Purchase_Order_Items poi
-                JOIN Items i ON poi.item_id = i.item_id
-                WHERE poi.po_number = ?
-            ''', (po_number,))
-            
-            items = self.db.fetchall()
-            if not items:
+            #Items are searched within this PO (see find_po_items)
+            self.db.execute("SELECT COUNT(*) FROM Purchase_Order_Items WHERE po_number = ?", (po_number,))
+            if self.db.fetchone()[0] == 0:
                 messagebox.showinfo("Info", "No items in this PO")
-                item_combo['state'] = 'disabled'
+                item_picker.set_enabled(False)
                 return
             
-            item_dict.clear()
-            item_list = [f"{item[1]} (Ordered: {item[2]})" for item in items]
-            for i, item in enumerate(items):
-                item_dict[item_list[i]] = (item[0], item[1], item[2])  # (id, name, qty)
-            
-            item_combo['values'] = item_list
-            item_combo['state'] = 'readonly'
-            item_combo.set('')
+            item_picker.set_enabled(True)
+            item_picker.clear()
+            ordered_label.config(text="0")
         
             # Enable entry fields
             recv_entry['state'] = 'normal'
@@ -1373,14 +1435,6 @@ class PurchaseModule:
             notes_entry['state'] = 'normal'
             add_item_btn['state'] = 'normal'
             
-        def on_item_selected(event):
-            """Show ordered quantity"""
-            if item_var.get():
-                _, _, ordered_qty = item_dict[item_var.get()]
-                ordered_label.config(text=str(ordered_qty))
-            else:
-                ordered_label.config(text="0")
-        
         def validate_item_quantities():
             """Validate item quantities"""
             try:
@@ -1401,8 +1455,8 @@ class PurchaseModule:
                     return None
                 
                 # Validate against ordered quantity
-                if item_var.get():
-                    _, _, ordered_qty = item_dict[item_var.get()]
+                if item_picker.value:
+                    _, _, ordered_qty = item_picker.value
                     if recv > ordered_qty:
                         messagebox.showerror("Error", f"Received quantity ({recv}) cannot exceed ordered quantity ({ordered_qty})")
                         return None
@@ -1414,11 +1468,11 @@ class PurchaseModule:
         
         def add_item_to_list():
             """Add item to receipt list"""
-            if not item_var.get():
+            if item_picker.value is None:
                 messagebox.showwarning("Warning", "Select an item")
                 return
         
-            item_id, item_name, ordered_qty = item_dict[item_var.get()]
+            item_id, item_name, ordered_qty = item_picker.value
             
             #Check if already added
             for existing in selected_items:
@@ -1438,7 +1492,7 @@ class PurchaseModule:
             items_tree.insert('', 'end', values=(item_name, ordered_qty, recv, accept, reject, notes))
             
             #Clear inputs
-            item_var.set('')
+            item_picker.clear()
             ordered_label.config(text="0")
             recv_entry.delete(0, tk.END)
             accept_entry.delete(0, tk.END)
@@ -1481,49 +1535,26 @@ class PurchaseModule:
                 return
             
             try:
-                supplier_id = supplier_dict[supplier_var.get()]
+                supplier_id = supplier_choices[supplier_var.get()].id
                 po_number = po_dict[po_var.get()]
                 invoice_no = invoice_entry.get().strip()
                 receipt_date = date_entry.get()
                 
-                #Insert all items with same invoice number
-                for item_id, item_name, ordered_qty, recv, accept, reject, notes in selected_items:
-                    self.db.execute('''
-                        INSERT INTO Goods_Receipt 
-                        (po_number, item_id, supplier_id, invoice_number, received_quantity, 
-                        accepted_quantity, rejected_quantity, receipt_date, notes)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (po_number, item_id, supplier_id, invoice_no, recv, accept, reject, receipt_date, notes))
-                
-                # Update inventory with ONLY accepted quantity
-                    self.db.execute('''
-                        UPDATE Inventory 
-                        SET quantity_on_hand = quantity_on_hand + ?, 
-                            last_updated = ?
-                        WHERE item_id = ?
-                    ''', (accept, datetime.now(), item_id))
-                
-                # Check if all items in PO have been fully received
-                self.db.execute('''
-                    SELECT COUNT(*) FROM Purchase_Order_Items poi
-                    WHERE poi.po_number = ?
-                    AND poi.quantity > (
-                        SELECT COALESCE(SUM(gr.accepted_quantity), 0)
-                        FROM Goods_Receipt gr
-                        WHERE gr.po_number = poi.po_number 
-                        AND gr.item_id = poi.item_id
-                    )
-                ''', (po_number,))
-                
-                unreceived_items = self.db.fetchone()[0]
-                
-                # Update PO status
-                if unreceived_items == 0:
-                    self.db.execute('UPDATE Purchase_Orders SET status = "Completed" WHERE po_number = ?', (po_number,))
-                else:
-                    self.db.execute('UPDATE Purchase_Orders SET status = "Partially Received" WHERE po_number = ?', (po_number,))
+                with self.db.transaction():
+                    #Insert all items with same invoice number
+                    self.db.insert_goods_receipt_lines(
+                        (po_number, item_id, supplier_id, invoice_no, recv, accept, reject, receipt_date, notes)
+                        for item_id, item_name, ordered_qty, recv, accept, reject, notes in selected_items)
+                    
+                    # Update inventory with ONLY accepted quantity
+                    self.db.apply_stock_deltas(
+                        ((item_id, accept)
+                         for item_id, item_name, ordered_qty, recv, accept, reject, notes in selected_items),
+                        'receipt', po_number)
+                    
+                    # Update PO status
+                    self.db.update_po_status(po_number)
                 
-                self.db.commit()
                 
                 #Summary message
                 total_recv = sum(item[3] for item in selected_items)
@@ -1539,7 +1570,6 @@ class PurchaseModule:
                 
                 messagebox.showinfo("Success", msg)
                 dialog.destroy()
-                self.app.refresh_all_tabs()
                 
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save receipt: {str(e)}")
@@ -1547,7 +1577,6 @@ class PurchaseModule:
         #Bind events
         supplier_combo.bind('<<ComboboxSelected>>', on_supplier_selected)
         po_combo.bind('<<ComboboxSelected>>', on_po_selected)
-        item_combo.bind('<<ComboboxSelected>>', on_item_selected)
         add_item_btn.config(command=add_item_to_list)
         
         #Buttons frame
@@ -1559,10 +1588,8 @@ class PurchaseModule:
         ttk.Button(btn_frame, text="❌ Cancel", command=dialog.destroy).pack(side='right', padx=5)
         # ==================== ALERTS TAB ====================
         
-    def create_alerts_tab(self):
+    def create_alerts_tab(self, alert_frame):
         """Create alerts/reports tab"""
-        alert_frame = ttk.Frame(self.notebook)
-        self.notebook.add(alert_frame, text="⚠️ Alerts")
         
         top_btn_frame = ttk.Frame(alert_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
@@ -1579,22 +1606,21 @@ class PurchaseModule:
         
         self.alert_tree.pack(fill='both', expand=True, padx=10, pady=(0, 10))
         
+        self.alert_rows = {}
+        self.app.watch_tables(self.alert_tree, ('Items', 'Inventory'), self.refresh_alerts)
         self.refresh_alerts()
     
     def refresh_alerts(self):
         """Refresh low stock alerts"""
-        for item in self.alert_tree.get_children():
-            self.alert_tree.delete(item)
-        
-        self.db.execute('''
+        self.app.worker.submit(self.alert_tree, '''
             SELECT i.item_id, i.name, inv.quantity_on_hand, inv.reorder_level
             FROM Items i
             JOIN Inventory inv ON i.item_id = inv.item_id
             WHERE inv.quantity_on_hand <= inv.reorder_level
             ORDER BY (inv.quantity_on_hand - inv.reorder_level)
-        ''')
-        
-        for row in self.db.fetchall():
-            action = f"Order {row[3] * 2 - row[2]} units"
-            self.alert_tree.insert('', 'end', values=row + (action,))
+        ''', self.show_alerts)
+    
+    def show_alerts(self, rows):
+        reconcile(self.alert_tree, [(str(row[0]), row + (f"Order {row[3] * 2 - row[2]} units",), ())
+                                    for row in rows], self.alert_rows)
     
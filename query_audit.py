@@ -0,0 +1,243 @@
+"""
+Query Plan Auditor - EXPLAIN QUERY PLAN for every SQL statement in the app
+Run this script before a release to spot full scans, temp B-trees and
+correlated subqueries:
+
+    python3 query_audit.py                  # audit against a scaled test database
+    python3 query_audit.py --db live.db     # audit against a copy of real data
+    python3 query_audit.py --output audit.md --strict
+"""
+
+import argparse
+import ast
+import contextlib
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+# Modules whose SQL string literals are audited
+SOURCE_FILES = ["main.py", "purchase_module.py", "sales_module.py", "database.py", "dashboard_metrics.py"]
+
+# Tables whose rows are duplicated when building the audit database
+SCALED_TABLES = ["Items", "Suppliers", "Customers",
+                 "Purchase_Orders", "Purchase_Order_Items", "Goods_Receipt",
+                 "Sales_Orders", "Sales_Order_Items", "Invoices"]
+SCALE_ROUNDS = 6  # each round doubles the row count (x64)
+
+# Single-row / bookkeeping tables where a scan is expected
+SMALL_TABLES = {"Company_Details", "Schema_Version", "sqlite_master"}
+
+# Upper-case keywords only, so UI strings like "Select an item" are ignored
+_SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\s")
+_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+# ==================== STATEMENT EXTRACTION ====================
+
+def _enclosing_functions(tree):
+    """Map every node to the name of the function it is defined in"""
+    owners = {}
+
+    def visit(node, owner):
+        for child in ast.iter_child_nodes(node):
+            name = owner
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                name = child.name if owner == "<module>" else f"{owner}.{child.name}"
+            owners[child] = name
+            visit(child, name)
+
+    visit(tree, "<module>")
+    return owners
+
+
+def extract_statements(base_dir, files=SOURCE_FILES):
+    """Collect SQL string literals from the application modules
+
+    Returns (statements, dynamic) where statements maps SQL text to the list
+    of places it appears and dynamic lists f-string queries that cannot be
+    planned without runtime values.
+    """
+    statements = {}
+    dynamic = []
+    for filename in files:
+        path = os.path.join(base_dir, filename)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=filename)
+        owners = _enclosing_functions(tree)
+        # Literal pieces of f-strings are not complete statements
+        fragments = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+                     for part in node.values}
+
+        for node in ast.walk(tree):
+            if id(node) in fragments:
+                continue
+            origin = f"{filename}:{getattr(node, 'lineno', '?')} {owners.get(node, '<module>')}"
+            if isinstance(node, ast.Constant) and isinstance(node.value, str):
+                if _SQL_START.match(node.value):
+                    sql = " ".join(node.value.split())
+                    statements.setdefault(sql, []).append(origin)
+            elif isinstance(node, ast.JoinedStr):
+                head = node.values[0] if node.values else None
+                if isinstance(head, ast.Constant) and _SQL_START.match(str(head.value)):
+                    dynamic.append(origin)
+    return statements, dynamic
+
+
+# ==================== AUDIT DATABASE ====================
+
+def build_audit_database(path, rounds=SCALE_ROUNDS):
+    """Create a test database at path and grow it so plans reflect real volumes"""
+    import db_autofill
+    with contextlib.redirect_stdout(io.StringIO()):
+        db_autofill.fill_database(path)
+
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    for table in SCALED_TABLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall() if not row[5]]  # skip primary key
+        column_list = ", ".join(columns)
+        for _ in range(rounds):
+            cursor.execute(f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {table}")
+
+    # Every item has exactly one inventory row
+    cursor.execute("""INSERT INTO Inventory (item_id, quantity_on_hand, reorder_level, location, last_updated)
+        SELECT i.item_id, 10, 5, 'Warehouse A', CURRENT_TIMESTAMP FROM Items i
+        WHERE NOT EXISTS (SELECT 1 FROM Inventory inv WHERE inv.item_id = i.item_id)""")
+    conn.commit()
+    cursor.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+# ==================== PLAN ANALYSIS ====================
+
+def explain(conn, sql):
+    """Return the EXPLAIN QUERY PLAN detail lines, binding NULL for every parameter"""
+    params = [None] * sql.count("?")
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [row[3] for row in rows]
+
+
+def classify(plan):
+    """Return the list of findings for one query plan"""
+    findings = []
+    for detail in plan:
+        scan = _SCAN.match(detail)
+        if scan and scan.group(1) not in SMALL_TABLES and scan.group(1) != "CONSTANT":
+            findings.append(("full scan", detail))
+        elif detail.startswith("USE TEMP B-TREE"):
+            findings.append(("temp b-tree", detail))
+        elif detail.startswith("CORRELATED"):
+            findings.append(("correlated subquery", detail))
+    return findings
+
+
+def audit(conn, statements):
+    """Explain every statement and return (results, errors)
+
+    results: list of (sql, origins, plan, findings)
+    errors: list of (sql, origins, message)
+    """
+    results = []
+    errors = []
+    for sql, origins in statements.items():
+        try:
+            plan = explain(conn, sql)
+        except sqlite3.Error as e:
+            errors.append((sql, origins, str(e)))
+            continue
+        results.append((sql, origins, plan, classify(plan)))
+    return results, errors
+
+
+# ==================== REPORT ====================
+
+def format_report(results, errors, dynamic):
+    """Render the audit as Markdown"""
+    flagged = [r for r in results if r[3]]
+    lines = ["# Query Plan Audit", ""]
+    lines.append(f"- Statements audited: {len(results)}")
+    lines.append(f"- Statements flagged: {len(flagged)}")
+    for kind in ("full scan", "temp b-tree", "correlated subquery"):
+        count = sum(1 for r in flagged if any(k == kind for k, _ in r[3]))
+        lines.append(f"  - {kind}: {count}")
+    lines.append(f"- Could not be planned: {len(errors)}")
+    lines.append(f"- Dynamic (f-string) statements skipped: {len(dynamic)}")
+    lines.append("")
+
+    # Most findings first
+    for sql, origins, plan, findings in sorted(flagged, key=lambda r: -len(r[3])):
+        lines.append(f"## {', '.join(sorted({k for k, _ in findings}))}")
+        lines.append("")
+        for origin in origins:
+            lines.append(f"- `{origin}`")
+        lines.append("")
+        lines.append("```sql")
+        lines.append(sql)
+        lines.append("```")
+        lines.append("")
+        lines.append("```text")
+        lines.extend(plan)
+        lines.append("```")
+        lines.append("")
+
+    if errors:
+        lines.append("## Errors")
+        lines.append("")
+        for sql, origins, message in errors:
+            lines.append(f"- `{origins[0]}`: {message}")
+        lines.append("")
+
+    if dynamic:
+        lines.append("## Dynamic statements (not audited)")
+        lines.append("")
+        for origin in dynamic:
+            lines.append(f"- `{origin}`")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run EXPLAIN QUERY PLAN on every SQL statement in the app")
+    parser.add_argument("--db", help="audit against this database instead of a scaled test database")
+    parser.add_argument("--rounds", type=int, default=SCALE_ROUNDS,
+                        help="times the test data is doubled (default: %(default)s)")
+    parser.add_argument("--output", help="write the Markdown report to this file")
+    parser.add_argument("--strict", action="store_true", help="exit with status 1 if anything is flagged")
+    args = parser.parse_args(argv)
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    statements, dynamic = extract_statements(base_dir)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.db:
+            db_path = args.db
+        else:
+            db_path = os.path.join(tmp, "audit.db")
+            print(f"🔄 Building audit database ({2 ** args.rounds}x test data)...")
+            build_audit_database(db_path, args.rounds)
+
+        conn = sqlite3.connect(db_path)
+        results, errors = audit(conn, statements)
+        conn.close()
+
+    report = format_report(results, errors, dynamic)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+        print(f"✅ Report written to {args.output}")
+    else:
+        print(report)
+
+    flagged = sum(1 for r in results if r[3])
+    print(f"\n📊 {len(results)} statements audited, {flagged} flagged, {len(errors)} errors")
+    return 1 if args.strict and (flagged or errors) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
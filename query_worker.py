@@ -0,0 +1,168 @@
+"""
+Query Worker - runs read queries off the Tk thread
+Tabs submit their refresh queries here; a background thread with its own
+SQLite connection runs them and the results are handed back to the UI
+through root.after, so the main loop never blocks on the database.
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from tkinter import messagebox
+
+# How often the Tk thread checks for finished queries
+POLL_MS = 30
+
+logger = logging.getLogger("inventory.worker")
+
+
+class QueryWorker:
+    """Background thread running queries on a dedicated read connection
+
+    Every submission has a key identifying the view it refreshes (usually the
+    tab's Treeview). Submitting again with the same key supersedes the older
+    request: it is skipped if it has not started, interrupted if it is
+    running, and its result is discarded if it has already finished.
+    """
+
+    def __init__(self, root, connect, on_busy=None, poll_ms=POLL_MS):
+        """
+        Args:
+            root: Tk root, used to schedule result delivery on the UI thread
+            connect: callable returning a new sqlite3 connection; it is called
+                on the worker thread, which owns the connection
+            on_busy: optional callback(key, busy) called on the UI thread
+                when a key starts or stops loading
+        """
+        self.root = root
+        self.connect = connect
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._busy = set()
+        self._running = None  # (key, generation) of the job being executed
+        self._conn = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="query-worker", daemon=True)
+        self._thread.start()
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    # ==================== UI THREAD ====================
+
+    def submit(self, key, job, on_result, params=(), on_error=None):
+        """Queue a query for key, superseding any earlier one for the same key
+
+        Args:
+            job: SQL string (run with params, result is fetchall()) or a
+                callable taking a cursor and returning the result
+            on_result: callback(result), called on the UI thread
+            on_error: optional callback(exception); when omitted the error
+                is logged and shown in an error message box
+        """
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            self._generations[key] = generation
+            running = self._running
+            if running and running[0] == key and self._conn is not None:
+                self._conn.interrupt()
+        if key not in self._busy:
+            self._busy.add(key)
+            self._set_busy(key, True)
+        self._jobs.put((key, generation, job, params, on_result, on_error))
+        return generation
+
+    def cancel(self, key):
+        """Drop any pending or running query for key"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            running = self._running
+            if running and running[0] == key and self._conn is not None:
+                self._conn.interrupt()
+        if key in self._busy:
+            self._busy.discard(key)
+            self._set_busy(key, False)
+
+    def is_busy(self, key):
+        return key in self._busy
+
+    def close(self):
+        """Stop the worker thread and close its connection"""
+        if self._closed:
+            return
+        self._closed = True
+        self.root.after_cancel(self._poll_id)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+        self._jobs.put(None)
+        self._thread.join(timeout=2)
+
+    def _set_busy(self, key, busy):
+        if self.on_busy:
+            self.on_busy(key, busy)
+
+    def _current(self, key, generation):
+        with self._lock:
+            return self._generations.get(key) == generation
+
+    def _poll(self):
+        """Deliver finished results to their callbacks (runs on the UI thread)"""
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+        while True:
+            try:
+                key, generation, on_done, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if not self._current(key, generation):
+                continue
+            self._busy.discard(key)
+            self._set_busy(key, False)
+            if on_done is None:
+                self._report(value)
+            else:
+                on_done(value)
+
+    def _report(self, error):
+        """Default on_error: log the failure and tell the user"""
+        logger.error("Background query failed", exc_info=error)
+        messagebox.showerror("Error", f"Failed to load data: {error}")
+
+    # ==================== WORKER THREAD ====================
+
+    def _run(self):
+        conn = self.connect()
+        with self._lock:
+            self._conn = conn
+        cursor = conn.cursor()
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            key, generation, job, params, on_result, on_error = item
+            with self._lock:
+                if self._generations.get(key) != generation:
+                    continue
+                self._running = (key, generation)
+            try:
+                if callable(job):
+                    result = job(cursor)
+                else:
+                    cursor.execute(job, params)
+                    result = cursor.fetchall()
+                self._results.put((key, generation, on_result, result))
+            except sqlite3.OperationalError as e:
+                # Interrupted because a newer request superseded this one
+                if self._current(key, generation):
+                    self._results.put((key, generation, on_error, e))
+            except Exception as e:
+                self._results.put((key, generation, on_error, e))
+            finally:
+                with self._lock:
+                    self._running = None
+        with self._lock:
+            self._conn = None
+        conn.close()
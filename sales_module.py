@@ -5,6 +5,11 @@ Sales Module with GST Support (India)
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
+from database import read_counters, read_gst_rollup, read_gst_by_hsn
+from money import to_paise, fmt, plain, line_amounts
+from paged_list import PagedList, VirtualList, counted, reconcile
+from filter_bar import FilterBar
+from item_picker import ItemPicker
 
 class SalesModule:
     def __init__(self, notebook, db, app):
@@ -12,38 +17,27 @@ class SalesModule:
         self.db = db
         self.app = app
         self.show_completed_sos = False
-        self.create_customers_tab()
-        self.create_sales_order_tab()
-        self.create_delivery_tab()
-        self.create_invoices_tab()
-        self.create_gst_summary_tab()
-        self.create_sales_reports_tab()
-    
-    def refresh_all(self):
-        self.refresh_customers()
-        self.refresh_sales_orders()
-        self.refresh_delivery_history()
-        self.refresh_invoices()
-        self.refresh_gst_summary()
-        self.refresh_sales_reports()
-    
-    def calculate_gst_price(self, rate, gst_percent):
-        """Calculate final price from rate and GST"""
-        gst_amount = (rate * gst_percent) / 100
-        final_price = rate + gst_amount
-        return gst_amount, final_price
+        app.add_tab("👥 Customers", self.create_customers_tab)
+        app.add_tab("🛒 Sales Orders", self.create_sales_order_tab)
+        app.add_tab("🚚 Delivery", self.create_delivery_tab)
+        app.add_tab("📄 Invoices", self.create_invoices_tab)
+        app.add_tab("💰 GST Summary", self.create_gst_summary_tab)
+        app.add_tab("📊 Reports", self.create_sales_reports_tab)
     
     # ==================== CUSTOMERS TAB ====================
     
-    def create_customers_tab(self):
-        cust_frame = ttk.Frame(self.notebook)
-        self.notebook.add(cust_frame, text="👥 Customers")
+    def create_customers_tab(self, cust_frame):
         top_btn_frame = ttk.Frame(cust_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
         ttk.Button(top_btn_frame, text="➕ Add", command=self.add_customer).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="✏️ Edit", command=self.edit_customer).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🗑️ Delete", command=self.delete_customer).pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🔄 Refresh", command=self.refresh_customers).pack(side='right', padx=3)
+        cust_count_label = ttk.Label(top_btn_frame, foreground='gray')
+        cust_count_label.pack(side='right', padx=10)
+        cust_filter = FilterBar(cust_frame, [('prefix', 'name', 'Name')],
+                                lambda where, params: self.cust_pages.set_filter(where, params))
+        cust_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         columns = ("ID", "Name", "Contact", "Phone", "Email", "GSTIN", "Credit Limit", "Terms")
         self.cust_tree = ttk.Treeview(cust_frame, columns=columns, show='headings', height=25)
         widths = [40, 130, 110, 90, 140, 140, 90, 100]
@@ -53,16 +47,17 @@ class SalesModule:
         self.cust_tree.pack(side='left', fill='both', expand=True, padx=10, pady=(0, 10))
         scrollbar = ttk.Scrollbar(cust_frame, orient='vertical', command=self.cust_tree.yview)
         scrollbar.pack(side='right', fill='y', pady=(0, 10), padx=(0, 10))
-        self.cust_tree.configure(yscrollcommand=scrollbar.set)
+        self.cust_pages = PagedList(self.app, self.cust_tree, scrollbar, self.render_customer_row, 'customer_id',
+                                    count=counted('Customers'), status_label=cust_count_label)
+        self.cust_pages.sortable({"ID": "customer_id", "Name": "name COLLATE NOCASE"})
+        self.app.watch_tables(self.cust_tree, ('Customers',), self.refresh_customers)
         self.refresh_customers()
     
     def refresh_customers(self):
-        for item in self.cust_tree.get_children():
-            self.cust_tree.delete(item)
-        self.db.execute("SELECT customer_id, name, contact_person, phone, email, gstin, credit_limit, payment_terms FROM Customers")
-        for row in self.db.fetchall():
-            display_row = list(row[:6]) + [f"₹{row[6]:.2f}" if row[6] else "₹0.00"] + [row[7]]
-            self.cust_tree.insert('', 'end', values=display_row)
+        self.cust_pages.load("SELECT customer_id, name, contact_person, phone, email, gstin, credit_limit, payment_terms FROM Customers")
+    
+    def render_customer_row(self, row):
+        return list(row[:6]) + [fmt(row[6])] + [row[7]], ()
     
     def add_customer(self):
         dialog = tk.Toplevel(self.app.root)
@@ -85,10 +80,13 @@ class SalesModule:
                 if not entries["name"].get().strip():
                     messagebox.showerror("Error", "Customer name required")
                     return
+                if self.app.master_data.customers.by_name(entries["name"].get()) and not messagebox.askyesno(
+                        "Duplicate Name", f"A customer named '{entries['name'].get().strip()}' already exists. Add anyway?"):
+                    return
                 credit = 0
                 if entries["credit"].get().strip():
                     try:
-                        credit = float(entries["credit"].get())
+                        credit = to_paise(entries["credit"].get())
                         if credit < 0:
                             messagebox.showerror("Error", "Credit limit cannot be negative")
                             return
@@ -101,19 +99,23 @@ class SalesModule:
                 self.db.commit()
                 messagebox.showinfo("Success", "Customer added!")
                 dialog.destroy()
-                self.refresh_customers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         ttk.Button(dialog, text="Save", command=save).grid(row=len(fields), column=0, columnspan=2, pady=15)
     
-    def edit_customer(self):
-        selected = self.cust_tree.selection()
-        if not selected:
-            messagebox.showwarning("Warning", "Select a customer")
+    def edit_customer(self, customer_id=None):
+        """Edit the selected customer, or customer_id (e.g. from a search hit)"""
+        if customer_id is None:
+            selected = self.cust_tree.selection()
+            if not selected:
+                messagebox.showwarning("Warning", "Select a customer")
+                return
+            customer_id = self.cust_tree.item(selected[0])['values'][0]
+        c = self.app.master_data.customers.get(customer_id)
+        if c is None:
+            messagebox.showwarning("Warning", "This customer no longer exists")
             return
-        customer_id = self.cust_tree.item(selected[0])['values'][0]
-        self.db.execute("SELECT name, contact_person, phone, email, address, gstin, credit_limit, payment_terms FROM Customers WHERE customer_id = ?", (customer_id,))
-        data = self.db.fetchone()
+        data = (c.name, c.contact_person, c.phone, c.email, c.address, c.gstin, c.credit_limit, c.payment_terms)
         dialog = tk.Toplevel(self.app.root)
         dialog.title("Edit Customer")
         dialog.geometry("500x450")
@@ -121,6 +123,8 @@ class SalesModule:
         dialog.grab_set()
         fields = ["Name:", "Contact:", "Phone:", "Email:", "Address:", "GSTIN:", "Credit (₹):", "Terms:"]
         entries = []
+        data = list(data)
+        data[6] = plain(data[6])
         for i, (field, value) in enumerate(zip(fields, data)):
             ttk.Label(dialog, text=field).grid(row=i, column=0, padx=10, pady=8, sticky='w')
             entry = ttk.Entry(dialog, width=35)
@@ -133,7 +137,7 @@ class SalesModule:
                 if not entries[0].get().strip():
                     messagebox.showerror("Error", "Name required")
                     return
-                credit = float(entries[6].get()) if entries[6].get() else 0
+                credit = to_paise(entries[6].get())
                 if credit < 0:
                     messagebox.showerror("Error", "Credit cannot be negative")
                     return
@@ -142,7 +146,6 @@ class SalesModule:
                 self.db.commit()
                 messagebox.showinfo("Success", "Updated!")
                 dialog.destroy()
-                self.refresh_customers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
         ttk.Button(dialog, text="Update", command=update).grid(row=len(fields), column=0, columnspan=2, pady=15)
@@ -169,15 +172,12 @@ class SalesModule:
                 self.db.execute("DELETE FROM Customers WHERE customer_id = ?", (customer_id,))
                 self.db.commit()
                 messagebox.showinfo("Success", "Deleted!")
-                self.refresh_customers()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
     
     # ==================== SALES ORDERS TAB ====================
     
-    def create_sales_order_tab(self):
-        so_frame = ttk.Frame(self.notebook)
-        self.notebook.add(so_frame, text="🛒 Sales Orders")
+    def create_sales_order_tab(self, so_frame):
         top_btn_frame = ttk.Frame(so_frame)
         top_btn_frame.pack(side='top', fill='x', padx=10, pady=8)
         ttk.Button(top_btn_frame, text="➕ Create SO", command=self.create_sales_order).pack(side='left', padx=3)
@@ -187,6 +187,14 @@ class SalesModule:
         self.toggle_completed_so_btn = ttk.Button(top_btn_frame, text="👁️ Show Completed", command=self.toggle_completed_sales_orders)
         self.toggle_completed_so_btn.pack(side='left', padx=3)
         ttk.Button(top_btn_frame, text="🔄 Refresh", command=self.refresh_sales_orders).pack(side='right', padx=3)
+        so_count_label = ttk.Label(top_btn_frame, foreground='gray')
+        so_count_label.pack(side='right', padx=10)
+        so_filter = FilterBar(so_frame, [
+            ('choice', 'status', 'Status', ("Pending", "Partially Delivered", "Delivered")),
+            ('dates', 'order_date', 'Order Date'), ('prefix', 'name', 'Customer'),
+            ('amount', 'total_amount', 'Total')],
+            lambda where, params: self.so_pages.set_filter(where, params))
+        so_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         columns = ("SO#", "Customer", "Order Date", "Delivery", "Status", "Subtotal", "GST", "Total", "Items")
         self.so_tree = ttk.Treeview(so_frame, columns=columns, show='headings', height=25)
         widths = [50, 130, 90, 90, 80, 80, 70, 90, 50]
@@ -196,7 +204,13 @@ class SalesModule:
         self.so_tree.pack(side='left', fill='both', expand=True, padx=10, pady=(0, 10))
         scrollbar = ttk.Scrollbar(so_frame, orient='vertical', command=self.so_tree.yview)
         scrollbar.pack(side='right', fill='y', pady=(0, 10), padx=(0, 10))
-        self.so_tree.configure(yscrollcommand=scrollbar.set)
+        self.so_tree.tag_configure('completed', background='#e8e8e8', foreground='#666666')
+        self.so_pages = VirtualList(self.app, self.so_tree, scrollbar, self.render_sales_order_row,
+                                  'so_number', descending=True, status_label=so_count_label)
+        self.so_pages.sortable({"SO#": "so_number", "Customer": "name COLLATE NOCASE", "Order Date": "order_date",
+                                "Delivery": "delivery_date", "Status": "status", "Total": "total_amount"})
+        self.app.watch_tables(self.so_tree, ('Sales_Orders', 'Sales_Order_Items', 'Customers'),
+                              self.refresh_sales_orders)
         self.refresh_sales_orders()
     
     def toggle_completed_sales_orders(self):
@@ -209,38 +223,30 @@ class SalesModule:
         self.refresh_sales_orders()
     
     def refresh_sales_orders(self):
-        for item in self.so_tree.get_children():
-            self.so_tree.delete(item)
-        
         # FIXED: Now properly filters completed orders
         if self.show_completed_sos:
             query = '''SELECT so.so_number, c.name, so.order_date, so.delivery_date, so.status, 
                 so.subtotal, so.total_gst, so.total_amount,
                 (SELECT COUNT(*) FROM Sales_Order_Items WHERE so_number = so.so_number) as item_count
-                FROM Sales_Orders so JOIN Customers c ON so.customer_id = c.customer_id 
-                ORDER BY so.so_number DESC'''
+                FROM Sales_Orders so JOIN Customers c ON so.customer_id = c.customer_id'''
+            self.so_pages.count = counted('Sales_Orders')
         else:
             query = '''SELECT so.so_number, c.name, so.order_date, so.delivery_date, so.status, 
                 so.subtotal, so.total_gst, so.total_amount,
                 (SELECT COUNT(*) FROM Sales_Order_Items WHERE so_number = so.so_number) as item_count
                 FROM Sales_Orders so JOIN Customers c ON so.customer_id = c.customer_id 
                 WHERE so.status != 'Delivered'
-                ORDER BY so.so_number DESC'''
-        
-        self.db.execute(query)
-        for row in self.db.fetchall():
-            display_row = (row[0], row[1], row[2], row[3], row[4], 
-                          f"₹{row[5]:.2f}", f"₹{row[6]:.2f}", f"₹{row[7]:.2f}", row[8])
-            if row[4] == "Delivered":
-                self.so_tree.insert('', 'end', values=display_row, tags=('completed',))
-            else:
-                self.so_tree.insert('', 'end', values=display_row)
-        
-        self.so_tree.tag_configure('completed', background='#e8e8e8', foreground='#666666')
+                '''
+            self.so_pages.count = counted('Sales_Orders', exclude=('Delivered',))
+        self.so_pages.load(query)
+    
+    def render_sales_order_row(self, row):
+        display_row = (row[0], row[1], row[2], row[3], row[4], 
+                      fmt(row[5]), fmt(row[6]), fmt(row[7]), row[8])
+        return display_row, ('completed',) if row[4] == "Delivered" else ()
     
     def create_sales_order(self):
-        self.db.execute("SELECT COUNT(*) FROM Customers")
-        if self.db.fetchone()[0] == 0:
+        if self.db.get_counter('Customers') == 0:
             messagebox.showwarning("Warning", "Add customers first")
             return
         self.db.execute("SELECT COUNT(*) FROM Items WHERE item_id IN (SELECT item_id FROM Inventory WHERE quantity_on_hand > 0)")
@@ -256,11 +262,9 @@ class SalesModule:
         
         # Customer
         ttk.Label(dialog, text="Customer:*", font=('Arial', 10, 'bold')).grid(row=0, column=0, padx=10, pady=10, sticky='w')
-        self.db.execute("SELECT customer_id, name, gstin FROM Customers ORDER BY name")
-        customers = self.db.fetchall()
-        customer_dict = {f"{c[1]} (GSTIN: {c[2] or 'N/A'})": c[0] for c in customers}
+        customer_choices = self.app.master_data.customers.choices()
         customer_var = tk.StringVar()
-        customer_combo = ttk.Combobox(dialog, textvariable=customer_var, values=list(customer_dict.keys()), width=50, state='readonly')
+        customer_combo = ttk.Combobox(dialog, textvariable=customer_var, values=list(customer_choices), width=50, state='readonly')
         customer_combo.grid(row=0, column=1, padx=10, pady=10, columnspan=3)
         
         # Delivery Date
@@ -275,13 +279,19 @@ class SalesModule:
         item_frame.grid(row=3, column=0, columnspan=4, padx=10, pady=10, sticky='ew')
         
         ttk.Label(item_frame, text="Item:").grid(row=0, column=0, padx=5, pady=5, sticky='w')
-        self.db.execute('''SELECT i.item_id, i.name, i.selling_rate, i.selling_gst_percent, i.selling_price, inv.quantity_on_hand
-            FROM Items i JOIN Inventory inv ON i.item_id = inv.item_id WHERE inv.quantity_on_hand > 0 ORDER BY i.name''')
-        items = self.db.fetchall()
-        item_dict = {f"{i[1]} (Rate: ₹{i[2]:.2f} + {i[3]:.1f}% GST = ₹{i[4]:.2f}) [Stock: {i[5]}]": (i[0], i[2], i[3], i[5]) for i in items}
-        item_var = tk.StringVar()
-        item_combo = ttk.Combobox(item_frame, textvariable=item_var, values=list(item_dict.keys()), width=60, state='readonly')
-        item_combo.grid(row=0, column=1, padx=5, pady=5, columnspan=2)
+        
+        def find_items(text, limit):
+            """In-stock items matching text"""
+            stock = dict(self.db.search_items(text, limit, select="i.item_id, inv.quantity_on_hand",
+                joins="JOIN Inventory inv ON inv.item_id = i.item_id", where="inv.quantity_on_hand > 0"))
+            return [(f"{item.sales_label()} [Stock: {stock[item.id]}]", (item, stock[item.id]))
+                    for item in self.app.master_data.items.get_many(list(stock))]
+        
+        def on_item_select(value):
+            stock_label.config(text=f"Available: {value[1]} units")
+        
+        item_picker = ItemPicker(item_frame, find_items, width=60, on_select=on_item_select)
+        item_picker.grid(row=0, column=1, padx=5, pady=5, columnspan=2)
         
         ttk.Label(item_frame, text="Qty:").grid(row=0, column=3, padx=5, pady=5)
         qty_entry = ttk.Entry(item_frame, width=10)
@@ -292,15 +302,8 @@ class SalesModule:
         
         selected_items = []
         
-        def on_item_select(event):
-            if item_var.get():
-                _, _, _, stock = item_dict[item_var.get()]
-                stock_label.config(text=f"Available: {stock} units")
-        
-        item_combo.bind('<<ComboboxSelected>>', on_item_select)
-        
         def add_item():
-            if not item_var.get():
+            if item_picker.value is None:
                 messagebox.showwarning("Warning", "Select an item")
                 return
             try:
@@ -308,22 +311,22 @@ class SalesModule:
                 if qty <= 0:
                     messagebox.showerror("Error", "Quantity must be positive")
                     return
-                item_id, rate, gst_percent, stock = item_dict[item_var.get()]
+                item, stock = item_picker.value
+                item_id, item_name, rate, gst_percent = item.id, item.name, item.selling_rate, item.selling_gst_percent
                 if qty > stock:
                     messagebox.showerror("Error", f"Insufficient stock! Available: {stock}")
                     return
-                item_name = item_var.get().split(' (Rate:')[0]
                 
                 for existing in selected_items:
                     if existing[0] == item_id:
                         messagebox.showwarning("Warning", "Item already added")
                         return
                 
-                gst_amt, total = self.calculate_gst_price(rate * qty, gst_percent)
+                _, gst_amt, total = line_amounts(rate, qty, gst_percent)
                 selected_items.append((item_id, item_name, qty, rate, gst_percent, gst_amt, total, stock))
-                items_tree.insert('', 'end', values=(item_name, qty, f"₹{rate:.2f}", f"{gst_percent:.1f}%", f"₹{gst_amt:.2f}", f"₹{total:.2f}"))
+                items_tree.insert('', 'end', values=(item_name, qty, fmt(rate), f"{gst_percent:.1f}%", fmt(gst_amt), fmt(total)))
                 update_total()
-                item_var.set('')
+                item_picker.clear()
                 qty_entry.delete(0, tk.END)
                 stock_label.config(text="")
             except ValueError:
@@ -343,7 +346,7 @@ class SalesModule:
             subtotal = sum(item[3] * item[2] for item in selected_items)
             total_gst = sum(item[5] for item in selected_items)
             total = sum(item[6] for item in selected_items)
-            total_label.config(text=f"Subtotal: ₹{subtotal:.2f}  |  GST: ₹{total_gst:.2f}  |  Total: ₹{total:.2f}")
+            total_label.config(text=f"Subtotal: {fmt(subtotal)}  |  GST: {fmt(total_gst)}  |  Total: {fmt(total)}")
         
         ttk.Button(item_frame, text="➕ Add", command=add_item).grid(row=0, column=5, padx=5, pady=5)
         ttk.Button(item_frame, text="➖ Remove", command=remove_item).grid(row=0, column=6, padx=5, pady=5)
@@ -374,7 +377,7 @@ class SalesModule:
                     messagebox.showerror("Error", "Add at least one item")
                     return
                 
-                customer_id = customer_dict[customer_var.get()]
+                customer_id = customer_choices[customer_var.get()].id
                 
                 # Verify stock again
                 for item_id, name, qty, rate, gst_percent, gst_amt, total, original_stock in selected_items:
@@ -388,20 +391,19 @@ class SalesModule:
                 total_gst = sum(item[5] for item in selected_items)
                 total_amount = sum(item[6] for item in selected_items)
                 
-                # CHANGED: Set status to "Pending" instead of "Completed"
-                self.db.execute("INSERT INTO Sales_Orders (customer_id, order_date, delivery_date, status, subtotal, total_gst, total_amount) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                    (customer_id, datetime.now().date(), delivery_entry.get(), "Pending", subtotal, total_gst, total_amount))
-                so_number = self.db.lastrowid()
-                
-                # Add items - DON'T reduce inventory yet (wait for delivery)
-                for item_id, name, qty, rate, gst_percent, gst_amt, total, stock in selected_items:
-                    self.db.execute("INSERT INTO Sales_Order_Items (so_number, item_id, quantity, rate, gst_percent, gst_amount, total_price) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (so_number, item_id, qty, rate, gst_percent, gst_amt, total))
+                with self.db.transaction():
+                    # CHANGED: Set status to "Pending" instead of "Completed"
+                    self.db.execute("INSERT INTO Sales_Orders (customer_id, order_date, delivery_date, status, subtotal, total_gst, total_amount) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (customer_id, datetime.now().date(), delivery_entry.get(), "Pending", subtotal, total_gst, total_amount))
+                    so_number = self.db.lastrowid()
+                    
+                    # Add items - DON'T reduce inventory yet (wait for delivery)
+                    self.db.insert_order_lines('sales', so_number,
+                        [(item_id, qty, rate, gst_percent, gst_amt, total)
+                         for item_id, name, qty, rate, gst_percent, gst_amt, total, stock in selected_items])
                 
-                self.db.commit()
-                messagebox.showinfo("Success", f"SO #{so_number} created!\n\nItems: {len(selected_items)}\nSubtotal: ₹{subtotal:.2f}\nGST: ₹{total_gst:.2f}\nTotal: ₹{total_amount:.2f}\n\nStatus: Pending\nInventory will be reduced upon delivery.")
+                messagebox.showinfo("Success", f"SO #{so_number} created!\n\nItems: {len(selected_items)}\nSubtotal: {fmt(subtotal)}\nGST: {fmt(total_gst)}\nTotal: {fmt(total_amount)}\n\nStatus: Pending\nInventory will be reduced upon delivery.")
                 dialog.destroy()
-                self.app.refresh_all_tabs()
             except Exception as e:
                 messagebox.showerror("Error", f"Failed: {str(e)}")
         
@@ -465,8 +467,8 @@ class SalesModule:
         # Load existing items
         item_data = {}  # {tree_id: (item_id, old_qty, rate, gst_percent)}
         for item_id, name, qty, rate, gst_percent in items_data:
-            gst_amt, total = self.calculate_gst_price(rate * qty, gst_percent)
-            tree_id = tree.insert("", "end", values=(name, qty, f"₹{rate:.2f}", f"{gst_percent:.1f}%", f"₹{total:.2f}"))
+            _, gst_amt, total = line_amounts(rate, qty, gst_percent)
+            tree_id = tree.insert("", "end", values=(name, qty, fmt(rate), f"{gst_percent:.1f}%", fmt(total)))
             item_data[tree_id] = (item_id, qty, rate, gst_percent)
         
         # Summary
@@ -480,11 +482,11 @@ class SalesModule:
             for tree_id in tree.get_children():
                 qty = int(tree.item(tree_id)["values"][1])
                 item_id, old_qty, rate, gst_percent = item_data[tree_id]
-                gst_amt, item_total = self.calculate_gst_price(rate * qty, gst_percent)
+                _, gst_amt, item_total = line_amounts(rate, qty, gst_percent)
                 subtotal += rate * qty
                 total_gst += gst_amt
                 total_amount += item_total
-            summary_label.config(text=f"Subtotal: ₹{subtotal:.2f} | GST: ₹{total_gst:.2f} | Total: ₹{total_amount:.2f}")
+            summary_label.config(text=f"Subtotal: {fmt(subtotal)} | GST: {fmt(total_gst)} | Total: {fmt(total_amount)}")
         
         update_summary()
         
@@ -540,10 +542,10 @@ class SalesModule:
                         messagebox.showerror("Error", f"Insufficient stock! Available: {stock}")
                         return
                     
-                    gst_amt, total = self.calculate_gst_price(rate * new_qty, gst_percent)
+                    _, gst_amt, total = line_amounts(rate, new_qty, gst_percent)
                     values = list(tree.item(row_id)["values"])
                     values[1] = new_qty
-                    values[4] = f"₹{total:.2f}"
+                    values[4] = fmt(total)
                     tree.item(row_id, values=values)
                     item_data[row_id] = (item_id, new_qty, rate, gst_percent)
                     update_summary()
@@ -566,42 +568,39 @@ class SalesModule:
         
         def save_changes():
             try:
-                # Update delivery date
-                self.db.execute("UPDATE Sales_Orders SET delivery_date = ? WHERE so_number = ?",
-                    (delivery_entry.get(), so_number))
-                
-                # Update items and recalculate totals
-                self.db.execute("DELETE FROM Sales_Order_Items WHERE so_number = ?", (so_number,))
-                
-                subtotal = 0
-                total_gst = 0
-                total_amount = 0
-                
-                for tree_id in tree.get_children():
-                    item_id, qty, rate, gst_percent = item_data[tree_id]
-                    gst_amt, item_total = self.calculate_gst_price(rate * qty, gst_percent)
+                with self.db.transaction():
+                    # Update delivery date
+                    self.db.execute("UPDATE Sales_Orders SET delivery_date = ? WHERE so_number = ?",
+                        (delivery_entry.get(), so_number))
                     
-                    self.db.execute("""INSERT INTO Sales_Order_Items 
-                        (so_number, item_id, quantity, rate, gst_percent, gst_amount, total_price) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (so_number, item_id, qty, rate, gst_percent, gst_amt, item_total))
+                    # Update items and recalculate totals
+                    self.db.execute("DELETE FROM Sales_Order_Items WHERE so_number = ?", (so_number,))
                     
-                    subtotal += rate * qty
-                    total_gst += gst_amt
-                    total_amount += item_total
-                
-                # Update order totals
-                self.db.execute("""UPDATE Sales_Orders 
-                    SET subtotal = ?, total_gst = ?, total_amount = ? 
-                    WHERE so_number = ?""",
-                    (subtotal, total_gst, total_amount, so_number))
+                    subtotal = 0
+                    total_gst = 0
+                    total_amount = 0
+                    lines = []
+                    
+                    for tree_id in tree.get_children():
+                        item_id, qty, rate, gst_percent = item_data[tree_id]
+                        _, gst_amt, item_total = line_amounts(rate, qty, gst_percent)
+                        lines.append((item_id, qty, rate, gst_percent, gst_amt, item_total))
+                        
+                        subtotal += rate * qty
+                        total_gst += gst_amt
+                        total_amount += item_total
+                    
+                    self.db.insert_order_lines('sales', so_number, lines)
+                    
+                    # Update order totals
+                    self.db.execute("""UPDATE Sales_Orders 
+                        SET subtotal = ?, total_gst = ?, total_amount = ? 
+                        WHERE so_number = ?""",
+                        (subtotal, total_gst, total_amount, so_number))
                 
-                self.db.commit()
                 messagebox.showinfo("Success", f"SO #{so_number} updated!")
                 dialog.destroy()
-                self.app.refresh_all_tabs()
             except Exception as e:
-                self.db.rollback()
                 messagebox.showerror("Error", f"Failed: {str(e)}")
         
         btn_frame = ttk.Frame(dialog)
@@ -636,11 +635,10 @@ class SalesModule:
         
         if messagebox.askyesno("Confirm", f"Delete SO #{so_number} and all items?"):
             try:
-                self.db.execute("DELETE FROM Sales_Order_Items WHERE so_number = ?", (so_number,))
-                self.db.execute("DELETE FROM Sales_Orders WHERE so_number = ?", (so_number,))
-                self.db.commit()
+                with self.db.transaction():
+                    self.db.execute("DELETE FROM Sales_Order_Items WHERE so_number = ?", (so_number,))
+                    self.db.execute("DELETE FROM Sales_Orders WHERE so_number = ?", (so_number,))
                 messagebox.showinfo("Success", f"SO #{so_number} deleted!")
-                self.refresh_sales_orders()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
     
@@ -690,12 +688,12 @@ class SalesModule:
         
         ttk.Label(summary_frame, text="Subtotal (Before GST):", font=('Arial', 10)).grid(
             row=0, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{so_info[6]:.2f}", font=('Arial', 10, 'bold')).grid(
+        ttk.Label(summary_frame, text=fmt(so_info[6]), font=('Arial', 10, 'bold')).grid(
             row=0, column=1, sticky='e', padx=10, pady=3)
         
         ttk.Label(summary_frame, text="Total GST:", font=('Arial', 10)).grid(
             row=1, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{so_info[7]:.2f}", font=('Arial', 10, 'bold'), 
+        ttk.Label(summary_frame, text=fmt(so_info[7]), font=('Arial', 10, 'bold'), 
             foreground='blue').grid(row=1, column=1, sticky='e', padx=10, pady=3)
         
         ttk.Separator(summary_frame, orient='horizontal').grid(
@@ -703,7 +701,7 @@ class SalesModule:
         
         ttk.Label(summary_frame, text="Total Amount:", font=('Arial', 11, 'bold')).grid(
             row=3, column=0, sticky='w', padx=10, pady=3)
-        ttk.Label(summary_frame, text=f"₹{so_info[8]:.2f}", font=('Arial', 11, 'bold'), 
+        ttk.Label(summary_frame, text=fmt(so_info[8]), font=('Arial', 11, 'bold'), 
             foreground='green').grid(row=3, column=1, sticky='e', padx=10, pady=3)
         
         # Items
@@ -724,26 +722,29 @@ class SalesModule:
             WHERE soi.so_number = ?''', (so_number,))
         
         for row in self.db.fetchall():
-            tree.insert('', 'end', values=(row[0], row[1], f"₹{row[2]:.2f}", 
-                f"{row[3]:.1f}%", f"₹{row[4]:.2f}", f"₹{row[5]:.2f}"))
+            tree.insert('', 'end', values=(row[0], row[1], fmt(row[2]), 
+                f"{row[3]:.1f}%", fmt(row[4]), fmt(row[5])))
     
     # ==================== DELIVERY TAB ====================
     
-    def create_delivery_tab(self):
+    def create_delivery_tab(self, del_frame):
         """Create delivery/dispatch tab"""
-        del_frame = ttk.Frame(self.notebook)
-        self.notebook.add(del_frame, text="🚚 Delivery")
         
         top_frame = ttk.Frame(del_frame)
         top_frame.pack(side='top', fill='x', padx=10, pady=10)
         
         ttk.Button(top_frame, text="➕ New Delivery", command=self.new_delivery).pack(side = 'left',padx = 2)
         ttk.Button(top_frame, text="✏️ Edit Delivery", command=self.edit_delivery).pack(side='left',padx = 2)
+        delivery_count_label = ttk.Label(top_frame, foreground='gray')
+        delivery_count_label.pack(side='right', padx=10)
         
+        delivery_filter = FilterBar(del_frame, [('dates', 'delivery_date', 'Delivery Date'), ('prefix', 'name', 'Customer')],
+                                    lambda where, params: self.delivery_pages.set_filter(where, params))
+        delivery_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         history_frame = ttk.LabelFrame(del_frame, text="Delivery History", padding=10)
         history_frame.pack(fill='both', expand=True, padx=10, pady=10)
         
-        columns = ("SO#", "Customer", "Delivery Date", "Items", "Total Qty", "Status")
+        columns = ("SO#", "Customer", "Delivery Date", "Items", "Qty Delivered", "Status")
         self.delivery_tree = ttk.Treeview(history_frame, columns=columns, show='headings', height=20)
         
         widths = [60, 150, 120, 60, 100, 100]
@@ -755,33 +756,34 @@ class SalesModule:
         
         scrollbar = ttk.Scrollbar(history_frame, orient='vertical', command=self.delivery_tree.yview)
         scrollbar.pack(side='right', fill='y')
-        self.delivery_tree.configure(yscrollcommand=scrollbar.set)
+        self.delivery_pages = PagedList(self.app, self.delivery_tree, scrollbar, lambda row: (row, ()),
+                                        'so_number', descending=True,
+                                        count=counted('Sales_Orders', include=('Delivered', 'Partially Delivered')),
+                                        status_label=delivery_count_label)
+        self.delivery_pages.sortable({"SO#": "so_number", "Customer": "name COLLATE NOCASE",
+                                      "Delivery Date": "delivery_date"})
         
         self.delivery_tree.bind('<Double-1>', lambda e: self.view_delivery_details())
         
+        self.app.watch_tables(self.delivery_tree, ('Sales_Orders', 'Sales_Order_Items', 'Customers'),
+                              self.refresh_delivery_history)
         self.refresh_delivery_history()
     
     def refresh_delivery_history(self):
         """Refresh delivery history"""
-        for item in self.delivery_tree.get_children():
-            self.delivery_tree.delete(item)
-        
-        # Get delivered/partially delivered orders
-        self.db.execute('''
+        # Get delivered/partially delivered orders; per-order line totals are
+        # correlated subqueries so a page only aggregates the orders it shows
+        self.delivery_pages.load('''
             SELECT so.so_number, c.name, so.delivery_date, 
-                COUNT(DISTINCT soi.item_id) as item_count,
-                SUM(soi.quantity) as total_qty,
+                (SELECT COUNT(DISTINCT item_id) FROM Sales_Order_Items
+                    WHERE so_number = so.so_number) as item_count,
+                (SELECT SUM(delivered_quantity) FROM Sales_Order_Items
+                    WHERE so_number = so.so_number) as total_delivered,
                 so.status
             FROM Sales_Orders so
             JOIN Customers c ON so.customer_id = c.customer_id
-            JOIN Sales_Order_Items soi ON so.so_number = soi.so_number
             WHERE so.status IN ('Delivered', 'Partially Delivered')
-            GROUP BY so.so_number
-            ORDER BY so.so_number DESC
         ''')
-        
-        for row in self.db.fetchall():
-            self.delivery_tree.insert('', 'end', values=row)
     
     def new_delivery(self):
         """Record a new delivery"""
@@ -812,6 +814,29 @@ class SalesModule:
             values=list(so_dict.keys()), width=40, state='readonly')
         so_combo.pack(side='left', padx=10)
         
+        # Narrow the order list to pending orders containing an item
+        ttk.Label(header_frame, text="Item:").pack(side='left', padx=(20, 5))
+        
+        def find_pending_items(text, limit):
+            rows = self.db.search_items(text, limit, select="i.item_id, i.name, i.hsn_code",
+                where="""i.item_id IN (SELECT soi.item_id FROM Sales_Orders so
+                    JOIN Sales_Order_Items soi ON soi.so_number = so.so_number WHERE so.status = 'Pending')""")
+            return [(f"{name} [HSN: {hsn or 'N/A'}]", item_id) for item_id, name, hsn in rows]
+        
+        def filter_orders(item_id):
+            self.db.execute('''SELECT DISTINCT so.so_number, so.order_date FROM Sales_Orders so
+                JOIN Sales_Order_Items soi ON soi.so_number = so.so_number
+                WHERE so.status = 'Pending' AND soi.item_id = ? ORDER BY so.so_number DESC''', (item_id,))
+            so_combo['values'] = [f"SO #{so[0]} - {so[1]}" for so in self.db.fetchall()]
+        
+        def show_all_orders():
+            item_picker.clear()
+            so_combo['values'] = list(so_dict.keys())
+        
+        item_picker = ItemPicker(header_frame, find_pending_items, width=35, on_select=filter_orders)
+        item_picker.pack(side='left')
+        ttk.Button(header_frame, text="✖", width=3, command=show_all_orders).pack(side='left', padx=5)
+        
         # Items frame
         items_frame = ttk.LabelFrame(dialog, text="Items to Deliver", padding=10)
         items_frame.pack(fill='both', expand=True, padx=10, pady=10)
@@ -824,7 +849,7 @@ class SalesModule:
             tree.column(col, width=col_widths[i])
         tree.pack(fill='both', expand=True)
         
-        item_data = {}  # {tree_id: (item_id, ordered_qty, stock)}
+        item_data = {}  # {tree_id: (so_item_id, item_id, remaining_qty, stock)}
         
         def load_so_items(event):
             """Load items when SO is selected"""
@@ -838,16 +863,17 @@ class SalesModule:
             so_number = so_dict[so_var.get()]
             
             self.db.execute('''
-                SELECT soi.item_id, i.name, soi.quantity, inv.quantity_on_hand
+                SELECT soi.so_item_id, soi.item_id, i.name, soi.quantity, soi.delivered_quantity, inv.quantity_on_hand
                 FROM Sales_Order_Items soi
                 JOIN Items i ON soi.item_id = i.item_id
                 JOIN Inventory inv ON i.item_id = inv.item_id
                 WHERE soi.so_number = ?
             ''', (so_number,))
             
-            for item_id, name, ordered, stock in self.db.fetchall():
-                tree_id = tree.insert("", "end", values=(name, ordered, ordered, stock))
-                item_data[tree_id] = (item_id, ordered, stock)
+            for so_item_id, item_id, name, ordered, delivered, stock in self.db.fetchall():
+                remaining = ordered - delivered
+                tree_id = tree.insert("", "end", values=(name, ordered, remaining, stock))
+                item_data[tree_id] = (so_item_id, item_id, remaining, stock)
         
         so_combo.bind('<<ComboboxSelected>>', load_so_items)
         
@@ -891,13 +917,13 @@ class SalesModule:
                 nonlocal current_entry
                 try:
                     new_qty = int(entry.get())
-                    item_id, ordered, stock = item_data[row_id]
+                    so_item_id, item_id, remaining, stock = item_data[row_id]
                     
                     if new_qty < 0:
                         messagebox.showerror("Error", "Quantity cannot be negative")
                         return
-                    if new_qty > ordered:
-                        messagebox.showerror("Error", f"Cannot deliver more than ordered ({ordered})")
+                    if new_qty > remaining:
+                        messagebox.showerror("Error", f"Cannot deliver more than ordered ({remaining})")
                         return
                     if new_qty > stock:
                         messagebox.showerror("Error", f"Insufficient stock! Available: {stock}")
@@ -939,58 +965,36 @@ class SalesModule:
             try:
                 so_number = so_dict[so_var.get()]
                 
-                total_delivered = 0
-                items_fully_delivered = 0
-                items_partially_delivered = 0
-                
+                # Validate every line before touching inventory
+                deliveries = []
                 for tree_id in tree.get_children():
                     values = tree.item(tree_id)["values"]
                     deliver_qty = int(values[2])
-                    item_id, ordered_qty, stock = item_data[tree_id]
+                    so_item_id, item_id, remaining, stock = item_data[tree_id]
                     
                     if deliver_qty > stock:
                         messagebox.showerror("Error", f"{values[0]}: Insufficient stock!")
                         return
-                    
-                    if deliver_qty > 0:
-                        # Reduce inventory
-                        self.db.execute('''UPDATE Inventory 
-                            SET quantity_on_hand = quantity_on_hand - ?,
-                                last_updated = ?
-                            WHERE item_id = ?''',
-                            (deliver_qty, datetime.now(), item_id))
-                        
-                        total_delivered += deliver_qty
-                        
-                        if deliver_qty == ordered_qty:
-                            items_fully_delivered += 1
-                        else:
-                            items_partially_delivered += 1
+                    deliveries.append((so_item_id, item_id, deliver_qty))
                 
-                # Update SO status
-                if items_partially_delivered > 0 or total_delivered == 0:
-                    new_status = "Partially Delivered"
-                else:
-                    new_status = "Delivered"
+                total_delivered = sum(deliver_qty for _, _, deliver_qty in deliveries)
+                if total_delivered == 0:
+                    messagebox.showerror("Error", "Enter a quantity to deliver")
+                    return
                 
-                self.db.execute('''UPDATE Sales_Orders 
-                    SET status = ?, delivery_date = ?
-                    WHERE so_number = ?''',
-                    (new_status, datetime.now().date(), so_number))
-                
-                self.db.commit()
+                # Post delivery note, reduce inventory and update SO status
+                with self.db.transaction():
+                    note_id, new_status = self.db.record_delivery(so_number, deliveries)
                 
                 msg = f"Delivery Recorded!\n\n"
-                msg += f"SO #{so_number}\n"
+                msg += f"SO #{so_number} - Delivery Note #{note_id}\n"
                 msg += f"Total Quantity Delivered: {total_delivered}\n"
                 msg += f"Status: {new_status}"
                 
                 messagebox.showinfo("Success", msg)
                 dialog.destroy()
-                self.app.refresh_all_tabs()
                 
             except Exception as e:
-                self.db.rollback()
                 messagebox.showerror("Error", f"Failed: {str(e)}")
         
         btn_frame = ttk.Frame(dialog)
@@ -1050,21 +1054,19 @@ class SalesModule:
         
         # Load items - show remaining to deliver
         self.db.execute('''
-            SELECT soi.item_id, i.name, soi.quantity, inv.quantity_on_hand
+            SELECT soi.so_item_id, soi.item_id, i.name, soi.quantity, soi.delivered_quantity, inv.quantity_on_hand
             FROM Sales_Order_Items soi
             JOIN Items i ON soi.item_id = i.item_id
             JOIN Inventory inv ON i.item_id = inv.item_id
             WHERE soi.so_number = ?
         ''', (so_number,))
         
-        item_data = {}  # {tree_id: (item_id, ordered_qty, stock)}
+        item_data = {}  # {tree_id: (so_item_id, item_id, ordered_qty, stock)}
         
-        for item_id, name, ordered, stock in self.db.fetchall():
-            # For partially delivered, assume we need to deliver the rest
-            # In a real system, you'd track delivered quantities separately
-            remaining = ordered  # Simplified: show full quantity as remaining
-            tree_id = tree.insert("", "end", values=(name, ordered, remaining, remaining, stock))
-            item_data[tree_id] = (item_id, ordered, stock)
+        for so_item_id, item_id, name, ordered, delivered, stock in self.db.fetchall():
+            remaining = ordered - delivered
+            tree_id = tree.insert("", "end", values=(name, ordered, remaining, min(remaining, stock), stock))
+            item_data[tree_id] = (so_item_id, item_id, ordered, stock)
         
         # Edit delivery quantity on double-click
         current_entry = None
@@ -1106,7 +1108,7 @@ class SalesModule:
                 nonlocal current_entry
                 try:
                     new_qty = int(entry.get())
-                    item_id, ordered, stock = item_data[row_id]
+                    so_item_id, item_id, ordered, stock = item_data[row_id]
                     remaining = int(tree.item(row_id)["values"][2])
                     
                     if new_qty < 0:
@@ -1149,7 +1151,7 @@ class SalesModule:
                     values = tree.item(tree_id)["values"]
                     deliver_qty = int(values[3])
                     remaining_qty = int(values[2])
-                    item_id, ordered_qty, stock = item_data[tree_id]
+                    so_item_id, item_id, ordered_qty, stock = item_data[tree_id]
                     
                     # Check stock BEFORE doing anything
                     if deliver_qty > stock:
@@ -1158,6 +1160,7 @@ class SalesModule:
                     
                     # Store validated items
                     items_to_deliver.append({
+                        'so_item_id': so_item_id,
                         'item_id': item_id,
                         'item_name': values[0],
                         'deliver_qty': deliver_qty,
@@ -1165,49 +1168,27 @@ class SalesModule:
                         'ordered_qty': ordered_qty
                     })
                 
-                # STEP 2: ALL ITEMS VALIDATED - NOW UPDATE DATABASE
-                total_delivered = 0
-                all_items_complete = True
-                
-                for item_info in items_to_deliver:
-                    if item_info['deliver_qty'] > 0:
-                        # Reduce inventory
-                        self.db.execute('''UPDATE Inventory 
-                            SET quantity_on_hand = quantity_on_hand - ?,
-                                last_updated = ?
-                            WHERE item_id = ?''',
-                            (item_info['deliver_qty'], datetime.now(), item_info['item_id']))
-                        
-                        total_delivered += item_info['deliver_qty']
-                    
-                    # Check if this item is fully delivered
-                    if item_info['deliver_qty'] < item_info['remaining_qty']:
-                        all_items_complete = False
-                
-                # Update SO status
-                if all_items_complete and total_delivered > 0:
-                    new_status = "Delivered"
-                else:
-                    new_status = "Partially Delivered"
-                
-                self.db.execute('''UPDATE Sales_Orders 
-                    SET status = ?, delivery_date = ?
-                    WHERE so_number = ?''',
-                    (new_status, datetime.now().date(), so_number))
+                total_delivered = sum(item_info['deliver_qty'] for item_info in items_to_deliver)
+                if total_delivered == 0:
+                    messagebox.showerror("Error", "Enter a quantity to deliver")
+                    return
                 
-                self.db.commit()
+                # STEP 2: ALL ITEMS VALIDATED - NOW UPDATE DATABASE (one transaction)
+                with self.db.transaction():
+                    note_id, new_status = self.db.record_delivery(
+                        so_number,
+                        [(item_info['so_item_id'], item_info['item_id'], item_info['deliver_qty'])
+                         for item_info in items_to_deliver])
                 
                 msg = f"Delivery Updated!\n\n"
-                msg += f"SO #{so_number}\n"
+                msg += f"SO #{so_number} - Delivery Note #{note_id}\n"
                 msg += f"Additional Quantity Delivered: {total_delivered}\n"
                 msg += f"New Status: {new_status}"
                 
                 messagebox.showinfo("Success", msg)
                 dialog.destroy()
-                self.app.refresh_all_tabs()
                 
             except Exception as e:
-                self.db.rollback()
                 messagebox.showerror("Error", f"Failed: {str(e)}")
         
         btn_frame = ttk.Frame(dialog)
@@ -1240,18 +1221,20 @@ class SalesModule:
         items_frame = ttk.LabelFrame(dialog, text="Delivered Items", padding=10)
         items_frame.pack(fill='both', expand=True, padx=10, pady=10)
         
-        columns = ("Item", "Quantity Delivered")
+        columns = ("Note #", "Date", "Item", "Quantity Delivered")
         tree = ttk.Treeview(items_frame, columns=columns, show='headings', height=15)
-        tree.heading("Item", text="Item")
-        tree.column("Item", width=400)
-        tree.heading("Quantity Delivered", text="Quantity Delivered")
-        tree.column("Quantity Delivered", width=200)
+        col_widths = [80, 110, 380, 150]
+        for i, col in enumerate(columns):
+            tree.heading(col, text=col)
+            tree.column(col, width=col_widths[i])
         tree.pack(fill='both', expand=True)
         
-        self.db.execute('''SELECT i.name, soi.quantity
-            FROM Sales_Order_Items soi
-            JOIN Items i ON soi.item_id = i.item_id
-            WHERE soi.so_number = ?''', (so_number,))
+        self.db.execute('''SELECT dn.note_id, dn.delivery_date, i.name, dni.quantity
+            FROM Delivery_Notes dn
+            JOIN Delivery_Note_Items dni ON dni.note_id = dn.note_id
+            JOIN Items i ON dni.item_id = i.item_id
+            WHERE dn.so_number = ?
+            ORDER BY dn.note_id, dni.note_item_id''', (so_number,))
         
         for row in self.db.fetchall():
             tree.insert('', 'end', values=row)
@@ -1260,10 +1243,8 @@ class SalesModule:
     
     # ==================== GST SUMMARY TAB ====================
     
-    def create_gst_summary_tab(self):
+    def create_gst_summary_tab(self, gst_frame):
         """Create dedicated GST summary tab with improved UI"""
-        gst_frame = ttk.Frame(self.notebook)
-        self.notebook.add(gst_frame, text="💰 GST Summary")
     
         # Top frame with title and refresh
         top_frame = ttk.Frame(gst_frame)
@@ -1272,6 +1253,7 @@ class SalesModule:
         ttk.Label(top_frame, text="GST Tax Summary & Liability", 
             font=('Arial', 18, 'bold')).pack(side='left', padx=10)
         ttk.Button(top_frame, text="🔄 Refresh", command=self.refresh_gst_summary).pack(side='right', padx=10)
+        ttk.Button(top_frame, text="🔒 Close Period", command=self.close_period_dialog).pack(side='right', padx=5)
 
         # Scrollable container
         canvas = tk.Canvas(gst_frame)
@@ -1295,45 +1277,39 @@ class SalesModule:
         scrollbar.pack(side="right", fill="y")
 
         # Initial load
+        self.app.watch_tables(self.gst_scrollable_frame, ('GST_Rollup', 'Period_Close', 'Period_Snapshots'),
+                              self.refresh_gst_summary)
         self.refresh_gst_summary()
 
     def refresh_gst_summary(self):
         """Refresh GST summary with HORIZONTAL layout"""
+        self.app.worker.submit(self.gst_scrollable_frame, self.load_gst_summary, self.show_gst_summary)
+
+    def load_gst_summary(self, cursor):
+        """Output and input GST per rate from the GST rollup (runs on the query worker)"""
+        output_gst_data = {rate: {'gst': gst, 'base': base, 'orders': orders, 'items': lines}
+                           for rate, base, gst, total, orders, lines in read_gst_rollup(cursor, 'output')}
+        input_gst_data = {rate: {'gst': gst, 'base': base, 'orders': orders, 'items': lines}
+                          for rate, base, gst, total, orders, lines in read_gst_rollup(cursor, 'input')}
+        # (hsn, rate) -> [output base, output GST, input GST]
+        hsn_data = {}
+        for direction, base_col, gst_col in (('output', 0, 1), ('input', None, 2)):
+            for hsn, rate, base, gst, total, orders, lines in read_gst_by_hsn(cursor, direction):
+                row = hsn_data.setdefault((hsn, rate), [0, 0, 0])
+                if base_col is not None:
+                    row[base_col] += base
+                row[gst_col] += gst
+        cursor.execute("SELECT MAX(period) FROM Period_Close")
+        closed_through = cursor.fetchone()[0]
+        return output_gst_data, input_gst_data, hsn_data, closed_through
+
+    def show_gst_summary(self, data):
+        output_gst_data, input_gst_data, hsn_data, closed_through = data
+
         # Clear existing content
         for widget in self.gst_scrollable_frame.winfo_children():
             widget.destroy()
 
-        # Get data
-        self.db.execute('''
-            SELECT 
-                soi.gst_percent,
-                COALESCE(SUM(soi.gst_amount), 0) as total_gst_collected,
-                COALESCE(SUM(soi.rate * soi.quantity), 0) as total_base_amount,
-                COUNT(DISTINCT so.so_number) as order_count,
-                COUNT(*) as item_count
-            FROM Sales_Order_Items soi
-            JOIN Sales_Orders so ON soi.so_number = so.so_number
-            GROUP BY soi.gst_percent
-            ORDER BY soi.gst_percent
-        ''')
-        output_gst_data = {row[0]: {'gst': row[1], 'base': row[2], 'orders': row[3], 'items': row[4]} 
-                           for row in self.db.fetchall()}
-
-        self.db.execute('''
-            SELECT 
-                poi.gst_percent,
-                COALESCE(SUM(poi.gst_amount), 0) as total_gst_paid,
-                COALESCE(SUM(poi.rate * poi.quantity), 0) as total_base_amount,
-                COUNT(DISTINCT po.po_number) as order_count,
-                COUNT(*) as item_count
-            FROM Purchase_Order_Items poi
-            JOIN Purchase_Orders po ON poi.po_number = po.po_number
-            GROUP BY poi.gst_percent
-            ORDER BY poi.gst_percent
-        ''')
-        input_gst_data = {row[0]: {'gst': row[1], 'base': row[2], 'orders': row[3], 'items': row[4]} 
-                          for row in self.db.fetchall()}
-
         all_gst_rates = sorted(set(list(output_gst_data.keys()) + list(input_gst_data.keys())))
 
         if all_gst_rates:
@@ -1359,7 +1335,7 @@ class SalesModule:
             card1.grid(row=0, column=0, padx=10, pady=10, sticky='nsew')
             ttk.Label(card1, text="Output GST", font=('Arial', 10), 
                 foreground='gray').pack(pady=(15, 5))
-            ttk.Label(card1, text=f"₹{total_output_gst:,.2f}", font=('Arial', 16, 'bold'), 
+            ttk.Label(card1, text=fmt(total_output_gst, ',.2f'), font=('Arial', 16, 'bold'), 
                 foreground='green').pack(pady=(0, 5))
             ttk.Label(card1, text="Collected from Sales", font=('Arial', 8), 
                 foreground='gray').pack(pady=(0, 15))
@@ -1369,7 +1345,7 @@ class SalesModule:
             card2.grid(row=0, column=1, padx=10, pady=10, sticky='nsew')
             ttk.Label(card2, text="Input GST", font=('Arial', 10), 
                 foreground='gray').pack(pady=(15, 5))
-            ttk.Label(card2, text=f"₹{total_input_gst:,.2f}", font=('Arial', 16, 'bold'), 
+            ttk.Label(card2, text=fmt(total_input_gst, ',.2f'), font=('Arial', 16, 'bold'), 
                 foreground='orange').pack(pady=(0, 5))
             ttk.Label(card2, text="Paid on Purchases", font=('Arial', 8), 
                 foreground='gray').pack(pady=(0, 15))
@@ -1380,7 +1356,7 @@ class SalesModule:
             ttk.Label(card3, text="Net GST Liability", font=('Arial', 10), 
                 foreground='gray').pack(pady=(15, 5))
             net_color = '#dc3545' if net_gst > 0 else ('#28a745' if net_gst < 0 else '#17a2b8')
-            ttk.Label(card3, text=f"₹{net_gst:,.2f}", font=('Arial', 16, 'bold'), 
+            ttk.Label(card3, text=fmt(net_gst, ',.2f'), font=('Arial', 16, 'bold'), 
                 foreground=net_color).pack(pady=(0, 5))
             status_text = "To Pay" if net_gst > 0 else ("Refund" if net_gst < 0 else "Balanced")
             ttk.Label(card3, text=status_text, font=('Arial', 8), 
@@ -1449,13 +1425,13 @@ class SalesModule:
             
                     ttk.Label(row_frame, text=f"{gst_rate:.1f}%", 
                         font=('Arial', 10, 'bold'), foreground=color, width=10).pack(side='left', padx=5)
-                    ttk.Label(row_frame, text=f"₹{output_gst_amt:,.2f}", 
+                    ttk.Label(row_frame, text=fmt(output_gst_amt, ',.2f'), 
                         font=('Arial', 10), width=15).pack(side='left', padx=5)
-                    ttk.Label(row_frame, text=f"₹{input_gst_amt:,.2f}", 
+                    ttk.Label(row_frame, text=fmt(input_gst_amt, ',.2f'), 
                         font=('Arial', 10), width=15).pack(side='left', padx=5)
             
                     net_color = '#dc3545' if net_bracket > 0 else ('#28a745' if net_bracket < 0 else '#17a2b8')
-                    ttk.Label(row_frame, text=f"₹{net_bracket:,.2f}", 
+                    ttk.Label(row_frame, text=fmt(net_bracket, ',.2f'), 
                         font=('Arial', 10, 'bold'), foreground=net_color, width=15).pack(side='left', padx=5)
             
                     ttk.Label(row_frame, text=str(output_orders), 
@@ -1500,9 +1476,9 @@ class SalesModule:
             
                     ttk.Label(row, text=f"{gst_rate:.1f}%", font=('Arial', 9, 'bold'), 
                         foreground=color, width=8).pack(side='left', padx=3)
-                    ttk.Label(row, text=f"₹{data['base']:,.0f}", 
+                    ttk.Label(row, text=fmt(data['base'], ',.0f'), 
                         font=('Arial', 9), width=12).pack(side='left', padx=3)
-                    ttk.Label(row, text=f"₹{data['gst']:,.0f}", 
+                    ttk.Label(row, text=fmt(data['gst'], ',.0f'), 
                         font=('Arial', 9, 'bold'), foreground=color, width=12).pack(side='left', padx=3)
                     ttk.Label(row, text=f"{data['orders']}", 
                         font=('Arial', 9), width=8).pack(side='left', padx=3)
@@ -1533,14 +1509,41 @@ class SalesModule:
             
                     ttk.Label(row, text=f"{gst_rate:.1f}%", font=('Arial', 9, 'bold'), 
                         foreground=color, width=8).pack(side='left', padx=3)
-                    ttk.Label(row, text=f"₹{data['base']:,.0f}", 
+                    ttk.Label(row, text=fmt(data['base'], ',.0f'), 
                         font=('Arial', 9), width=12).pack(side='left', padx=3)
-                    ttk.Label(row, text=f"₹{data['gst']:,.0f}", 
+                    ttk.Label(row, text=fmt(data['gst'], ',.0f'), 
                         font=('Arial', 9, 'bold'), foreground=color, width=12).pack(side='left', padx=3)
                     ttk.Label(row, text=f"{data['orders']}", 
                         font=('Arial', 9), width=8).pack(side='left', padx=3)
                     ttk.Label(row, text=f"{data['items']}", 
                         font=('Arial', 9), width=8).pack(side='left', padx=3)
+
+            # === HSN SUMMARY ===
+            hsn_section = ttk.LabelFrame(self.gst_scrollable_frame,
+                text="🏷️ HSN Summary", padding=15)
+            hsn_section.pack(fill='both', expand=True, padx=10, pady=(15, 0))
+
+            ttk.Label(hsn_section,
+                text=f"Closed through: {closed_through}" if closed_through else "No periods closed yet",
+                font=('Arial', 9), foreground='gray').pack(anchor='w', pady=(0, 5))
+
+            hsn_header = ttk.Frame(hsn_section)
+            hsn_header.pack(fill='x', pady=(0, 5))
+            for text, width in (("HSN", 12), ("Rate", 8), ("Output Taxable", 14),
+                                ("Output GST", 12), ("Input GST", 12)):
+                ttk.Label(hsn_header, text=text, font=('Arial', 9, 'bold'), width=width).pack(side='left', padx=3)
+
+            ttk.Separator(hsn_section, orient='horizontal').pack(fill='x', pady=3)
+
+            for (hsn, gst_rate), (out_base, out_gst, in_gst) in sorted(hsn_data.items()):
+                row = ttk.Frame(hsn_section)
+                row.pack(fill='x', pady=1)
+                ttk.Label(row, text=hsn, font=('Arial', 9), width=12).pack(side='left', padx=3)
+                ttk.Label(row, text=f"{gst_rate:.1f}%", font=('Arial', 9, 'bold'),
+                    foreground=self._get_gst_color(gst_rate), width=8).pack(side='left', padx=3)
+                ttk.Label(row, text=fmt(out_base, ',.0f'), font=('Arial', 9), width=14).pack(side='left', padx=3)
+                ttk.Label(row, text=fmt(out_gst, ',.0f'), font=('Arial', 9), width=12).pack(side='left', padx=3)
+                ttk.Label(row, text=fmt(in_gst, ',.0f'), font=('Arial', 9), width=12).pack(side='left', padx=3)
     
         else:
             # No data
@@ -1553,6 +1556,46 @@ class SalesModule:
                 text="Create sales and purchase orders to see GST analysis", 
                 font=('Arial', 12), foreground='gray').pack(pady=8)
 
+    def close_period_dialog(self):
+        """Close GST periods up to a chosen month"""
+        periods = self.db.closable_periods()
+        if not periods:
+            messagebox.showinfo("Close Period", "There are no open months before the current one to close")
+            return
+
+        dialog = tk.Toplevel(self.app.root)
+        dialog.title("Close Period")
+        dialog.geometry("380x200")
+        dialog.transient(self.app.root)
+        dialog.grab_set()
+
+        frame = ttk.Frame(dialog, padding=20)
+        frame.pack(fill='both', expand=True)
+
+        closed = self.db.closed_through()
+        ttk.Label(frame, text=f"Closed through: {closed or 'none'}", foreground='gray').pack(anchor='w')
+        ttk.Label(frame, text="Close all months up to:").pack(anchor='w', pady=(10, 5))
+        period_var = tk.StringVar(value=periods[-1])
+        ttk.Combobox(frame, textvariable=period_var, values=periods,
+                     state='readonly', width=15).pack(anchor='w')
+
+        def close():
+            period = period_var.get()
+            if not messagebox.askyesno("Confirm",
+                    f"Close all periods up to {period}?\n\n"
+                    "GST figures for closed months are frozen and later changes "
+                    "to their orders will not be reflected in reports."):
+                return
+            try:
+                count = self.db.close_period(period)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+            messagebox.showinfo("Success", f"Closed {count} month(s) through {period}")
+            dialog.destroy()
+
+        ttk.Button(frame, text="🔒 Close", command=close).pack(pady=15)
+
     def _get_gst_color(self, gst_rate):
         """Helper to get color for GST rate"""
         if gst_rate == 0:
@@ -1568,10 +1611,8 @@ class SalesModule:
     
     # ==================== INVOICES TAB ====================
     
-    def create_invoices_tab(self):
+    def create_invoices_tab(self, inv_frame):
         """Create invoices tab"""
-        inv_frame = ttk.Frame(self.notebook)
-        self.notebook.add(inv_frame, text="📄 Invoices")
         
         top_frame = ttk.Frame(inv_frame)
         top_frame.pack(side='top', fill='x', padx=10, pady=8)
@@ -1580,7 +1621,15 @@ class SalesModule:
         ttk.Button(top_frame, text="💰 Mark as Paid", command=self.mark_invoice_paid).pack(side='left', padx=3)
         ttk.Button(top_frame, text="👁️ View Invoice", command=self.view_invoice_details).pack(side='left', padx=3)
         ttk.Button(top_frame, text="🔄 Refresh", command=self.refresh_invoices).pack(side='right', padx=3)
-        
+        inv_count_label = ttk.Label(top_frame, foreground='gray')
+        inv_count_label.pack(side='right', padx=10)
+        
+        inv_filter = FilterBar(inv_frame, [
+            ('choice', 'status', 'Status', ("Unpaid", "Paid")),
+            ('dates', 'invoice_date', 'Date'), ('prefix', 'name', 'Customer'),
+            ('amount', 'total_amount', 'Total')],
+            lambda where, params: self.inv_pages.set_filter(where, params))
+        inv_filter.pack(side='top', fill='x', padx=10, pady=(0, 5))
         list_frame = ttk.LabelFrame(inv_frame, text="All Invoices", padding=10)
         list_frame.pack(fill='both', expand=True, padx=10, pady=10)
         
@@ -1596,35 +1645,29 @@ class SalesModule:
         
         scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.inv_tree.yview)
         scrollbar.pack(side='right', fill='y')
-        self.inv_tree.configure(yscrollcommand=scrollbar.set)
+        self.inv_tree.tag_configure('paid', background='#d4edda', foreground='#155724')
+        self.inv_tree.tag_configure('unpaid', background='#f8d7da', foreground='#721c24')
+        self.inv_pages = VirtualList(self.app, self.inv_tree, scrollbar, self.render_invoice_row, 'invoice_id',
+                                   descending=True, count=counted('Invoices'), status_label=inv_count_label)
+        self.inv_pages.sortable({"Inv#": "invoice_id", "Customer": "name COLLATE NOCASE", "Date": "invoice_date",
+                                 "Due Date": "due_date", "Total": "total_amount", "Status": "status"})
         
+        self.app.watch_tables(self.inv_tree, ('Invoices', 'Customers'), self.refresh_invoices)
         self.refresh_invoices()
     
     def refresh_invoices(self):
         """Refresh invoices list"""
-        for item in self.inv_tree.get_children():
-            self.inv_tree.delete(item)
-        
-        self.db.execute('''
+        self.inv_pages.load('''
             SELECT inv.invoice_id, inv.so_number, c.name, inv.invoice_date, inv.due_date,
                 inv.subtotal, inv.total_gst, inv.total_amount, inv.status
             FROM Invoices inv
             JOIN Customers c ON inv.customer_id = c.customer_id
-            ORDER BY inv.invoice_id DESC
         ''')
-        
-        for row in self.db.fetchall():
-            display_row = (row[0], row[1], row[2], row[3], row[4],
-                          f"₹{row[5]:.2f}", f"₹{row[6]:.2f}", f"₹{row[7]:.2f}", row[8])
-            
-            # Insert ONCE with appropriate tag
-            if row[8] == "Paid":
-                self.inv_tree.insert('', 'end', values=display_row, tags=('paid',))
-            else:
-                self.inv_tree.insert('', 'end', values=display_row, tags=('unpaid',))
     
-        self.inv_tree.tag_configure('paid', background='#d4edda', foreground='#155724')
-        self.inv_tree.tag_configure('unpaid', background='#f8d7da', foreground='#721c24')
+    def render_invoice_row(self, row):
+        display_row = (row[0], row[1], row[2], row[3], row[4],
+                      fmt(row[5]), fmt(row[6]), fmt(row[7]), row[8])
+        return display_row, ('paid',) if row[8] == "Paid" else ('unpaid',)
 
     def generate_invoice(self):
         """Generate invoice from delivered sales order"""
@@ -1656,7 +1699,7 @@ class SalesModule:
         frame = ttk.LabelFrame(dialog, text="Delivered Orders", padding=10)
         frame.pack(fill='both', expand=True, padx=10, pady=10)
         
-        so_dict = {f"SO #{so[0]} - {so[1]} (₹{so[5]:.2f})": so for so in orders}
+        so_dict = {f"SO #{so[0]} - {so[1]} ({fmt(so[5])})": so for so in orders}
         so_var = tk.StringVar()
         
         for label in so_dict.keys():
@@ -1696,9 +1739,8 @@ class SalesModule:
                 self.db.commit()
                 
                 messagebox.showinfo("Success", 
-                    f"Invoice #{invoice_id} generated!\n\nSO #{so_number}\nAmount: ₹{so_data[5]:.2f}\nDue: {due_entry.get()}")
+                    f"Invoice #{invoice_id} generated!\n\nSO #{so_number}\nAmount: {fmt(so_data[5])}\nDue: {due_entry.get()}")
                 dialog.destroy()
-                self.refresh_invoices()
                 
             except Exception as e:
                 messagebox.showerror("Error", f"Failed: {str(e)}")
@@ -1738,8 +1780,6 @@ class SalesModule:
                 self.db.commit()
 
                 messagebox.showinfo("Success", f"Invoice #{invoice_id} marked as Paid!")
-                self.refresh_invoices()
-                self.refresh_sales_reports()  # Update reports
 
             except Exception as e:
                 self.db.rollback()
@@ -1835,8 +1875,8 @@ class SalesModule:
         
         for row in self.db.fetchall():
             tree.insert('', 'end', values=(
-                row[0], row[1], f"₹{row[2]:.2f}", 
-                f"{row[3]:.1f}%", f"₹{row[4]:.2f}", f"₹{row[5]:.2f}"
+                row[0], row[1], fmt(row[2]), 
+                f"{row[3]:.1f}%", fmt(row[4]), fmt(row[5])
             ))
         
         # Amount Summary - Compact Grid
@@ -1845,12 +1885,12 @@ class SalesModule:
         
         ttk.Label(summary_frame, text="Subtotal:", font=('Arial', 9)).grid(
             row=0, column=0, sticky='w', padx=8, pady=2)
-        ttk.Label(summary_frame, text=f"₹{inv_data[7]:.2f}", font=('Arial', 9, 'bold')).grid(
+        ttk.Label(summary_frame, text=fmt(inv_data[7]), font=('Arial', 9, 'bold')).grid(
             row=0, column=1, sticky='e', padx=8, pady=2)
         
         ttk.Label(summary_frame, text="GST:", font=('Arial', 9)).grid(
             row=0, column=2, sticky='w', padx=8, pady=2)
-        ttk.Label(summary_frame, text=f"₹{inv_data[8]:.2f}", font=('Arial', 9, 'bold'), 
+        ttk.Label(summary_frame, text=fmt(inv_data[8]), font=('Arial', 9, 'bold'), 
             foreground='blue').grid(row=0, column=3, sticky='e', padx=8, pady=2)
         
         ttk.Separator(summary_frame, orient='vertical').grid(
@@ -1858,7 +1898,7 @@ class SalesModule:
         
         ttk.Label(summary_frame, text="Total:", font=('Arial', 10, 'bold')).grid(
             row=0, column=5, sticky='w', padx=8, pady=2)
-        ttk.Label(summary_frame, text=f"₹{inv_data[9]:.2f}", font=('Arial', 10, 'bold'), 
+        ttk.Label(summary_frame, text=fmt(inv_data[9]), font=('Arial', 10, 'bold'), 
             foreground='green').grid(row=0, column=6, sticky='e', padx=8, pady=2)
         
         # Action buttons
@@ -1872,8 +1912,6 @@ class SalesModule:
                     self.db.commit()
                     messagebox.showinfo("Success", f"Invoice #{invoice_id} marked as Paid!")
                     dialog.destroy()
-                    self.refresh_invoices()
-                    self.refresh_sales_reports()
                 except Exception as e:
                     messagebox.showerror("Error", str(e))
             
@@ -1885,10 +1923,8 @@ class SalesModule:
     
     # ==================== SALES REPORTS TAB ====================
     
-    def create_sales_reports_tab(self):
+    def create_sales_reports_tab(self, report_frame):
         """Create sales reports tab"""
-        report_frame = ttk.Frame(self.notebook)
-        self.notebook.add(report_frame, text="📊 Reports")
     
         top_frame = ttk.Frame(report_frame)
         top_frame.pack(side='top', fill='x', padx=10, pady=10)
@@ -1908,7 +1944,7 @@ class SalesModule:
             ("Pending Orders:", "pending_orders"),
             ("Delivered Orders:", "delivered_orders"),
             ("Total Revenue:", "total_revenue"),
-            ("Pending Revenue:", "pending_revenue"),
+            ("Pending Revenue (live):", "pending_revenue"),
             ("Total Invoices:", "total_invoices"),
             ("Unpaid Invoices:", "unpaid_invoices"),
             ("Total Customers:", "total_customers")
@@ -1929,7 +1965,7 @@ class SalesModule:
         self.gst_brackets_frame.pack(fill='x', padx=10, pady=10)
     
         # Top customers
-        customers_frame = ttk.LabelFrame(report_frame, text="Top Customers by Revenue (Double-click to view details)", padding=10)
+        customers_frame = ttk.LabelFrame(report_frame, text="Top Customers by Revenue - live (Double-click to view details)", padding=10)
         customers_frame.pack(fill='both', expand=True, padx=10, pady=10)
     
         columns = ("Customer", "Orders", "Subtotal", "GST", "Total (Inc. GST)", "Avg Order")
@@ -1949,66 +1985,65 @@ class SalesModule:
         # Bind double-click to view customer order details
         self.report_tree.bind('<Double-1>', lambda e: self.view_customer_order_details())
     
+        self.report_rows = {}
+        self.app.watch_tables(self.report_tree, ('Sales_Orders', 'GST_Rollup', 'Invoices', 'Customers'),
+                              self.refresh_sales_reports)
         self.refresh_sales_reports()
     
     def refresh_sales_reports(self):
         """Refresh sales reports and statistics"""
+        self.app.worker.submit(self.report_tree, self.load_sales_reports, self.show_sales_reports)
+    
+    def load_sales_reports(self, cursor):
+        """Statistics, GST brackets and top customers (runs on the query worker)"""
+        # Order, invoice and customer counts come from the trigger-maintained counters
+        counters = read_counters(cursor)
+        stats = {
+            'total_orders': str(counters.get('Sales_Orders', 0)),
+            'pending_orders': str(counters.get('Sales_Orders:Pending', 0)),
+            'delivered_orders': str(counters.get('Sales_Orders:Delivered', 0)),
+            'total_invoices': str(counters.get('Invoices', 0)),
+            'unpaid_invoices': str(counters.get('Invoices:Unpaid', 0)),
+            'total_customers': str(counters.get('Customers', 0)),
+        }
+        
+        # GST collected by bracket from all sales orders (closed months from their snapshots)
+        gst_brackets = [(rate, gst, base, total, orders, lines)
+                        for rate, base, gst, total, orders, lines in read_gst_rollup(cursor, 'output')]
+        # Total revenue from the same figures, so it matches the brackets' TOTAL row
+        stats['total_revenue'] = fmt(sum(bracket[3] for bracket in gst_brackets))
+        
+        # Pending revenue and top customers are read live from Sales_Orders
+        cursor.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Sales_Orders WHERE status = 'Pending'")
+        stats['pending_revenue'] = fmt(cursor.fetchone()[0])
         
-        # Total orders
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders")
-        self.stats_labels['total_orders'].config(text=str(self.db.fetchone()[0]))
-        
-        # Pending orders
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders WHERE status = 'Pending'")
-        self.stats_labels['pending_orders'].config(text=str(self.db.fetchone()[0]))
-        
-        # Delivered orders
-        self.db.execute("SELECT COUNT(*) FROM Sales_Orders WHERE status = 'Delivered'")
-        self.stats_labels['delivered_orders'].config(text=str(self.db.fetchone()[0]))
-        
-        # Total revenue (all orders)
-        self.db.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Sales_Orders")
-        total_rev = self.db.fetchone()[0]
-        self.stats_labels['total_revenue'].config(text=f"₹{total_rev:.2f}")
-        
-        # Pending revenue
-        self.db.execute("SELECT COALESCE(SUM(total_amount), 0) FROM Sales_Orders WHERE status = 'Pending'")
-        pending_rev = self.db.fetchone()[0]
-        self.stats_labels['pending_revenue'].config(text=f"₹{pending_rev:.2f}")
-        
-        # Total invoices
-        self.db.execute("SELECT COUNT(*) FROM Invoices")
-        self.stats_labels['total_invoices'].config(text=str(self.db.fetchone()[0]))
-        
-        # Unpaid invoices
-        self.db.execute("SELECT COUNT(*) FROM Invoices WHERE status = 'Unpaid'")
-        self.stats_labels['unpaid_invoices'].config(text=str(self.db.fetchone()[0]))
-        
-                # Total customers
-        self.db.execute("SELECT COUNT(*) FROM Customers")
-        self.stats_labels['total_customers'].config(text=str(self.db.fetchone()[0]))
+        # Top customers with GST breakdown
+        cursor.execute('''
+            SELECT c.customer_id,
+                c.name, 
+                COUNT(so.so_number) as order_count,
+                COALESCE(SUM(so.subtotal), 0) as total_subtotal,
+                COALESCE(SUM(so.total_gst), 0) as total_gst,
+                COALESCE(SUM(so.total_amount), 0) as total_revenue,
+                COALESCE(AVG(so.total_amount), 0) as avg_order
+            FROM Customers c
+            LEFT JOIN Sales_Orders so ON c.customer_id = so.customer_id
+            GROUP BY c.customer_id, c.name
+            HAVING order_count > 0
+            ORDER BY total_revenue DESC
+            LIMIT 20
+        ''')
+        return stats, gst_brackets, cursor.fetchall()
+    
+    def show_sales_reports(self, data):
+        stats, gst_brackets, top_customers = data
+        for key, text in stats.items():
+            self.stats_labels[key].config(text=text)
         
         # Clear existing GST brackets content to prevent duplication
         for widget in self.gst_brackets_frame.winfo_children():
             widget.destroy()
         
-        # Query to get GST collected by bracket from all sales orders
-        self.db.execute('''
-            SELECT 
-                soi.gst_percent,
-                COALESCE(SUM(soi.gst_amount), 0) as total_gst_collected,
-                COALESCE(SUM(soi.rate * soi.quantity), 0) as total_base_amount,
-                COALESCE(SUM(soi.total_price), 0) as total_with_gst,
-                COUNT(DISTINCT so.so_number) as order_count,
-                COUNT(*) as item_count
-            FROM Sales_Order_Items soi
-            JOIN Sales_Orders so ON soi.so_number = so.so_number
-            GROUP BY soi.gst_percent
-            ORDER BY soi.gst_percent
-        ''')
-        
-        gst_brackets = self.db.fetchall()
-        
         if gst_brackets:
             # Add color legend at the top
             legend_frame = ttk.Frame(self.gst_brackets_frame)
@@ -2075,11 +2110,11 @@ class SalesModule:
                 
                 ttk.Label(bracket_frame, text=f"{gst_percent:.1f}%", 
                     font=('Arial', 10, 'bold'), foreground=color, width=12).pack(side='left', padx=5)
-                ttk.Label(bracket_frame, text=f"₹{base_amount:.2f}", 
+                ttk.Label(bracket_frame, text=fmt(base_amount), 
                     font=('Arial', 10), width=15).pack(side='left', padx=5)
-                ttk.Label(bracket_frame, text=f"₹{gst_collected:.2f}", 
+                ttk.Label(bracket_frame, text=fmt(gst_collected), 
                     font=('Arial', 10, 'bold'), foreground=color, width=15).pack(side='left', padx=5)
-                ttk.Label(bracket_frame, text=f"₹{amount_with_gst:.2f}", 
+                ttk.Label(bracket_frame, text=fmt(amount_with_gst), 
                     font=('Arial', 10), width=15).pack(side='left', padx=5)
                 ttk.Label(bracket_frame, text=str(orders), 
                     font=('Arial', 10), width=10).pack(side='left', padx=5)
@@ -2094,11 +2129,11 @@ class SalesModule:
             
             ttk.Label(total_frame, text="TOTAL", 
                 font=('Arial', 10, 'bold'), width=12).pack(side='left', padx=5)
-            ttk.Label(total_frame, text=f"₹{total_base:.2f}", 
+            ttk.Label(total_frame, text=fmt(total_base), 
                 font=('Arial', 10, 'bold'), foreground='blue', width=15).pack(side='left', padx=5)
-            ttk.Label(total_frame, text=f"₹{total_gst:.2f}", 
+            ttk.Label(total_frame, text=fmt(total_gst), 
                 font=('Arial', 10, 'bold'), foreground='red', width=15).pack(side='left', padx=5)
-            ttk.Label(total_frame, text=f"₹{total_with_gst:.2f}", 
+            ttk.Label(total_frame, text=fmt(total_with_gst), 
                 font=('Arial', 10, 'bold'), foreground='green', width=15).pack(side='left', padx=5)
             
             # Add info note
@@ -2117,41 +2152,15 @@ class SalesModule:
         # === END GST BRACKET BREAKDOWN ===
         
         # Top customers with GST breakdown
-        for item in self.report_tree.get_children():
-            self.report_tree.delete(item)
-        
-        # Top customers with GST breakdown
-        for item in self.report_tree.get_children():
-            self.report_tree.delete(item)
-        
-        self.db.execute('''
-            SELECT c.customer_id,
-                c.name, 
-                COUNT(so.so_number) as order_count,
-                COALESCE(SUM(so.subtotal), 0) as total_subtotal,
-                COALESCE(SUM(so.total_gst), 0) as total_gst,
-                COALESCE(SUM(so.total_amount), 0) as total_revenue,
-                COALESCE(AVG(so.total_amount), 0) as avg_order
-            FROM Customers c
-            LEFT JOIN Sales_Orders so ON c.customer_id = so.customer_id
-            GROUP BY c.customer_id, c.name
-            HAVING order_count > 0
-            ORDER BY total_revenue DESC
-            LIMIT 20
-        ''')
-        
-        for row in self.db.fetchall():
-            # Store customer_id in the item's tags for later retrieval
-            item_id = self.report_tree.insert('', 'end', values=(
-                row[1],  # Customer name
-                row[2],  # Order count
-                f"₹{row[3]:.2f}",  # Subtotal
-                f"₹{row[4]:.2f}",  # GST
-                f"₹{row[5]:.2f}",  # Total
-                f"₹{row[6]:.2f}"   # Avg
-            ))
-            # Store customer_id as a tag so we can retrieve it later
-            self.report_tree.item(item_id, tags=(str(row[0]),))
+        # customer_id is the item's iid and is also stored as its tag for later retrieval
+        reconcile(self.report_tree, [(str(row[0]), (
+            row[1],  # Customer name
+            row[2],  # Order count
+            fmt(row[3]),  # Subtotal
+            fmt(row[4]),  # GST
+            fmt(row[5]),  # Total
+            fmt(row[6])   # Avg
+        ), (str(row[0]),)) for row in top_customers], self.report_rows)
     
     def view_customer_order_details(self):
         """View detailed order breakdown for a customer"""
@@ -2204,10 +2213,10 @@ class SalesModule:
         summary = self.db.fetchone()
         
         summary_text = f"Total Orders: {summary[0]}  |  "
-        summary_text += f"Subtotal: ₹{summary[1]:.2f}  |  "
-        summary_text += f"GST: ₹{summary[2]:.2f}  |  "
-        summary_text += f"Total: ₹{summary[3]:.2f}  |  "
-        summary_text += f"Avg Order: ₹{summary[4]:.2f}"
+        summary_text += f"Subtotal: {fmt(summary[1])}  |  "
+        summary_text += f"GST: {fmt(summary[2])}  |  "
+        summary_text += f"Total: {fmt(summary[3])}  |  "
+        summary_text += f"Avg Order: {fmt(summary[4])}"
         
         ttk.Label(summary_frame, text=summary_text, font=('Arial', 10, 'bold'), 
             foreground='blue').pack()
@@ -2246,9 +2255,9 @@ class SalesModule:
                 row[1],  # Date
                 row[2],  # Status
                 row[3],  # Items count
-                f"₹{row[4]:.2f}",  # Subtotal
-                f"₹{row[5]:.2f}",  # GST
-                f"₹{row[6]:.2f}"   # Total
+                fmt(row[4]),  # Subtotal
+                fmt(row[5]),  # GST
+                fmt(row[6])   # Total
             ))
         
         # Info label
@@ -0,0 +1,76 @@
+"""
+Startup Timing - time-to-first-paint report
+Times each startup phase from the moment main starts until the first
+window is painted, and appends one JSON line per start to
+startup_times.log so startup can be compared across releases.
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+logger = logging.getLogger("inventory.startup")
+
+LOG_FILE = "startup_times.log"
+
+
+class StartupTimer:
+    """Phase timings of one application start"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []  # (phase, ms) in order
+        self.tabs = []    # (tab text, ms) for tabs built after startup
+        self.first_paint_ms = None
+
+    def mark(self, phase):
+        """End the current phase, naming it phase"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self._last) * 1000))
+        self._last = now
+
+    def tab_built(self, tab, ms):
+        self.tabs.append((tab, ms))
+
+    def first_paint(self, log_path=LOG_FILE, **details):
+        """Record time-to-first-paint and append this start to the log"""
+        self.mark("first paint")
+        self.first_paint_ms = (self._last - self.started) * 1000
+        logger.info("first paint after %.0f ms (%s)", self.first_paint_ms,
+                    ", ".join(f"{phase} {ms:.0f} ms" for phase, ms in self.phases))
+        record = {"time": datetime.now().isoformat(timespec='seconds'),
+                  "first_paint_ms": round(self.first_paint_ms, 1),
+                  "phases": {phase: round(ms, 1) for phase, ms in self.phases}}
+        record.update(details)
+        try:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning("could not write %s: %s", log_path, e)
+
+    def report(self):
+        """This start's timings as text"""
+        lines = [f"Time to first paint: {self.first_paint_ms or 0:.0f} ms", ""]
+        lines += [f"  {phase:<18} {ms:8.1f} ms" for phase, ms in self.phases]
+        if self.tabs:
+            lines += ["", "Tabs built on first view:"]
+            lines += [f"  {tab:<18} {ms:8.1f} ms" for tab, ms in self.tabs]
+        return "\n".join(lines)
+
+
+def read_history(log_path=LOG_FILE, limit=10):
+    """The last limit starts from the log, oldest first"""
+    if not os.path.exists(log_path):
+        return []
+    with open(log_path, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    history = []
+    for line in lines:
+        try:
+            history.append(json.loads(line))
+        except ValueError:
+            continue
+    return history